@@ -1,4 +1,3 @@
-import { HttpClient, HttpParams } from '@angular/common/http';
 import {
   Component,
   ElementRef,
@@ -10,9 +9,9 @@ import {
 } from '@angular/core';
 import { MatDialog } from '@angular/material/dialog';
 import { ToastrService } from 'ngx-toastr';
-import { environment } from '../../../environments/environment';
 import { Event } from '../../models/Event';
 import { Primitive } from '../../models/Primitive';
+import { PrimitivePredictionService } from '../../services/primitive-prediction.service';
 import { EventTableComponent } from '../event-table/event-table.component';
 import { ConfirmPopupComponent } from '../modals/confirm-popup/confirm-popup.component';
 
@@ -35,24 +34,17 @@ export class EventItemComponent implements OnInit {
   tempDescription = ' '; // Going to use this for
   recommendations: Primitive[];
   response: Primitive[];
-  private apiUrl = environment.API_URL;
 
   constructor(
-    private http: HttpClient,
+    private primitivePrediction: PrimitivePredictionService,
     private toastr: ToastrService,
     public eventTable: EventTableComponent,
     public dialog: MatDialog
   ) {}
 
   async getResponse(description: string): Promise<void> {
-    let query = new HttpParams();
-    query = query.set('event_description', description);
-    await this.http
-      .get(this.apiUrl + '/api/get_top3', { params: query })
-      .toPromise()
-      .then((data: Primitive[]) => {
-        this.response = data;
-      });
+    // Requests from all rows are batched together by the service
+    this.response = await this.primitivePrediction.getTop3(description);
   }
 
   async initRecommendations(): Promise<void> {
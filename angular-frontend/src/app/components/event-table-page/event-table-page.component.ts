@@ -7,7 +7,6 @@ import { environment } from '../../../environments/environment';
 import { Event } from '../../models/Event';
 import { Primitive } from '../../models/Primitive';
 import { RecommendationsResponse } from '../event-table/event-table.component';
-import { SchemaFilesResponse } from '../load-schema/load-schema.component';
 import {
   QnodeOption,
   QnodeResponse,
@@ -30,7 +29,6 @@ export class EventTablePageComponent {
 
   // Schema loading variables
   response: RecommendationsResponse;
-  savedSchemas: string[];
   schemaFile: string;
   schema_id: string;
   schema_name: string;
@@ -99,15 +97,6 @@ export class EventTablePageComponent {
     this.schema_dscpt = schemaDetails.schema_dscpt;
   }
 
-  async getSavedSchemas(): Promise<void> {
-    return this.http
-      .get(this.apiUrl + '/api/get_saved_schemas')
-      .toPromise()
-      .then((data: SchemaFilesResponse) => {
-        this.savedSchemas = data.schemaFiles;
-      });
-  }
-
   getEventQnodes(event_description: string): void {
     if (this.eventSelectorMap.has(event_description)) {
       const selector = this.eventSelectorMap.get(event_description);
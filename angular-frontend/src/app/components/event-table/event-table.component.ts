@@ -79,7 +79,11 @@ export class EventTableComponent implements OnInit {
 
   // Triggered when the Add Event button is clicked, adds an event with input_text as event_text
   addEvent(): number {
-    if (this.input_text === null || this.input_text === undefined) {
+    if (
+      this.input_text === null ||
+      this.input_text === undefined ||
+      this.input_text.trim() === ''
+    ) {
       this.toastr.error('Invalid event ID entered. Empty strings are not allowed.', '', {
         timeOut: 1500,
       });
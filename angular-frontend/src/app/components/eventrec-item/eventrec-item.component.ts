@@ -1,9 +1,8 @@
-import { HttpClient, HttpParams } from '@angular/common/http';
 import { Component, EventEmitter, Input, OnInit, Output } from '@angular/core';
 import { ToastrService } from 'ngx-toastr';
-import { environment } from '../../../environments/environment';
 import { Event } from '../../models/Event';
 import { Primitive } from '../../models/Primitive';
+import { PrimitivePredictionService } from '../../services/primitive-prediction.service';
 
 @Component({
   // eslint-disable-next-line @angular-eslint/component-selector
@@ -18,19 +17,15 @@ export class EventrecItemComponent implements OnInit {
 
   recommendations: Primitive[];
   response: Primitive[];
-  private apiUrl = environment.API_URL;
 
-  constructor(private http: HttpClient, private toastr: ToastrService) {}
+  constructor(
+    private primitivePrediction: PrimitivePredictionService,
+    private toastr: ToastrService
+  ) {}
 
   async getResponse(description: string): Promise<void> {
-    let query = new HttpParams();
-    query = query = query.set('event_description', description);
-    await this.http
-      .get(this.apiUrl + '/api/get_top3', { params: query })
-      .toPromise()
-      .then((data: Primitive[]) => {
-        this.response = data;
-      });
+    // Requests from all rows are batched together by the service
+    this.response = await this.primitivePrediction.getTop3(description);
   }
 
   async initRecommendations(): Promise<void> {
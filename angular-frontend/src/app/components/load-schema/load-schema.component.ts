@@ -18,8 +18,13 @@ export interface SchemaResponse {
 
 export interface SchemaFilesResponse {
   schemaFiles: string[];
+  nextCursor: string | null;
 }
 
+const SCHEMA_PAGE_SIZE = 100;
+// Time to wait after the last keystroke of a search query before listing schemas
+const SEARCH_DEBOUNCE_MS = 300;
+
 @Component({
   selector: 'app-load-schema',
   templateUrl: './load-schema.component.html',
@@ -45,6 +50,10 @@ export class LoadSchemaComponent implements OnInit {
   tracking: { date: string; type: string; data: unknown }[];
 
   schemaSearchQuery: string;
+  latestOnly = true;
+  nextCursor: string | null = null;
+  private listingRequests = 0;
+  private searchTimer: ReturnType<typeof setTimeout> | null = null;
 
   schemaFile: string;
   private apiUrl = environment.API_URL;
@@ -89,27 +98,49 @@ export class LoadSchemaComponent implements OnInit {
     this.getSavedSchemas();
   }
 
-  async requestSavedSchemas(): Promise<void> {
+  async requestSavedSchemas(cursor: string | null = null): Promise<void> {
+    let query = new HttpParams();
+    query = query.set('sort', 'newest');
+    query = query.set('limit', SCHEMA_PAGE_SIZE.toString());
+    query = query.set('latest', this.latestOnly.toString());
+    if (this.schemaSearchQuery) {
+      query = query.set('q', this.schemaSearchQuery);
+    }
+    if (cursor !== null) {
+      query = query.set('cursor', cursor);
+    }
+    // Ignore responses to earlier requests which arrive late, e.g. while typing a search query
+    const listingRequest = ++this.listingRequests;
     return this.http
-      .get(this.apiUrl + '/api/get_saved_schemas')
+      .get(this.apiUrl + '/api/get_saved_schemas', { params: query })
       .toPromise()
       .then((data: SchemaFilesResponse) => {
-        this.savedSchemas = data.schemaFiles;
+        if (listingRequest !== this.listingRequests) {
+          return;
+        }
+        this.savedSchemas =
+          cursor === null ? data.schemaFiles : this.savedSchemas.concat(data.schemaFiles);
+        this.nextCursor = data.nextCursor;
       });
   }
   async getSavedSchemas(): Promise<void> {
+    if (this.searchTimer !== null) {
+      clearTimeout(this.searchTimer);
+      this.searchTimer = null;
+    }
     await this.requestSavedSchemas();
   }
 
-  relevantSearchQuery(schema: LoadSchemaComponent): boolean {
-    if (this.schemaSearchQuery === undefined) {
-      return true;
+  // Lists schemas once the search query stops changing, rather than on every keystroke
+  searchSavedSchemas(): void {
+    if (this.searchTimer !== null) {
+      clearTimeout(this.searchTimer);
     }
-    return (
-      schema.schema_id.search(this.schemaSearchQuery) >= 0 ||
-      schema.schema_name.search(this.schemaSearchQuery) >= 0 ||
-      schema.schema_dscpt.search(this.schemaSearchQuery) >= 0
-    );
+    this.searchTimer = setTimeout(() => this.getSavedSchemas(), SEARCH_DEBOUNCE_MS);
+  }
+
+  async getMoreSavedSchemas(): Promise<void> {
+    await this.requestSavedSchemas(this.nextCursor);
   }
 
   setQnodes(): void {
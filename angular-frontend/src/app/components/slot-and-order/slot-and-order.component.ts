@@ -1,4 +1,4 @@
-import { HttpClient, HttpErrorResponse } from '@angular/common/http';
+import { HttpClient, HttpErrorResponse, HttpParams } from '@angular/common/http';
 import { Component, ElementRef, OnInit, ViewChild } from '@angular/core';
 import { MatDialog } from '@angular/material/dialog';
 import { Router } from '@angular/router';
@@ -14,6 +14,15 @@ export interface SubmissionResponse {
   output: string;
 }
 
+export interface ConversionStatusResponse {
+  fname: string;
+  state: 'queued' | 'running' | 'finished' | 'failed';
+  error: string | null;
+}
+
+const CONVERSION_POLL_INTERVAL_MS = 1000;
+const CONVERSION_POLL_ATTEMPTS = 60;
+
 export interface QnodeOption {
   qnode: string;
   rawName: string;
@@ -437,6 +446,31 @@ export class SlotAndOrderComponent implements OnInit {
     });
   }
 
+  async watchConversion(fname: string): Promise<void> {
+    let query = new HttpParams();
+    query = query.set('schemaFile', fname);
+    for (let attempt = 0; attempt < CONVERSION_POLL_ATTEMPTS; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, CONVERSION_POLL_INTERVAL_MS));
+      let status: ConversionStatusResponse;
+      try {
+        status = (await this.http
+          .get(this.apiUrl + '/api/get_conversion_status', { params: query })
+          .toPromise()) as ConversionStatusResponse;
+      } catch (error) {
+        console.error(error.message);
+        return;
+      }
+      if (status.state === 'failed') {
+        console.error(status.error);
+        this.toastr.error(`Schema ${fname} could not be converted to SDF: ${status.error}`);
+        return;
+      }
+      if (status.state === 'finished') {
+        return;
+      }
+    }
+  }
+
   async postSchema(): Promise<number> {
     this.saveLinks();
     await this.http
@@ -470,6 +504,8 @@ export class SlotAndOrderComponent implements OnInit {
       });
 
     this.toastr.success('Schema submitted successfully!');
+    // Conversion to SDF runs in the background, so its failures are reported later
+    this.watchConversion(this.schema_output.fname);
 
     // Downloading the submitted YAML file
     if (this.download_flag) {
@@ -0,0 +1,75 @@
+import { HttpClientTestingModule, HttpTestingController } from '@angular/common/http/testing';
+import { fakeAsync, flushMicrotasks, TestBed, tick } from '@angular/core/testing';
+import { environment } from '../../environments/environment';
+import { Primitive } from '../models/Primitive';
+
+import { PrimitivePredictionService } from './primitive-prediction.service';
+
+describe('PrimitivePredictionService', () => {
+  let service: PrimitivePredictionService;
+  let httpMock: HttpTestingController;
+  const url = environment.API_URL + '/api/get_top3_batch';
+
+  function primitive(type: string): Primitive {
+    return { type, subsubtypes: [], description: type };
+  }
+
+  beforeEach(() => {
+    TestBed.configureTestingModule({
+      imports: [HttpClientTestingModule],
+    });
+    service = TestBed.inject(PrimitivePredictionService);
+    httpMock = TestBed.inject(HttpTestingController);
+  });
+
+  afterEach(() => {
+    httpMock.verify();
+  });
+
+  it('should be created', () => {
+    expect(service).toBeTruthy();
+  });
+
+  it('should batch requests and resolve each with its own predictions', fakeAsync(() => {
+    const results: Primitive[][] = [];
+    service.getTop3('attack').then((data) => (results[0] = data));
+    service.getTop3('').then((data) => (results[1] = data));
+    service.getTop3('flee').then((data) => (results[2] = data));
+    tick();
+
+    const request = httpMock.expectOne(url);
+    expect(request.request.body).toEqual({ event_descriptions: ['attack', '', 'flee'] });
+    request.flush([[primitive('Conflict.Attack')], [], [primitive('Movement.Transportation')]]);
+    flushMicrotasks();
+
+    expect(results).toEqual([
+      [primitive('Conflict.Attack')],
+      [],
+      [primitive('Movement.Transportation')],
+    ]);
+  }));
+
+  it('should send later requests in a new batch', fakeAsync(() => {
+    service.getTop3('attack');
+    tick();
+    httpMock.expectOne(url).flush([[]]);
+
+    service.getTop3('flee');
+    tick();
+    const request = httpMock.expectOne(url);
+    expect(request.request.body).toEqual({ event_descriptions: ['flee'] });
+    request.flush([[]]);
+  }));
+
+  it('should reject every request of a failed batch', fakeAsync(() => {
+    const errors: unknown[] = [];
+    service.getTop3('attack').catch((error) => errors.push(error));
+    service.getTop3('flee').catch((error) => errors.push(error));
+    tick();
+
+    httpMock.expectOne(url).flush('error', { status: 500, statusText: 'Server Error' });
+    flushMicrotasks();
+
+    expect(errors.length).toBe(2);
+  }));
+});
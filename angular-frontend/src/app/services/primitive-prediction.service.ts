@@ -0,0 +1,47 @@
+import { HttpClient } from '@angular/common/http';
+import { Injectable } from '@angular/core';
+import { environment } from '../../environments/environment';
+import { Primitive } from '../models/Primitive';
+
+interface PendingRequest {
+  description: string;
+  resolve: (primitives: Primitive[]) => void;
+  reject: (reason: unknown) => void;
+}
+
+// Collects the requests made while a table of events is rendered and sends them as one batch
+@Injectable({
+  providedIn: 'root',
+})
+export class PrimitivePredictionService {
+  private apiUrl = environment.API_URL;
+  private pending: PendingRequest[] = [];
+
+  constructor(private http: HttpClient) {}
+
+  getTop3(description: string): Promise<Primitive[]> {
+    return new Promise((resolve, reject) => {
+      // The first request of a batch schedules it to be sent once the current task finishes
+      if (this.pending.length === 0) {
+        setTimeout(() => this.sendBatch());
+      }
+      this.pending.push({ description, resolve, reject });
+    });
+  }
+
+  private sendBatch(): void {
+    const batch = this.pending;
+    this.pending = [];
+    this.http
+      .post(this.apiUrl + '/api/get_top3_batch', {
+        event_descriptions: batch.map((request) => request.description),
+      })
+      .toPromise()
+      .then((data: Primitive[][]) => {
+        batch.forEach((request, i) => request.resolve(data[i]));
+      })
+      .catch((error) => {
+        batch.forEach((request) => request.reject(error));
+      });
+  }
+}
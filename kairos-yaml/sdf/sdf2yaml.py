@@ -8,7 +8,7 @@ import json
 from pathlib import Path
 from typing import Any, Mapping
 
-import yaml
+from sdf import yaml_io
 
 
 def convert_sdf_to_yaml(data: Mapping[str, Any]) -> Mapping[str, Any]:
@@ -181,7 +181,7 @@ def convert_files(json_file: Path, yaml_file: Path) -> None:
     yaml_data = convert_sdf_to_yaml(json_data)
 
     with yaml_file.open("w") as file:
-        yaml.dump(yaml_data, file, default_flow_style=False, sort_keys=False)
+        yaml_io.dump(yaml_data, file, default_flow_style=False, sort_keys=False)
 
 
 def main() -> None:
@@ -12,8 +12,8 @@ from typing import Any, List, Mapping, MutableMapping, Optional, Sequence, Tuple
 
 from pydantic import parse_obj_as
 import requests
-import yaml
 
+from sdf import yaml_io
 from sdf.ontology import ontology
 from sdf.yaml_schema import Before, Container, Overlaps, Schema, Slot, Step
 
@@ -465,7 +465,7 @@ def convert_files(
     input_schemas = []
     for yaml_file in yaml_files:
         with yaml_file.open() as file:
-            yaml_data = yaml.safe_load(file)
+            yaml_data = yaml_io.load(file)
         input_schemas.extend(yaml_data)
 
     output_library = convert_all_yaml_to_sdf(
@@ -0,0 +1,48 @@
+"""Read and write YAML schemas, with LibYAML's C parser and emitter when PyYAML was built with it.
+
+The C classes resolve and represent the same types as the pure-Python safe loader and dumper, so
+the same data is loaded and dumped either way. The only difference in dumped text is that the C
+emitter may break long double-quoted strings (those with escaped non-ASCII characters) at other
+points, which doesn't change their values.
+"""
+
+from typing import IO, Any, Optional, Union
+
+import yaml
+
+# Whether the C parser and emitter are used
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+
+    LIBYAML = True
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+
+    LIBYAML = False
+
+
+def load(stream: Union[str, bytes, IO[str], IO[bytes]]) -> Any:
+    """Parses a YAML document, only constructing standard types.
+
+    Args:
+        stream: YAML text or open file.
+
+    Returns:
+        Parsed data.
+    """
+    return yaml.load(stream, Loader=SafeLoader)  # nosec
+
+
+def dump(data: Any, stream: Optional[IO[str]] = None, **kwargs: Any) -> Optional[str]:
+    """Serializes data as a YAML document, only representing standard types.
+
+    Args:
+        data: Data to serialize.
+        stream: Open file to write to, or None to return the text.
+        **kwargs: Formatting options of `yaml.dump`, such as `sort_keys`.
+
+    Returns:
+        YAML text if no stream was given, otherwise None.
+    """
+    text: Optional[str] = yaml.dump(data, stream, Dumper=SafeDumper, **kwargs)
+    return text
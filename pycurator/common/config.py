@@ -1,6 +1,7 @@
 """Access and loading of deployment-specific settings."""
 
 from pathlib import Path
+from typing import Optional
 
 from pydantic import BaseSettings
 
@@ -16,11 +17,73 @@ class Settings(BaseSettings):
         ef_dir: Directory containing entity-fishing.
         ef_server: Slurm node to run entity-finishing on.
         gpt2_server: Machine running the GPT-2 server.
+        gpt2_max_batch_size: Maximum number of requests the GPT-2 server runs as one batch.
+        gpt2_max_batch_wait: Time in seconds the GPT-2 server waits for more requests to batch.
+        gpt2_max_batch_tokens: Token budget of a single generation call of the GPT-2 server,
+            measured as generated rows times their maximum length. Batches over the budget are
+            split into several calls.
+        gpt2_stop_at_sentence: Whether the GPT-2 server stops each sample once its first sentence
+            is complete.
+        gpt2_adaptive_round_size: Number of predictions drawn per round when the GPT-2 server
+            samples adaptively.
+        gpt2_adaptive_max_rounds: Maximum number of rounds when the GPT-2 server samples
+            adaptively.
+        gpt2_cpu_precision: Precision of the GPT-2 server's model on machines without a GPU, one of
+            "fp32", "bf16", or "int8".
+        gpt2_num_threads: Number of threads the GPT-2 server uses for model operations on CPU. If
+            unset, one thread per core in `gpt2_cpu_cores` is used.
+        gpt2_cpu_cores: Cores the GPT-2 server is pinned to on CPU, e.g., "0-15". If unset, it may
+            run on any core.
+        embedding_cache_bytes: Maximum total size in bytes of the sentence embeddings cached by the
+            Flask backend.
+        kgtk_cache_ttl: Time in seconds after which cached KGTK results expire.
+        kgtk_cache_negative_ttl: Time in seconds after which empty KGTK results expire.
+        kgtk_cache_max_bytes: Maximum total size in bytes of cached KGTK results.
+        kgtk_cache_wal: Whether the KGTK cache uses write-ahead logging, which allows concurrent
+            reads and writes but is not supported on network file systems. Only enable it if
+            `pycurator/data` is on a local disk.
+        kgtk_backend: Source of KGTK candidates, either "api" for KGTK's search API or "local" for
+            an index built with `pycurator.flask_backend.kgtk_index`.
+        kgtk_url: URL of KGTK's search API.
+        kgtk_timeout: Time in seconds to wait for each attempt at a KGTK request.
+        kgtk_retries: Number of times a failed KGTK request is retried.
+        kgtk_backoff: Base of the exponential backoff between KGTK retries in seconds.
+        kgtk_failure_threshold: Number of consecutive failed KGTK requests after which requests
+            fail immediately.
+        kgtk_reset_timeout: Time in seconds after which KGTK is tried again once requests fail
+            immediately.
+        schema_cache_entries: Maximum number of loaded schemas cached by each Flask backend worker.
+        schema_catalog_refresh_interval: Time in seconds after which listing saved schemas checks
+            every schema file for changes, rather than only checking whether files were added,
+            replaced, or deleted.
     """
 
     ef_dir: Path = Path("/nas/gaia/lestat/users/mdehaven/software2/nerd")
     ef_server: str = "saga28"
     gpt2_server: str = "sagalg02"
+    gpt2_max_batch_size: int = 8
+    gpt2_max_batch_wait: float = 0.05
+    gpt2_max_batch_tokens: int = 32768
+    gpt2_stop_at_sentence: bool = True
+    gpt2_adaptive_round_size: int = 8
+    gpt2_adaptive_max_rounds: int = 5
+    gpt2_cpu_precision: str = "int8"
+    gpt2_num_threads: Optional[int] = None
+    gpt2_cpu_cores: Optional[str] = None
+    embedding_cache_bytes: int = 256 * 1024 * 1024
+    kgtk_cache_ttl: float = 30 * 24 * 60 * 60
+    kgtk_cache_negative_ttl: float = 60 * 60
+    kgtk_cache_max_bytes: int = 512 * 1024 * 1024
+    kgtk_cache_wal: bool = False
+    kgtk_backend: str = "api"
+    kgtk_url: str = "https://kgtk.isi.edu/api"
+    kgtk_timeout: float = 5.0
+    kgtk_retries: int = 2
+    kgtk_backoff: float = 0.2
+    kgtk_failure_threshold: int = 5
+    kgtk_reset_timeout: float = 30.0
+    schema_cache_entries: int = 64
+    schema_catalog_refresh_interval: float = 5 * 60
 
     class Config:
         """Model configuration."""
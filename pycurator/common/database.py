@@ -0,0 +1,32 @@
+"""Access to SQLite databases shared between processes."""
+
+from contextlib import contextmanager
+from pathlib import Path
+import sqlite3
+from typing import Iterator
+
+DEFAULT_TIMEOUT = 60.0
+
+
+@contextmanager
+def transaction(path: Path, timeout: float = DEFAULT_TIMEOUT) -> Iterator[sqlite3.Connection]:
+    """Opens a connection to a database for a single transaction.
+
+    The default rollback journal is kept, since databases may live on a network file system where
+    write-ahead logging is not supported.
+
+    Args:
+        path: Database file path.
+        timeout: Time in seconds to wait for other writers.
+
+    Yields:
+        Connection returning rows which can be accessed by column name. It is committed and closed on
+        exit, or rolled back if an exception is raised.
+    """
+    connection = sqlite3.connect(str(path), timeout=timeout)
+    connection.row_factory = sqlite3.Row
+    try:
+        with connection:
+            yield connection
+    finally:
+        connection.close()
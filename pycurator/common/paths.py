@@ -27,5 +27,11 @@ for directory in dirs:
     directory.mkdir(parents=True, exist_ok=True)
 
 STATUS_FILE = DATA_DIR / "status"
+SUGGESTION_CACHE_FILE = DATA_DIR / "suggestion_cache.sqlite"
+KGTK_CACHE_FILE = DATA_DIR / "kgtk_cache.sqlite"
+KGTK_INDEX_FILE = DATA_DIR / "kgtk_index.sqlite"
+QNODE_EMBEDDING_FILE = DATA_DIR / "qnode_embeddings.sqlite"
+SCHEMA_CATALOG_FILE = DATA_DIR / "schema_catalog.sqlite"
+SDF_CONVERSION_FILE = DATA_DIR / "sdf_conversions.sqlite"
 
 DOTENV_PATH = TOP_LEVEL_DIR / ".env"
@@ -0,0 +1,362 @@
+"""Catalog of saved schemas, so that they can be listed without parsing their YAML files.
+
+Each schema file is parsed once, when it is saved or first seen, and its display fields are stored
+in an SQLite database with the file's modification time and size. Refreshing the catalog only lists
+the schema and recommendation directories, parsing files which are new or have changed.
+
+Saves are recorded as they happen, so listings only refresh the catalog when a directory's
+modification time shows that files were added, replaced, or deleted by another process, or
+periodically to pick up files edited in place.
+"""
+
+import base64
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, List, Mapping, MutableMapping, Optional, Sequence, Tuple
+
+from sdf import yaml_io
+
+from pycurator.common.config import settings
+from pycurator.common.database import DEFAULT_TIMEOUT, transaction
+from pycurator.common.paths import EVENT_REC_DIR, SCHEMA_CATALOG_FILE, SCHEMA_DIR
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS schemas (
+    file TEXT PRIMARY KEY,
+    schema_id TEXT NOT NULL,
+    schema_name TEXT NOT NULL,
+    schema_dscpt TEXT NOT NULL,
+    schema_version TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    augmented INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS schemas_id ON schemas (schema_id, schema_version);
+CREATE INDEX IF NOT EXISTS schemas_version ON schemas (schema_version, file);
+"""
+
+# Columns and direction of each sort order, ending with the file name so that keys are unique
+SORT_ORDERS: Mapping[str, Tuple[Sequence[str], bool]] = {
+    "file": (("file",), False),
+    "newest": (("schema_version", "file"), True),
+    "oldest": (("schema_version", "file"), False),
+}
+
+
+def display_timestamp(schema_version: str) -> str:
+    """Formats the timestamp of a schema version.
+
+    Args:
+        schema_version: Version like `2021-04-30-12-34-56-789012`.
+
+    Returns:
+        Timestamp like `2021-04-30, 12:34:56`.
+    """
+    timestamp = schema_version.split("-")
+    return "-".join(timestamp[:3]) + ", " + ":".join(timestamp[3:6])
+
+
+def encode_cursor(sort: str, key: Sequence[str]) -> str:
+    """Encodes the position after an entry of a listing.
+
+    Args:
+        sort: Sort order of the listing.
+        key: Values of the sort order's columns for the entry.
+
+    Returns:
+        Opaque cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps([sort, list(key)]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(sort: str, cursor: str) -> Sequence[str]:
+    """Decodes a cursor.
+
+    Args:
+        sort: Sort order of the listing.
+        cursor: Cursor returned with the previous page of the listing.
+
+    Returns:
+        Values of the sort order's columns for the last entry of the previous page.
+
+    Raises:
+        ValueError: If the cursor is invalid, or is for another sort order.
+    """
+    try:
+        cursor_sort, key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError) as ex:
+        raise ValueError(f"Invalid cursor: {cursor}") from ex
+    columns, _ = SORT_ORDERS[sort]
+    if cursor_sort != sort or not isinstance(key, list) or len(key) != len(columns):
+        raise ValueError(f"Cursor is not for sort order {sort}: {cursor}")
+    return [str(value) for value in key]
+
+
+def _escape_like(text: str) -> str:
+    """Escapes the wildcards of a LIKE pattern.
+
+    Args:
+        text: Text to match literally.
+
+    Returns:
+        Text with wildcards escaped by backslashes.
+    """
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class SchemaCatalog:
+    """Display fields of saved schemas, stored in an SQLite database."""
+
+    def __init__(
+        self,
+        path: Path = SCHEMA_CATALOG_FILE,
+        schema_dir: Path = SCHEMA_DIR,
+        recommendation_dir: Path = EVENT_REC_DIR,
+        refresh_interval: float = settings.schema_catalog_refresh_interval,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> None:
+        """Constructor.
+
+        Args:
+            path: Database file path.
+            schema_dir: Directory of saved schemas.
+            recommendation_dir: Directory of event recommendations for the schemas.
+            refresh_interval: Time in seconds after which `refresh_if_changed` refreshes the catalog
+                even if the directories haven't changed.
+            timeout: Time in seconds to wait for other writers.
+        """
+        self.path = path
+        self.schema_dir = schema_dir
+        self.recommendation_dir = recommendation_dir
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        # Modification times of the directories, and monotonic time, when last refreshed
+        self._directory_mtimes: Optional[Tuple[int, int]] = None
+        self._refreshed_at = 0.0
+        self._refresh_lock = threading.Lock()
+        with transaction(self.path, self.timeout) as connection:
+            connection.executescript(_SCHEMA)
+
+    def _row(self, schema_path: Path, schema: Mapping[str, Any]) -> Tuple[Any, ...]:
+        """Makes the row of a schema file.
+
+        Args:
+            schema_path: Path to the schema file.
+            schema: Content of the schema file.
+
+        Returns:
+            Values of the row's columns.
+        """
+        stat = schema_path.stat()
+        augmented = (self.recommendation_dir / f"{schema_path.stem}.json").exists()
+        return (
+            schema_path.stem,
+            schema["schema_id"],
+            schema["schema_name"],
+            schema["schema_dscpt"],
+            schema["schema_version"],
+            stat.st_mtime_ns,
+            stat.st_size,
+            augmented,
+        )
+
+    def add(self, schema_path: Path, schema: Mapping[str, Any]) -> None:
+        """Adds or updates a schema which was just saved, without parsing its file.
+
+        Args:
+            schema_path: Path to the schema file.
+            schema: Content of the schema file.
+        """
+        with transaction(self.path, self.timeout) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO schemas VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                self._row(schema_path, schema),
+            )
+
+    def set_augmented(self, file: str, augmented: bool = True) -> None:
+        """Records whether a schema has event recommendations.
+
+        Args:
+            file: Name of the schema file without its extension.
+            augmented: Whether the schema has recommendations.
+        """
+        with transaction(self.path, self.timeout) as connection:
+            connection.execute("UPDATE schemas SET augmented = ? WHERE file = ?", (augmented, file))
+
+    def _directory_mtimes_now(self) -> Tuple[int, int]:
+        """Gets the modification times of the schema and recommendation directories.
+
+        Returns:
+            Modification times in nanoseconds.
+        """
+        return self.schema_dir.stat().st_mtime_ns, self.recommendation_dir.stat().st_mtime_ns
+
+    def refresh_if_changed(self) -> Optional[int]:
+        """Refreshes the catalog if files were added, replaced, or deleted since the last refresh.
+
+        Schemas and recommendations are written to temporary files which replace the originals, so
+        each write changes the modification time of its directory. Checking that takes the same
+        time however many schemas there are. Files edited in place are picked up once the refresh
+        interval has passed.
+
+        Returns:
+            Number of schema files which were parsed, or None if the catalog wasn't refreshed.
+        """
+        with self._refresh_lock:
+            mtimes = self._directory_mtimes_now()
+            if (
+                mtimes == self._directory_mtimes
+                and time.monotonic() - self._refreshed_at < self.refresh_interval
+            ):
+                return None
+            return self._refresh(mtimes)
+
+    def refresh(self) -> int:
+        """Brings the catalog up to date with the schema and recommendation directories.
+
+        Returns:
+            Number of schema files which were parsed.
+        """
+        with self._refresh_lock:
+            return self._refresh(self._directory_mtimes_now())
+
+    def _refresh(self, mtimes: Tuple[int, int]) -> int:
+        """Brings the catalog up to date, recording the state of the directories it reflects.
+
+        Args:
+            mtimes: Modification times of the directories, taken before listing them so that
+                changes made while listing are seen by the next refresh.
+
+        Returns:
+            Number of schema files which were parsed.
+        """
+        with transaction(self.path, self.timeout) as connection:
+            known: MutableMapping[str, Tuple[int, int, bool]] = {
+                row["file"]: (row["mtime_ns"], row["size"], bool(row["augmented"]))
+                for row in connection.execute("SELECT file, mtime_ns, size, augmented FROM schemas")
+            }
+        recommended = {
+            name[: -len(".json")]
+            for name in os.listdir(self.recommendation_dir)
+            if name.endswith(".json")
+        }
+
+        added: List[Tuple[Any, ...]] = []
+        augmented: List[Tuple[bool, str]] = []
+        with os.scandir(self.schema_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".yaml") or not entry.is_file():
+                    continue
+                file = entry.name[: -len(".yaml")]
+                stat = entry.stat()
+                known_file = known.pop(file, None)
+                if known_file is None or known_file[:2] != (stat.st_mtime_ns, stat.st_size):
+                    schema_path = Path(entry.path)
+                    with schema_path.open(encoding="utf-8") as schema_file:
+                        added.append(self._row(schema_path, yaml_io.load(schema_file)[0]))
+                elif known_file[2] != (file in recommended):
+                    augmented.append((file in recommended, file))
+
+        with transaction(self.path, self.timeout) as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO schemas VALUES (?, ?, ?, ?, ?, ?, ?, ?)", added
+            )
+            connection.executemany("UPDATE schemas SET augmented = ? WHERE file = ?", augmented)
+            # Files left over were deleted
+            connection.executemany(
+                "DELETE FROM schemas WHERE file = ?", [(file,) for file in known]
+            )
+        self._directory_mtimes = mtimes
+        self._refreshed_at = time.monotonic()
+        return len(added)
+
+    def entries(
+        self,
+        query: str = "",
+        prefix: bool = False,
+        sort: str = "file",
+        latest_only: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Mapping[str, Any]], Optional[str]]:
+        """Lists a page of the schemas in the catalog.
+
+        Pages are selected by the position of their last entry rather than by offset, so every page
+        takes the same time to list, and no entries are skipped or repeated if schemas are saved
+        in the meantime.
+
+        Args:
+            query: Text which schema IDs or names must contain, ignoring case.
+            prefix: Whether schema IDs or names must start with the query, rather than contain it.
+            sort: Sort order; one of `file` (by file name), `newest`, or `oldest` (by version).
+            latest_only: Whether to only list the latest version of each schema ID.
+            limit: Maximum number of entries in the page, or None for all of them.
+            cursor: Cursor returned with the previous page, or None for the first page.
+
+        Returns:
+            File name without extension, ID, name, description, display timestamp, and whether
+            there are event recommendations, for each schema in the page. Also returns the cursor
+            of the next page, or None if this is the last page.
+
+        Raises:
+            ValueError: If the sort order or cursor is invalid.
+        """
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"Sort order must be one of {', '.join(SORT_ORDERS)}: {sort}")
+        columns, descending = SORT_ORDERS[sort]
+        conditions: List[str] = []
+        parameters: List[Any] = []
+        if query:
+            pattern = _escape_like(query) + "%" if prefix else f"%{_escape_like(query)}%"
+            conditions.append("(schema_id LIKE ? ESCAPE '\\' OR schema_name LIKE ? ESCAPE '\\')")
+            parameters += [pattern, pattern]
+        if latest_only:
+            conditions.append(
+                "NOT EXISTS (SELECT 1 FROM schemas AS newer WHERE newer.schema_id = schemas.schema_id "
+                "AND newer.schema_version > schemas.schema_version)"
+            )
+        if cursor is not None:
+            key = decode_cursor(sort, cursor)
+            operator = "<" if descending else ">"
+            # Expanded form of (a, b) > (x, y), since row values need SQLite 3.15
+            alternatives = []
+            for i, column in enumerate(columns):
+                equal = [f"{previous} = ?" for previous in columns[:i]]
+                alternatives.append(" AND ".join(equal + [f"{column} {operator} ?"]))
+                parameters += key[: i + 1]
+            conditions.append("(" + " OR ".join(f"({term})" for term in alternatives) + ")")
+
+        sql = (
+            "SELECT file, schema_id, schema_name, schema_dscpt, schema_version, augmented "
+            "FROM schemas"
+        )
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        direction = "DESC" if descending else "ASC"
+        sql += " ORDER BY " + ", ".join(f"{column} {direction}" for column in columns)
+        if limit is not None:
+            # One more row tells whether there is another page
+            sql += " LIMIT ?"
+            parameters.append(limit + 1)
+        with transaction(self.path, self.timeout) as connection:
+            rows = connection.execute(sql, parameters).fetchall()
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort, [rows[-1][column] for column in columns])
+        entries: List[Mapping[str, Any]] = [
+            {
+                "file": row["file"],
+                "schema_id": row["schema_id"],
+                "schema_name": row["schema_name"],
+                "schema_dscpt": row["schema_dscpt"],
+                "timestamp": display_timestamp(row["schema_version"]),
+                "augmentation_flag": bool(row["augmented"]),
+            }
+            for row in rows
+        ]
+        return entries, next_cursor
@@ -0,0 +1,147 @@
+# noqa
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import yaml
+
+from pycurator.common.schema_catalog import SchemaCatalog
+
+
+def write_schema(  # noqa
+    path: Path,
+    name: str,
+    schema_id: str = "cx:Attack",
+    version: str = "2021-04-30-12-34-56-789012",
+) -> None:
+    schema = {
+        "schema_id": schema_id,
+        "schema_name": name,
+        "schema_dscpt": "An attack",
+        "schema_version": version,
+    }
+    path.write_text(yaml.dump([schema]))
+
+
+class TestSchemaCatalog(TestCase):  # noqa
+    def test_refresh(self) -> None:  # noqa
+        with TemporaryDirectory() as temp_dir:
+            schema_dir = Path(temp_dir) / "schemas"
+            recommendation_dir = Path(temp_dir) / "recommendations"
+            schema_dir.mkdir()
+            recommendation_dir.mkdir()
+            catalog = SchemaCatalog(
+                Path(temp_dir) / "catalog.sqlite", schema_dir, recommendation_dir
+            )
+            write_schema(schema_dir / "a.yaml", "Attack")
+            write_schema(schema_dir / "b.yaml", "Bombing")
+            (schema_dir / "notes.txt").write_text("not a schema")
+
+            self.assertEqual(catalog.refresh(), 2)
+            self.assertEqual(catalog.refresh(), 0)
+            entries, _ = catalog.entries()
+            self.assertEqual([entry["file"] for entry in entries], ["a", "b"])
+            self.assertEqual(entries[0]["schema_name"], "Attack")
+            self.assertEqual(entries[0]["timestamp"], "2021-04-30, 12:34:56")
+            self.assertFalse(entries[0]["augmentation_flag"])
+
+            (recommendation_dir / "a.json").write_text("{}")
+            write_schema(schema_dir / "b.yaml", "Bombing attack")
+            os.utime(schema_dir / "b.yaml", ns=(0, 0))
+            os.remove(schema_dir / "a.yaml")
+            write_schema(schema_dir / "a.yaml", "Attack")
+            os.utime(schema_dir / "a.yaml", ns=(0, 0))
+            self.assertEqual(catalog.refresh(), 2)
+            entries, _ = catalog.entries()
+            self.assertTrue(entries[0]["augmentation_flag"])
+            self.assertEqual(entries[1]["schema_name"], "Bombing attack")
+
+            (recommendation_dir / "a.json").unlink()
+            self.assertEqual(catalog.refresh(), 0)
+            self.assertFalse(catalog.entries()[0][0]["augmentation_flag"])
+
+            (schema_dir / "b.yaml").unlink()
+            catalog.refresh()
+            self.assertEqual([entry["file"] for entry in catalog.entries()[0]], ["a"])
+
+    def test_refresh_if_changed(self) -> None:  # noqa
+        with TemporaryDirectory() as temp_dir:
+            # The database is kept apart, since writing it changes its directory
+            schema_dir = Path(temp_dir) / "schemas"
+            schema_dir.mkdir()
+            catalog = SchemaCatalog(
+                Path(temp_dir) / "catalog.sqlite", schema_dir, schema_dir, refresh_interval=60
+            )
+            write_schema(schema_dir / "a.yaml", "Attack")
+            self.assertEqual(catalog.refresh_if_changed(), 1)
+            self.assertIsNone(catalog.refresh_if_changed())
+
+            # Editing a file in place doesn't change the directory
+            mtime = schema_dir.stat().st_mtime_ns
+            write_schema(schema_dir / "a.yaml", "Armed attack")
+            os.utime(schema_dir, ns=(mtime, mtime))
+            self.assertIsNone(catalog.refresh_if_changed())
+            self.assertEqual(catalog.entries()[0][0]["schema_name"], "Attack")
+
+            write_schema(schema_dir / "b.yaml", "Bombing")
+            os.utime(schema_dir, ns=(mtime + 1, mtime + 1))
+            self.assertEqual(catalog.refresh_if_changed(), 2)
+            self.assertEqual(catalog.entries()[0][0]["schema_name"], "Armed attack")
+
+            catalog.refresh_interval = 0
+            self.assertEqual(catalog.refresh_if_changed(), 0)
+
+    def test_add(self) -> None:  # noqa
+        with TemporaryDirectory() as temp_dir:
+            catalog = SchemaCatalog(
+                Path(temp_dir) / "catalog.sqlite", Path(temp_dir), Path(temp_dir)
+            )
+            schema_path = Path(temp_dir) / "a.yaml"
+            write_schema(schema_path, "Attack")
+            catalog.add(schema_path, yaml.safe_load(schema_path.read_text())[0])
+            catalog.set_augmented("a")
+            self.assertTrue(catalog.entries()[0][0]["augmentation_flag"])
+            self.assertEqual(catalog.refresh(), 0)
+
+    def test_entries(self) -> None:  # noqa
+        with TemporaryDirectory() as temp_dir:
+            schema_dir = Path(temp_dir)
+            catalog = SchemaCatalog(schema_dir / "catalog.sqlite", schema_dir, schema_dir)
+            for schema_id, name in (("cx:Attack", "Attack"), ("cx:Bomb_ing", "Bombing attack")):
+                for day in range(1, 4):
+                    version = f"2021-05-0{day}-12-00-00-000000"
+                    write_schema(
+                        schema_dir / f"{schema_id}_{version}.yaml", name, schema_id, version
+                    )
+            catalog.refresh()
+
+            files = []
+            entries, cursor = catalog.entries(sort="newest", limit=4)
+            files += [entry["file"] for entry in entries]
+            self.assertIsNotNone(cursor)
+            entries, cursor = catalog.entries(sort="newest", limit=4, cursor=cursor)
+            files += [entry["file"] for entry in entries]
+            self.assertIsNone(cursor)
+            all_entries, _ = catalog.entries()
+            self.assertEqual(
+                files,
+                sorted(
+                    (entry["file"] for entry in all_entries),
+                    key=lambda file: (file.rsplit("_", 1)[1], file),
+                    reverse=True,
+                ),
+            )
+            with self.assertRaises(ValueError):
+                catalog.entries(sort="oldest", cursor=cursor or catalog.entries(limit=1)[1])
+
+            entries, _ = catalog.entries(query="ATTACK", latest_only=True)
+            self.assertEqual(
+                [entry["timestamp"] for entry in entries], ["2021-05-03, 12:00:00"] * 2
+            )
+            entries, _ = catalog.entries(query="attack", prefix=True)
+            self.assertEqual({entry["schema_name"] for entry in entries}, {"Attack"})
+            entries, _ = catalog.entries(query="x:bomb_", prefix=False)
+            self.assertEqual(len(entries), 3)
+            entries, _ = catalog.entries(query="x:bomb%")
+            self.assertEqual(entries, [])
@@ -3,37 +3,41 @@
 from http import HTTPStatus
 import json
 import logging
-import os
 from pathlib import Path
-from typing import Any, Tuple
-import urllib
+from typing import Any, Dict, Mapping, Tuple
 
-from flask import Flask, abort, jsonify, request
+from flask import Flask, Response, abort, jsonify, request
 from flask_cors import CORS
-from pyinflect import getInflection
 import requests
 from requests import RequestException
+from sdf import yaml_io
 from sdf.ontology import ontology
 import spacy
-import yaml
 
 from pycurator.common.config import settings
 from pycurator.common.logger import return_logger
 from pycurator.common.paths import (
     EVENT_REC_DIR,
-    KGTK_EVENT_CACHE,
-    KGTK_REFVAR_CACHE,
     LOG_DIR,
     SCHEMA_DIR,
 )
+from pycurator.common.schema_catalog import SchemaCatalog
 from pycurator.flask_backend import make_yaml
-from pycurator.flask_backend.event_prediction import init_embeddings, init_ss_model, request_top_n
-from pycurator.flask_backend.utils import consistent_refvars, contains_cycle, get_verb_lemma
-from pycurator.flask_backend.wikidata_linking import (
-    filter_duplicate_candidates,
-    get_request_kgtk,
-    wikidata_topk,
+from pycurator.flask_backend.disambiguation import Disambiguator
+from pycurator.flask_backend.embedding_cache import CachedEncoder
+from pycurator.flask_backend.event_prediction import (
+    SS_MODEL_NAME,
+    PrimitiveIndex,
+    init_embeddings,
+    init_ss_model,
+    request_top_n,
+    request_top_n_batch,
 )
+from pycurator.flask_backend.kgtk_store import KgtkStore
+from pycurator.flask_backend.qnode_embeddings import QnodeEmbeddingStore
+from pycurator.flask_backend.schema_cache import SchemaResponseCache
+from pycurator.flask_backend.sdf_conversion import ConversionQueue
+from pycurator.flask_backend.utils import consistent_refvars, contains_cycle
 from pycurator.gpt2_component.filter import DefaultCriteria
 from pycurator.gpt2_component.gpt2 import convert_sequence_to_text
 
@@ -49,7 +53,18 @@ logger = return_logger(LOG_DIR / Path("app.log"))
 
 # Resources initialization for sentence similarity model
 SS_MODEL = init_ss_model()
-DEFINITION_EMBEDDINGS, TEMPLATE_EMBEDDINGS = init_embeddings(SS_MODEL)
+PRIMITIVE_INDEX = PrimitiveIndex(*init_embeddings(SS_MODEL))
+# Shared by all endpoints, since they often encode the same text
+SS_ENCODER = CachedEncoder(SS_MODEL, SS_MODEL_NAME, settings.embedding_cache_bytes)
+
+KGTK_STORE = KgtkStore()
+QNODE_STORE = QnodeEmbeddingStore(SS_MODEL_NAME)
+DISAMBIGUATOR = Disambiguator(nlp, SS_ENCODER, KGTK_STORE, QNODE_STORE)
+
+SCHEMA_CATALOG = SchemaCatalog()
+MAX_SCHEMA_PAGE_SIZE = 1000
+SCHEMA_RESPONSE_CACHE = SchemaResponseCache(settings.schema_cache_entries)
+CONVERSION_QUEUE = ConversionQueue()
 
 
 @app.route("/")
@@ -119,9 +134,37 @@ def get_top3() -> Any:
     json_return = request_top_n(
         description,
         n=3,
-        ss_model=SS_MODEL,
-        definition_embeddings=DEFINITION_EMBEDDINGS,
-        template_embeddings=TEMPLATE_EMBEDDINGS,
+        ss_model=SS_ENCODER,
+        index=PRIMITIVE_INDEX,
+    )
+
+    return jsonify(json_return)
+
+
+@app.route("/api/get_top3_batch", methods=["POST"])
+def get_top3_batch() -> Any:
+    """Gets top 3 primitive subtypes for each of several English phrases.
+
+    All phrases are encoded at once, so that loading a schema doesn't require a request per event.
+
+    Returns:
+        A JSON response containing a list of predictions for each phrase, in the same format as
+        `get_top3`. Empty phrases get an empty list.
+    """
+    if not request.json:
+        abort(HTTPStatus.BAD_REQUEST)
+
+    descriptions = request.json.get("event_descriptions")
+    if not isinstance(descriptions, list) or not all(
+        isinstance(description, str) for description in descriptions
+    ):
+        abort(HTTPStatus.BAD_REQUEST)
+
+    json_return = request_top_n_batch(
+        descriptions,
+        n=3,
+        ss_model=SS_ENCODER,
+        index=PRIMITIVE_INDEX,
     )
 
     return jsonify(json_return)
@@ -131,6 +174,9 @@ def get_top3() -> Any:
 def save_schema() -> Tuple[Any, int]:
     """Creates a schema from collected information.
 
+    The response is sent once the schema's YAML file is written. Its conversion to SDF is queued,
+    and its status can be polled with `/api/get_conversion_status`.
+
     Returns:
         A JSON response of the schema filename and the schema itself. If the provided schema
         contains a cycle, an error message is returned instead.
@@ -156,16 +202,20 @@ def save_schema() -> Tuple[Any, int]:
         json_return = {"fname": "err", "output": "refvar constraints not consistent"}
         return json_return, HTTPStatus.BAD_REQUEST
 
-    yaml_file = make_yaml.save_schema(
-        make_yaml.create_schema(
-            events=events,
-            links=links,
-            tracking=tracking,
-            schema_id=schema_id,
-            schema_name=schema_name,
-            schema_dscpt=schema_dscpt,
-        ),
-        output_directory=SCHEMA_DIR,
+    schema = make_yaml.create_schema(
+        events=events,
+        links=links,
+        tracking=tracking,
+        schema_id=schema_id,
+        schema_name=schema_name,
+        schema_dscpt=schema_dscpt,
+    )
+    yaml_file = make_yaml.save_schema(schema, output_directory=SCHEMA_DIR)
+    # Conversion to SDF only validates the schema, so it doesn't hold up the response
+    CONVERSION_QUEUE.submit(yaml_file)
+    SCHEMA_CATALOG.add(
+        yaml_file,
+        schema.dict(include={"schema_id", "schema_name", "schema_dscpt", "schema_version"}),
     )
 
     yaml_output = yaml_file.read_text()
@@ -173,52 +223,76 @@ def save_schema() -> Tuple[Any, int]:
     return json_return, HTTPStatus.CREATED
 
 
+@app.route("/api/get_conversion_status", methods=["GET"])
+def get_conversion_status() -> Any:
+    """Gets the status of the conversion to SDF of a saved schema.
+
+    Returns:
+        A JSON response with the state of the conversion (queued, running, finished, or failed),
+        and its error message if it failed.
+    """
+    if not request.args:
+        abort(HTTPStatus.BAD_REQUEST)
+    requested_file = request.args.get("schemaFile", default="")
+    conversion = CONVERSION_QUEUE.status(requested_file)
+    if conversion is None:
+        abort(HTTPStatus.NOT_FOUND)
+    return {"fname": conversion.file, "state": conversion.state, "error": conversion.error}
+
+
 @app.route("/api/get_saved_schemas", methods=["GET"])
 def get_saved_schemas() -> Any:
-    """Lists file and display names of all saved schemas.
+    """Lists file and display names of saved schemas, a page at a time.
 
-    File extensions are stripped, and the names are sorted.
+    File extensions are stripped. Schemas are listed from the catalog, whose directories are only
+    rescanned if files were added, replaced, or deleted since the last scan, or periodically. The
+    optional URL parameters are:
+
+    - `q`: Text which schema IDs or names must contain, ignoring case.
+    - `match`: `substring` (the default) or `prefix`, for IDs or names starting with `q`.
+    - `sort`: `file` (by file name, the default), `newest`, or `oldest`.
+    - `latest`: `true` to only list the latest version of each schema ID.
+    - `limit`: Maximum number of schemas to return, up to `MAX_SCHEMA_PAGE_SIZE`. All schemas are
+        returned if it is missing.
+    - `cursor`: The `nextCursor` of the previous page.
 
     Returns:
-        A JSON response.
+        A JSON response with the page of schemas, and the cursor of the next page, which is null on
+        the last page.
     """
-    schema_paths = sorted(p for p in SCHEMA_DIR.glob("*.yaml"))
-    display_files = []
-    for schema_path in schema_paths:
-        with open(schema_path) as f:
-            content = yaml.safe_load(f)[0]
-        schema_id = content["schema_id"]
-        schema_name = content["schema_name"]
-        schema_dscpt = content["schema_dscpt"]
-        timestamp = content["schema_version"].split("-")
-        time_stamp = "-".join(timestamp[:3]) + ", " + ":".join(timestamp[3:6])
-
-        augmentation_flag = os.path.exists(EVENT_REC_DIR / f"{schema_path.stem}.json")
-        display_files.append(
-            {
-                "file": schema_path.stem,
-                "schema_id": schema_id,
-                "schema_name": schema_name,
-                "schema_dscpt": schema_dscpt,
-                "timestamp": time_stamp,
-                "augmentation_flag": augmentation_flag,
-            }
+    match = request.args.get("match", default="substring")
+    limit = request.args.get("limit", type=int)
+    if match not in ("substring", "prefix") or (
+        limit is not None and not 0 < limit <= MAX_SCHEMA_PAGE_SIZE
+    ):
+        abort(HTTPStatus.BAD_REQUEST)
+    SCHEMA_CATALOG.refresh_if_changed()
+    try:
+        entries, next_cursor = SCHEMA_CATALOG.entries(
+            query=request.args.get("q", default=""),
+            prefix=match == "prefix",
+            sort=request.args.get("sort", default="file"),
+            latest_only=request.args.get("latest", default="false").lower() == "true",
+            limit=limit,
+            cursor=request.args.get("cursor"),
         )
-    return {"schemaFiles": display_files}
+    except ValueError:
+        abort(HTTPStatus.BAD_REQUEST)
+    return {"schemaFiles": entries, "nextCursor": next_cursor}
 
 
-@app.route("/api/get_schema", methods=["GET"])
-def get_schema() -> Any:
-    """Loads a saved schema and event recommendations (if any) from two files.
+def build_schema_response(schema_path: Path, recommendation_path: Path) -> Mapping[str, Any]:
+    """Builds the response for a saved schema and its event recommendations (if any).
+
+    Args:
+        schema_path: Path to the schema file.
+        recommendation_path: Path to the schema's recommendation file, which may not exist.
 
     Returns:
-        A JSON response.
+        Schema ID, name, description, events, order, and recommended events.
     """
-    if not request.args:
-        abort(HTTPStatus.BAD_REQUEST)
-    requested_file = request.args.get("schemaFile")
-    with (SCHEMA_DIR / f"{requested_file}.yaml").open() as y_file:
-        yaml_output = yaml.safe_load(y_file)[0]
+    with schema_path.open(encoding="utf-8") as y_file:
+        yaml_output = yaml_io.load(y_file)[0]
     events = []
     for event_index, step in enumerate(yaml_output["steps"], start=1):
         if "required" not in step:
@@ -239,14 +313,14 @@ def get_schema() -> Any:
 
     rec_events = []
     try:
-        with (EVENT_REC_DIR / f"{requested_file}.json").open() as rec_file:
+        with recommendation_path.open(encoding="utf-8") as rec_file:
             recommendations = json.load(rec_file)
             for key in recommendations["events"].keys():
                 rec_list = [key]
                 rec_list.extend(recommendations["events"][key])
                 rec_events.append(rec_list)
     except IOError:
-        print(f"Recommendations not found for {requested_file}")
+        print(f"Recommendations not found for {schema_path.stem}")
 
     yaml_response = {
         "schema_id": yaml_output["schema_id"],
@@ -259,6 +333,41 @@ def get_schema() -> Any:
     return yaml_response
 
 
+@app.route("/api/get_schema", methods=["GET"])
+def get_schema() -> Any:
+    """Loads a saved schema and event recommendations (if any) from two files.
+
+    Responses are cached until either file changes, and are tagged so that clients can revalidate
+    them with `If-None-Match`.
+
+    Returns:
+        A JSON response, or an empty response if the client's copy is up to date.
+    """
+    if not request.args:
+        abort(HTTPStatus.BAD_REQUEST)
+    requested_file = request.args.get("schemaFile")
+    schema_path = SCHEMA_DIR / f"{requested_file}.yaml"
+    recommendation_path = EVENT_REC_DIR / f"{requested_file}.json"
+    etag = SCHEMA_RESPONSE_CACHE.etag(schema_path, recommendation_path)
+    if etag is None:
+        abort(HTTPStatus.NOT_FOUND)
+    if request.if_none_match.contains(etag):
+        not_modified = Response(status=HTTPStatus.NOT_MODIFIED)
+        not_modified.set_etag(etag)
+        return not_modified
+    try:
+        etag, yaml_response = SCHEMA_RESPONSE_CACHE.get(
+            schema_path, recommendation_path, build_schema_response
+        )
+    except FileNotFoundError:
+        abort(HTTPStatus.NOT_FOUND)
+    response = jsonify(yaml_response)
+    response.set_etag(etag)
+    # Browsers revalidate their copy on every load instead of guessing whether it's fresh
+    response.cache_control.no_cache = True
+    return response
+
+
 @app.route("/api/disambiguate_verb_kgtk", methods=["POST"])
 def disambiguate_verb_kgtk() -> Any:
     """Disambiguates verbs from event description and return candidate qnodes.
@@ -268,34 +377,7 @@ def disambiguate_verb_kgtk() -> Any:
     """
     if not request.json:
         abort(HTTPStatus.BAD_REQUEST)
-    event_description = request.json["event_description"]
-    cleaned_description = event_description.replace("/", " ").replace("_", " ")
-    event_verb = get_verb_lemma(nlp, cleaned_description)
-    cached_file = KGTK_EVENT_CACHE / f"{event_verb}.json"
-    if cached_file.is_file():
-        with open(cached_file) as f:
-            return json.load(f)
-    kgtk_json = get_request_kgtk(event_verb)
-    event_verb_participle = getInflection(event_verb, tag="VBG")
-    if event_verb_participle and event_verb_participle != event_verb:
-        kgtk_json += get_request_kgtk(event_verb_participle[0])
-    if not kgtk_json:
-        return {"event_verb": kgtk_json, "options": []}
-    unique_candidates = filter_duplicate_candidates(kgtk_json)
-    options = []
-    top3 = wikidata_topk(SS_MODEL, cleaned_description, unique_candidates, k=3)
-    for candidate in top3:
-        option = {
-            "qnode": candidate["qnode"],
-            "rawName": candidate["label"][0],
-            "definition": candidate["description"][0],
-        }
-        if option not in options:
-            options.append(option)
-    response = {"event_verb": event_verb, "options": options}
-    with open(cached_file, "w") as f:
-        json.dump(response, f)
-    return response
+    return DISAMBIGUATOR.disambiguate_verb(request.json["event_description"])
 
 
 @app.route("/api/disambiguate_refvar_kgtk", methods=["POST"])
@@ -307,36 +389,7 @@ def disambiguate_refvar_kgtk() -> Any:
     """
     if not request.json:
         abort(HTTPStatus.BAD_REQUEST)
-    refvar = request.json["refvar"].lower()
-    cleaned_refvar = refvar.replace("/", " ").replace("_", " ")
-    cached_file = KGTK_REFVAR_CACHE / f"{cleaned_refvar}.json"
-    if cached_file.is_file():
-        with open(cached_file) as f:
-            return json.load(f)
-    kgtk_json = get_request_kgtk(cleaned_refvar)
-    if not kgtk_json:
-        return {"event_verb": kgtk_json, "options": []}
-    if len(cleaned_refvar.split()) < 2:
-        lemma_refvar = nlp(cleaned_refvar)[0].lemma_
-        if lemma_refvar != cleaned_refvar:
-            kgtk_json += get_request_kgtk(lemma_refvar)
-    unique_candidates = filter_duplicate_candidates(kgtk_json)
-    options = []
-    top3 = wikidata_topk(SS_MODEL, refvar, unique_candidates, k=3)
-    for candidate in top3:
-        # description can be empty sometimes on less popular qnodes
-        definition = "" if len(candidate["description"]) < 1 else candidate["description"][0]
-        option = {
-            "qnode": candidate["qnode"],
-            "rawName": candidate["label"][0],
-            "definition": definition,
-        }
-        if option not in options:
-            options.append(option)
-    response = {"refvar": refvar, "options": options}
-    with open(cached_file, "w") as f:
-        json.dump(response, f)
-    return response
+    return DISAMBIGUATOR.disambiguate_refvar(request.json["refvar"])
 
 
 @app.route("/api/get_gpt2_suggestions", methods=["GET"])
@@ -361,13 +414,13 @@ def get_gpt2_suggestions() -> Any:
         schema_desc=schema_dscpt,
         sequence=events,
     )
-    text_formatted = urllib.parse.quote(text)
+    num_suggestions = 5
 
-    request_url = (
-        f"http://{settings.gpt2_server}.example.org:5001/api/get_prediction?text={text_formatted}"
-    )
+    request_url = f"http://{settings.gpt2_server}.example.org:5001/api/get_prediction"
+    # The server stops sampling once enough predictions pass the same filter used below
+    request_params: Dict[str, Any] = {"text": text, "events": events, "keep": num_suggestions}
     try:
-        request_response = requests.get(request_url, timeout=30)
+        request_response = requests.get(request_url, params=request_params, timeout=30)
     except RequestException as ex:
         logger.error(ex)
         abort(HTTPStatus.INTERNAL_SERVER_ERROR)
@@ -376,13 +429,28 @@ def get_gpt2_suggestions() -> Any:
         abort(HTTPStatus.INTERNAL_SERVER_ERROR)
     predictions = request_response.json()["predictions"]
 
-    gpt2_filter = DefaultCriteria(existing_events=set(events), keep=5)
+    gpt2_filter = DefaultCriteria(existing_events=set(events), keep=num_suggestions)
     suggestions = sorted(gpt2_filter.meet_criteria(predictions))
 
     response = {"suggestions": suggestions}
     return response
 
 
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics() -> Any:
+    """Gets statistics of the sentence embedding, KGTK, qnode embedding, and schema caches.
+
+    Returns:
+        A JSON response.
+    """
+    return {
+        "embedding_cache": SS_ENCODER.stats(),
+        "kgtk_cache": KGTK_STORE.stats(),
+        "qnode_embeddings": {"hits": QNODE_STORE.hits, "misses": QNODE_STORE.misses},
+        "schema_cache": SCHEMA_RESPONSE_CACHE.stats(),
+    }
+
+
 if __name__ == "__main__":
     app.run(debug=True, load_dotenv=False)
 else:
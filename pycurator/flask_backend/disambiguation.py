@@ -0,0 +1,192 @@
+"""Disambiguation of event verbs and refvars into Wikidata qnodes, with cached KGTK results."""
+
+import threading
+from typing import Any, List, Mapping, Optional, Sequence
+
+from pyinflect import getInflection
+from spacy.language import Language
+
+from pycurator.flask_backend.embedding_cache import Encoder
+from pycurator.flask_backend.kgtk_store import (
+    CANDIDATES,
+    EVENT_RESPONSES,
+    REFVAR_RESPONSES,
+    KgtkStore,
+)
+from pycurator.flask_backend.qnode_embeddings import QnodeEmbeddingStore
+from pycurator.flask_backend.utils import get_verb_lemma
+from pycurator.flask_backend.wikidata_linking import (
+    filter_duplicate_candidates,
+    get_requests_kgtk,
+    wikidata_topk,
+)
+
+
+def clean_text(text: str) -> str:
+    """Replaces separators in event descriptions and refvars with spaces.
+
+    Args:
+        text: Event description or refvar.
+
+    Returns:
+        Cleaned text.
+    """
+    return text.replace("/", " ").replace("_", " ")
+
+
+class Disambiguator:
+    """Finds the qnodes best matching event verbs and refvars, caching responses."""
+
+    def __init__(
+        self,
+        nlp: Language,
+        ss_model: Encoder,
+        kgtk_store: KgtkStore,
+        qnode_store: Optional[QnodeEmbeddingStore] = None,
+    ) -> None:
+        """Constructor.
+
+        Args:
+            nlp: spaCy pipeline.
+            ss_model: SentenceTransformer model, or cache wrapping it.
+            kgtk_store: Cache of KGTK candidates and responses.
+            qnode_store: Store of candidate description embeddings.
+        """
+        self.nlp = nlp
+        self.ss_model = ss_model
+        self.kgtk_store = kgtk_store
+        self.qnode_store = qnode_store
+        # spaCy pipelines aren't guaranteed to be thread-safe
+        self._nlp_lock = threading.Lock()
+
+    def verb_lemma(self, event_description: str) -> str:
+        """Gets the lemma of an event description's verb, which is its key in the cache.
+
+        Args:
+            event_description: Event description.
+
+        Returns:
+            Lemma of the verb.
+        """
+        with self._nlp_lock:
+            return get_verb_lemma(self.nlp, clean_text(event_description))
+
+    def lookup(self, queries: Sequence[str]) -> Sequence[Optional[List[Mapping[str, Any]]]]:
+        """Gets KGTK candidates for queries, from the cache if possible.
+
+        Queries which aren't cached are submitted concurrently.
+
+        Args:
+            queries: Strings to query against KGTK's Wikidata.
+
+        Returns:
+            A list of candidates for each query, or None for queries which failed.
+        """
+        results: List[Optional[List[Mapping[str, Any]]]] = [
+            self.kgtk_store.get(CANDIDATES, query) for query in queries
+        ]
+        missing = [i for i, candidates in enumerate(results) if candidates is None]
+        fetched = get_requests_kgtk([queries[i] for i in missing])
+        for i, candidates in zip(missing, fetched):
+            results[i] = candidates
+            # Failures aren't cached, so that they are retried once KGTK is back
+            if candidates is not None:
+                self.kgtk_store.put(CANDIDATES, queries[i], candidates, negative=not candidates)
+        return results
+
+    def disambiguate_verb(self, event_description: str) -> Mapping[str, Any]:
+        """Disambiguates the verb of an event description.
+
+        Args:
+            event_description: Event description.
+
+        Returns:
+            Lemma of the verb and up to three candidate qnodes.
+        """
+        cleaned_description = clean_text(event_description)
+        event_verb = self.verb_lemma(event_description)
+        cached_response: Optional[Mapping[str, Any]] = self.kgtk_store.get(
+            EVENT_RESPONSES, event_verb
+        )
+        if cached_response is not None:
+            return cached_response
+        queries = [event_verb]
+        event_verb_participle = getInflection(event_verb, tag="VBG")
+        if event_verb_participle and event_verb_participle != event_verb:
+            queries.append(event_verb_participle[0])
+        results = self.lookup(queries)
+        complete = None not in results
+        kgtk_json = [candidate for candidates in results for candidate in candidates or []]
+        if not kgtk_json:
+            empty_response = {"event_verb": kgtk_json, "options": []}
+            if complete:
+                self.kgtk_store.put(EVENT_RESPONSES, event_verb, empty_response, negative=True)
+            return empty_response
+        unique_candidates = filter_duplicate_candidates(kgtk_json)
+        options = []
+        top3 = wikidata_topk(
+            self.ss_model, cleaned_description, unique_candidates, k=3, qnode_store=self.qnode_store
+        )
+        for candidate in top3:
+            option = {
+                "qnode": candidate["qnode"],
+                "rawName": candidate["label"][0],
+                "definition": candidate["description"][0],
+            }
+            if option not in options:
+                options.append(option)
+        response = {"event_verb": event_verb, "options": options}
+        if complete:
+            self.kgtk_store.put(EVENT_RESPONSES, event_verb, response, negative=not options)
+        return response
+
+    def disambiguate_refvar(self, refvar: str) -> Mapping[str, Any]:
+        """Disambiguates a refvar.
+
+        Args:
+            refvar: Refvar.
+
+        Returns:
+            Lowercased refvar and up to three candidate qnodes.
+        """
+        refvar = refvar.lower()
+        cleaned_refvar = clean_text(refvar)
+        cached_response: Optional[Mapping[str, Any]] = self.kgtk_store.get(
+            REFVAR_RESPONSES, cleaned_refvar
+        )
+        if cached_response is not None:
+            return cached_response
+        queries = [cleaned_refvar]
+        if len(cleaned_refvar.split()) < 2:
+            with self._nlp_lock:
+                lemma_refvar = self.nlp(cleaned_refvar)[0].lemma_
+            if lemma_refvar != cleaned_refvar:
+                queries.append(lemma_refvar)
+        results = self.lookup(queries)
+        complete = None not in results
+        kgtk_json = results[0] or []
+        if not kgtk_json:
+            empty_response = {"event_verb": kgtk_json, "options": []}
+            if results[0] is not None:
+                self.kgtk_store.put(REFVAR_RESPONSES, cleaned_refvar, empty_response, negative=True)
+            return empty_response
+        kgtk_json += [candidate for candidates in results[1:] for candidate in candidates or []]
+        unique_candidates = filter_duplicate_candidates(kgtk_json)
+        options = []
+        top3 = wikidata_topk(
+            self.ss_model, refvar, unique_candidates, k=3, qnode_store=self.qnode_store
+        )
+        for candidate in top3:
+            # description can be empty sometimes on less popular qnodes
+            definition = "" if len(candidate["description"]) < 1 else candidate["description"][0]
+            option = {
+                "qnode": candidate["qnode"],
+                "rawName": candidate["label"][0],
+                "definition": definition,
+            }
+            if option not in options:
+                options.append(option)
+        response = {"refvar": refvar, "options": options}
+        if complete:
+            self.kgtk_store.put(REFVAR_RESPONSES, cleaned_refvar, response, negative=not options)
+        return response
@@ -0,0 +1,142 @@
+"""Cache of sentence embeddings shared by all endpoints."""
+
+from collections import OrderedDict
+import threading
+from typing import Any, List, Mapping, MutableMapping, Sequence, Tuple, Union
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+import torch
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes text so that trivially different inputs share an embedding.
+
+    Args:
+        text: Text to be encoded.
+
+    Returns:
+        Text with runs of whitespace collapsed into single spaces and leading and trailing
+        whitespace removed.
+    """
+    return " ".join(text.split())
+
+
+class CachedEncoder:
+    """Wrapper of a SentenceTransformer which caches the embeddings of individual texts.
+
+    It can be used wherever the model's `encode` method is called. Embeddings are evicted in least
+    recently used order once their total size exceeds the limit.
+    """
+
+    def __init__(self, model: SentenceTransformer, model_id: str, max_bytes: int) -> None:
+        """Constructor.
+
+        Args:
+            model: SentenceTransformer model.
+            model_id: Name of the model, which is part of each cache key.
+            max_bytes: Maximum total size of the cached embeddings in bytes.
+        """
+        self.model = model
+        self.model_id = model_id
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._entries: MutableMapping[Tuple[str, str], torch.Tensor] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(
+        self,
+        sentences: Union[str, Sequence[str]],
+        batch_size: int = 32,
+        convert_to_tensor: bool = False,
+    ) -> Any:
+        """Encodes texts, only running the model on those which are not cached.
+
+        Args:
+            sentences: Text or list of texts to encode.
+            batch_size: Batch size for encoding uncached texts.
+            convert_to_tensor: Whether to return a tensor instead of a NumPy array.
+
+        Returns:
+            Embedding of the text, or embeddings of each text stacked along the first dimension, as
+            a tensor or NumPy array.
+        """
+        single = isinstance(sentences, str)
+        texts = (
+            [normalize_text(sentences)]
+            if isinstance(sentences, str)
+            else [normalize_text(text) for text in sentences]
+        )
+        if not texts:
+            return torch.empty(0) if convert_to_tensor else np.empty(0)
+
+        keys = [(self.model_id, text) for text in texts]
+        found: MutableMapping[Tuple[str, str], torch.Tensor] = {}
+        with self._lock:
+            for key in keys:
+                cached = self._entries.get(key)
+                if cached is not None:
+                    self._entries.move_to_end(key)  # type: ignore
+                    found[key] = cached
+            self.hits += sum(key in found for key in keys)
+            self.misses += sum(key not in found for key in keys)
+
+        missing: List[str] = list(dict.fromkeys(key[1] for key in keys if key not in found))
+        if missing:
+            encoded = self.model.encode(missing, batch_size=batch_size, convert_to_tensor=True)
+            with self._lock:
+                for text, row in zip(missing, encoded):
+                    # A row is a view which would keep the whole batch's storage alive
+                    embedding = row.detach().clone()
+                    key = (self.model_id, text)
+                    found[key] = embedding
+                    self._add(key, embedding)
+
+        embeddings = torch.stack([found[key] for key in keys])
+        if single:
+            embeddings = embeddings[0]
+        return embeddings if convert_to_tensor else embeddings.cpu().numpy()
+
+    def _add(self, key: Tuple[str, str], embedding: torch.Tensor) -> None:
+        """Adds an embedding, evicting the least recently used embeddings if necessary.
+
+        Must be called while holding the lock.
+
+        Args:
+            key: Model name and normalized text.
+            embedding: Embedding of the text.
+        """
+        if key in self._entries:
+            return
+        self._entries[key] = embedding
+        self._size += embedding.element_size() * embedding.nelement()
+        while self._size > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)  # type: ignore
+            self._size -= evicted.element_size() * evicted.nelement()
+            self.evictions += 1
+
+    def stats(self) -> Mapping[str, Any]:
+        """Summarizes the cache's activity.
+
+        Returns:
+            Hit, miss, and eviction counts, hit rate, and current size of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_id": self.model_id,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Anything with the `encode` method of a SentenceTransformer
+Encoder = Union[SentenceTransformer, CachedEncoder]
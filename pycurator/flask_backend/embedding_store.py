@@ -0,0 +1,228 @@
+"""Memory-mapped storage of primitive embeddings, shared by all server workers.
+
+A store is a single file containing a JSON header followed by the embeddings as a row-major array.
+Since workers map the array read-only instead of loading it, they all share one copy in the page
+cache. Each row is identified by a key and the hash of the text it encodes, so that only new and
+changed texts are encoded when the store is updated.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import struct
+from typing import Callable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+import warnings
+
+import numpy as np
+import torch
+from torch.nn import functional
+
+MAGIC = b"MASCEMB1"
+# Length of the JSON header, after the magic bytes
+_LENGTH = struct.Struct("<Q")
+# Start of the array, so that its rows are aligned
+_ALIGNMENT = 64
+
+
+class StoreHeader(NamedTuple):
+    """Metadata of stored embeddings.
+
+    Attributes:
+        ontology_hash: Hash of the texts that were encoded.
+        model_id: Name of the model that encoded the texts.
+        dtype: NumPy data type of the array.
+        dim: Size of each embedding.
+        rows: Event primitive and kind of text ("definition" or "template") of each row.
+        hashes: Hash of the text of each row.
+    """
+
+    ontology_hash: str
+    model_id: str
+    dtype: str
+    dim: int
+    rows: Sequence[Tuple[str, str]]
+    hashes: Sequence[str]
+
+
+class StoreChanges(NamedTuple):
+    """Differences between the texts of a store and the current texts.
+
+    Attributes:
+        added: Rows which weren't in the store.
+        changed: Rows whose text or model changed.
+        removed: Rows which are no longer present.
+        reused: Number of rows whose embeddings were kept.
+    """
+
+    added: Sequence[Tuple[str, str]]
+    changed: Sequence[Tuple[str, str]]
+    removed: Sequence[Tuple[str, str]]
+    reused: int
+
+
+def write_store(path: Path, header: StoreHeader, embeddings: torch.Tensor) -> None:
+    """Writes embeddings to a store, replacing it atomically.
+
+    Args:
+        path: Store file path.
+        header: Metadata of the embeddings.
+        embeddings: Embeddings shaped (rows, dim).
+    """
+    array = embeddings.detach().cpu().numpy().astype(header.dtype)
+    if array.shape != (len(header.rows), header.dim):
+        raise ValueError(f"Embeddings shaped {array.shape} don't match header")
+    header_bytes = json.dumps(header._asdict()).encode("utf-8")
+    offset = len(MAGIC) + _LENGTH.size + len(header_bytes)
+    header_bytes += b" " * (-offset % _ALIGNMENT)
+
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(temp_path, "wb") as file:
+        file.write(MAGIC)
+        file.write(_LENGTH.pack(len(header_bytes)))
+        file.write(header_bytes)
+        file.write(np.ascontiguousarray(array).tobytes())
+        file.flush()
+        os.fsync(file.fileno())
+    temp_path.replace(path)
+
+
+def _read_header(path: Path) -> Tuple[StoreHeader, int]:
+    """Reads the header of a store.
+
+    Args:
+        path: Store file path.
+
+    Returns:
+        Header and offset of the array in bytes.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an embedding store")
+        (length,) = _LENGTH.unpack(file.read(_LENGTH.size))
+        fields = json.loads(file.read(length))
+    fields["rows"] = [tuple(row) for row in fields["rows"]]
+    return StoreHeader(**fields), len(MAGIC) + _LENGTH.size + length
+
+
+def read_header(path: Path) -> Optional[StoreHeader]:
+    """Reads the header of a store, if it is valid.
+
+    Args:
+        path: Store file path.
+
+    Returns:
+        Header, or None if the store is missing or unreadable.
+    """
+    try:
+        return _read_header(path)[0]
+    except (OSError, ValueError, TypeError, KeyError, struct.error):
+        return None
+
+
+def load_store(path: Path) -> Tuple[StoreHeader, torch.Tensor]:
+    """Maps the embeddings of a store into memory, read-only.
+
+    The returned tensor must not be modified.
+
+    Args:
+        path: Store file path.
+
+    Returns:
+        Header and embeddings shaped (rows, dim).
+    """
+    header, offset = _read_header(path)
+    array = np.memmap(
+        path, dtype=header.dtype, mode="r", offset=offset, shape=(len(header.rows), header.dim)
+    )
+    with warnings.catch_warnings():
+        # PyTorch warns that tensors can't be read-only, but nothing writes to them
+        warnings.filterwarnings("ignore", message="The given NumPy array is not writ")
+        embeddings = torch.from_numpy(array)
+    return header, embeddings
+
+
+def text_hash(text: str) -> str:
+    """Hashes a text.
+
+    Args:
+        text: Text to be encoded.
+
+    Returns:
+        Hex digest of the text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def update_store(
+    path: Path,
+    model_id: str,
+    rows: Sequence[Tuple[str, str]],
+    texts: Sequence[str],
+    encode: Callable[[Sequence[str]], torch.Tensor],
+    force: bool = False,
+) -> StoreChanges:
+    """Updates a store to contain the normalized embeddings of texts, encoding as few as possible.
+
+    Embeddings are reused for rows whose text and model are unchanged. If anything changed, the
+    store is replaced atomically, so processes which have already mapped it are unaffected.
+
+    Args:
+        path: Store file path.
+        model_id: Name of the model.
+        rows: Key of each text.
+        texts: Texts to be encoded.
+        encode: Function encoding texts with the model.
+        force: Whether to encode all texts, even if they are unchanged.
+
+    Returns:
+        Differences from the previous contents of the store.
+    """
+    hashes = [text_hash(text) for text in texts]
+    ontology_hash = hashlib.sha256(json.dumps([rows, hashes]).encode("utf-8")).hexdigest()
+    header = read_header(path)
+    if header is not None and not force:
+        if (header.ontology_hash, header.model_id) == (ontology_hash, model_id):
+            return StoreChanges(added=[], changed=[], removed=[], reused=len(rows))
+
+    previous: Mapping[Tuple[str, str], Tuple[int, str]] = {}
+    if header is not None:
+        previous = {
+            row: (i, row_hash) for i, (row, row_hash) in enumerate(zip(header.rows, header.hashes))
+        }
+    reusable = header is not None and header.model_id == model_id and not force
+    to_encode = [
+        i
+        for i, (row, row_hash) in enumerate(zip(rows, hashes))
+        if not reusable or previous.get(row, (0, ""))[1] != row_hash
+    ]
+    current = set(rows)
+    changes = StoreChanges(
+        added=[rows[i] for i in to_encode if rows[i] not in previous],
+        changed=[rows[i] for i in to_encode if rows[i] in previous],
+        removed=[row for row in previous if row not in current],
+        reused=len(rows) - len(to_encode),
+    )
+
+    dim = header.dim if header is not None else 0
+    if to_encode:
+        encoded = functional.normalize(encode([texts[i] for i in to_encode]).float(), dim=1).cpu()
+        dim = encoded.shape[1]
+    embeddings = torch.empty(len(rows), dim)
+    if changes.reused:
+        _, old_embeddings = load_store(path)
+        reused: List[int] = sorted(set(range(len(rows))) - set(to_encode))
+        embeddings[reused] = old_embeddings[[previous[rows[i]][0] for i in reused]].float()
+    if to_encode:
+        embeddings[to_encode] = encoded
+
+    new_header = StoreHeader(
+        ontology_hash=ontology_hash,
+        model_id=model_id,
+        dtype="float32",
+        dim=dim,
+        rows=rows,
+        hashes=hashes,
+    )
+    write_store(path, new_header, embeddings)
+    return changes
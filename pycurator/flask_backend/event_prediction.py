@@ -1,110 +1,247 @@
 """Resources for event primitive prediction."""
+import functools
 import json
 from pathlib import Path
-from typing import Mapping, Optional, Sequence, Tuple, Union
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
 
 from sdf.ontology import ontology
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import SentenceTransformer
 import torch
+from torch.nn import functional
+
+from pycurator.flask_backend.embedding_cache import Encoder
+from pycurator.flask_backend.embedding_store import StoreChanges, load_store, update_store
 
 SENT_MODEL_DIR = Path(__file__).resolve().parent / "sent_model"
 
-DEFINITION_EMB_FILE = SENT_MODEL_DIR / "definition.emb"
-TEMPLATE_EMB_FILE = SENT_MODEL_DIR / "template.emb"
+PRIMITIVE_EMB_FILE = SENT_MODEL_DIR / "primitives.emb"
 TEMPLATE_JSON_FILE = SENT_MODEL_DIR / "templates.json"
 PRETRAINED_MODEL_DIR = SENT_MODEL_DIR / "pretrained_model"
+SS_MODEL_NAME = "usc-isi/sbert-roberta-large-anli-mnli-snli"
 
 NUM_EVENTS = len(ontology.events)
 
 
-def init_embeddings(ss_model: SentenceTransformer) -> Tuple[torch.FloatTensor, torch.FloatTensor]:
-    """Initialize embeddings using the SentenceTransformer model.
+def primitive_texts() -> Tuple[Sequence[Tuple[str, str]], Sequence[str]]:
+    """Gets the texts describing event primitives, which are encoded for prediction.
+
+    Returns:
+        Event primitive and kind of text ("definition" or "template") of each text, and the texts.
+        Definitions come first, followed by templates, both in the order of the ontology's events.
+    """
+    with open(TEMPLATE_JSON_FILE) as handle:
+        template_sentences: Sequence[str] = json.load(handle)
+    if len(template_sentences) != NUM_EVENTS:
+        raise ValueError(f"Expected {NUM_EVENTS} templates, found {len(template_sentences)}")
+
+    rows = [(name, "definition") for name in ontology.events]
+    texts = [event.definition for event in ontology.events.values()]
+    rows.extend((name, "template") for name in ontology.events)
+    texts.extend(template_sentences)
+    return rows, texts
+
+
+def update_embeddings(ss_model: Encoder, force: bool = False) -> StoreChanges:
+    """Updates the stored embeddings to match the current definitions and templates.
+
+    Only texts which were added or changed since the store was last updated are encoded.
 
     Arguments:
-        ss_model: SentenceTransformer model (currently RoBERTa-base) used to encode the information.
+        ss_model: SentenceTransformer model used to encode the information.
+        force: Whether to encode all texts, even if they are unchanged.
 
     Returns:
-        The tensors representing the definition embeddings and template embeddings in that order.
+        Differences from the previous contents of the store.
     """
-    if DEFINITION_EMB_FILE.exists() and TEMPLATE_EMB_FILE.exists():
-        definition_embeddings = torch.load(DEFINITION_EMB_FILE)
-        template_embeddings = torch.load(TEMPLATE_EMB_FILE)
-        return definition_embeddings, template_embeddings
+    rows, texts = primitive_texts()
+    encode = functools.partial(ss_model.encode, convert_to_tensor=True)
+    return update_store(PRIMITIVE_EMB_FILE, SS_MODEL_NAME, rows, texts, encode, force)
 
-    with open(TEMPLATE_JSON_FILE) as handle:
-        template_sentences = json.load(handle)
 
-    db_definitions = [event.definition for event in ontology.events.values()]
+def init_embeddings(ss_model: SentenceTransformer) -> Tuple[torch.Tensor, Sequence[str]]:
+    """Initialize embeddings using the SentenceTransformer model.
 
-    definition_embeddings = ss_model.encode(db_definitions, convert_to_tensor=True)
-    torch.save(definition_embeddings, DEFINITION_EMB_FILE)
+    The normalized embeddings are memory-mapped from PRIMITIVE_EMB_FILE, so that all processes
+    share them. The file is updated first if the model or any text has changed.
 
-    template_embeddings = ss_model.encode(template_sentences, convert_to_tensor=True)
-    torch.save(template_embeddings, TEMPLATE_EMB_FILE)
+    Arguments:
+        ss_model: SentenceTransformer model (currently RoBERTa-base) used to encode the information.
 
-    return definition_embeddings, template_embeddings
+    Returns:
+        The read-only tensor of embeddings of definitions and templates, and the event primitive of
+        each row.
+    """
+    update_embeddings(ss_model)
+    header, embeddings = load_store(PRIMITIVE_EMB_FILE)
+    return embeddings, [event for event, _ in header.rows]
 
 
 def init_ss_model() -> SentenceTransformer:
     """Load RoBERTa-base model."""
-    return SentenceTransformer(
-        "usc-isi/sbert-roberta-large-anli-mnli-snli", cache_folder=str(PRETRAINED_MODEL_DIR)
-    )
+    return SentenceTransformer(SS_MODEL_NAME, cache_folder=str(PRETRAINED_MODEL_DIR))
 
 
-def request_top_n(
-    description: str,
+Prediction = Mapping[str, Union[str, Sequence[str]]]
+
+
+class PrimitiveIndex:
+    """Precomputed index for retrieving the primitive subtypes most similar to a text.
+
+    Each row of the definition and template embeddings belongs to an event primitive. A subtype is
+    scored by the highest cosine similarity of any of its rows, so that scoring is a single matrix
+    multiplication followed by a max-pool over a padded matrix of each subtype's rows.
+    """
+
+    def __init__(self, embeddings: torch.Tensor, row_events: Sequence[str]) -> None:
+        """Constructor.
+
+        The embeddings are used as they are, so that memory-mapped embeddings aren't copied.
+
+        Arguments:
+            embeddings: Normalized embeddings of texts describing event primitives.
+            row_events: Event primitive of each row of the embeddings.
+        """
+        self.embeddings = embeddings
+
+        subtype_ids: Dict[Tuple[str, str], int] = {}
+        subtype_rows: List[List[int]] = []
+        for row, event_name in enumerate(row_events):
+            event = ontology.events[event_name]
+            subtype_id = subtype_ids.setdefault((event.type, event.subtype), len(subtype_ids))
+            if subtype_id == len(subtype_rows):
+                subtype_rows.append([])
+            subtype_rows[subtype_id].append(row)
+
+        # Padding points to an extra column of scores which is always -inf
+        padding = len(row_events)
+        width = max(len(rows) for rows in subtype_rows)
+        self.subtype_rows = torch.tensor(
+            [rows + [padding] * (width - len(rows)) for rows in subtype_rows],
+            device=self.embeddings.device,
+        )
+
+        self.predictions: List[Prediction] = []
+        for event_type, subtype in subtype_ids:
+            primitive = f"{event_type}.{subtype}"
+            subsubtypes = ontology.get_event_subcats(event_type, subtype)
+            description = ontology.events[ontology.get_default_event(primitive)].definition
+            self.predictions.append(
+                {"type": primitive, "subsubtypes": subsubtypes, "description": description}
+            )
+
+    @classmethod
+    def from_embeddings(
+        cls, definition_embeddings: torch.FloatTensor, template_embeddings: torch.FloatTensor
+    ) -> "PrimitiveIndex":
+        """Builds an index from unnormalized embeddings.
+
+        Arguments:
+            definition_embeddings: Embeddings of the definitions for event primitives.
+            template_embeddings: Embeddings of the templates for the event primitives.
+
+        Returns:
+            Index of the embeddings.
+        """
+        embeddings = torch.cat((definition_embeddings, template_embeddings)).float()
+        # Templates follow the order of the events, as definitions do
+        events = list(ontology.events)
+        row_events = [events[row % NUM_EVENTS] for row in range(len(embeddings))]
+        return cls(functional.normalize(embeddings, dim=1), row_events)
+
+    def top_n(self, query_embeddings: torch.Tensor, n: int) -> Sequence[Sequence[Prediction]]:
+        """Gets the most similar primitive subtypes for each query.
+
+        Arguments:
+            query_embeddings: Embeddings of the query texts, shaped (queries, embedding size).
+            n: Number of top predictions to be returned per query.
+
+        Returns:
+            For each query, list of predictions in order of most similar -> least similar.
+        """
+        queries = functional.normalize(query_embeddings.float(), dim=1).to(self.embeddings)
+        scores = queries @ self.embeddings.T
+        scores = torch.cat((scores, scores.new_full((len(scores), 1), float("-inf"))), dim=1)
+        subtype_scores = scores[:, self.subtype_rows].max(dim=2).values
+        top_subtypes = subtype_scores.topk(min(n, subtype_scores.shape[1]), dim=1).indices
+        return [[dict(self.predictions[i]) for i in row] for row in top_subtypes.tolist()]
+
+
+def request_top_n_batch(
+    descriptions: Sequence[str],
     *,
     n: int,
-    ss_model: Optional[SentenceTransformer] = None,
+    ss_model: Optional[Encoder] = None,
     definition_embeddings: Optional[torch.FloatTensor] = None,
     template_embeddings: Optional[torch.FloatTensor] = None,
-) -> Sequence[Mapping[str, Union[str, Sequence[str]]]]:
-    """Get the top *n* predicted event primitives from the *ss_model* provided.
+    index: Optional[PrimitiveIndex] = None,
+) -> Sequence[Sequence[Prediction]]:
+    """Get the top *n* predicted event primitives for each of several texts.
+
+    All texts are encoded by a single call to the model. Empty texts get no predictions, without
+    failing the other texts. Whitespace-only texts are still encoded, as they always were by
+    `get_top3`.
 
     Arguments:
-        description: Text to be the basis of the prediction.
-        n: Number of top predictions to be returned.
-        ss_model: SentenceTransformer model to make the predictions.
+        descriptions: Texts to be the basis of the predictions.
+        n: Number of top predictions to be returned per text.
+        ss_model: SentenceTransformer model, or cache wrapping it, to make the predictions.
         definition_embeddings: Embeddings of the definitions for event primitives.
         template_embeddings: Embeddings of the templates for the event primitives.
+        index: Index built from the embeddings. If given, the embeddings are not needed.
 
     Returns:
-        List of predictions (in order of most similar -> least similar) in a dictionary containing the primitive,
-        possible primitive subsubtypes, and the text that formed the basis of the prediction.
+        For each text, list of predictions in the same format as `request_top_n`.
     """
+    predictions: List[Sequence[Prediction]] = [[] for _ in descriptions]
+    indices = [i for i, description in enumerate(descriptions) if description]
+    if not indices:
+        return predictions
+
     # Initialize model and embeddings
     if ss_model is None:
         ss_model = init_ss_model()
 
-    if definition_embeddings is None or template_embeddings is None:
-        definition_embeddings, template_embeddings = init_embeddings(ss_model)
+    if index is None:
+        if definition_embeddings is None or template_embeddings is None:
+            index = PrimitiveIndex(*init_embeddings(ss_model))
+        else:
+            index = PrimitiveIndex.from_embeddings(definition_embeddings, template_embeddings)
 
     # Similarity scoring
-    event_embedding = ss_model.encode([description], convert_to_tensor=True)
-    def_cosine_scores = util.pytorch_cos_sim(event_embedding, definition_embeddings)
-    template_cosine_scores = util.pytorch_cos_sim(event_embedding, template_embeddings)
-    cat_scores = torch.cat((def_cosine_scores, template_cosine_scores), 1)
-    sorted_indices = cat_scores.argsort(descending=True)
-    recommended_primitives = []
-
-    # Get top n recommendations
-    for idx in sorted_indices[0]:
-        event = ontology.events[ontology.get_event_by_id(int(idx) % NUM_EVENTS + 1)]
-        type_subtype = (event.type, event.subtype)
-        if type_subtype not in recommended_primitives:
-            recommended_primitives.append(type_subtype)
-        if len(recommended_primitives) == n:
-            break
-
-    # Format recommendations
-    json_return = []
-    for rec_prim_type, rec_prim_subtype in recommended_primitives:
-        primitive = f"{rec_prim_type}.{rec_prim_subtype}"
-        subsubtypes = ontology.get_event_subcats(rec_prim_type, rec_prim_subtype)
-        description = ontology.events[ontology.get_default_event(primitive)].definition
-        json_return.append(
-            {"type": primitive, "subsubtypes": subsubtypes, "description": description}
-        )
+    event_embeddings = ss_model.encode([descriptions[i] for i in indices], convert_to_tensor=True)
+    for i, top_n in zip(indices, index.top_n(event_embeddings, n)):
+        predictions[i] = top_n
+    return predictions
+
+
+def request_top_n(
+    description: str,
+    *,
+    n: int,
+    ss_model: Optional[Encoder] = None,
+    definition_embeddings: Optional[torch.FloatTensor] = None,
+    template_embeddings: Optional[torch.FloatTensor] = None,
+    index: Optional[PrimitiveIndex] = None,
+) -> Sequence[Prediction]:
+    """Get the top *n* predicted event primitives from the *ss_model* provided.
 
-    return json_return
+    Arguments:
+        description: Text to be the basis of the prediction.
+        n: Number of top predictions to be returned.
+        ss_model: SentenceTransformer model, or cache wrapping it, to make the predictions.
+        definition_embeddings: Embeddings of the definitions for event primitives.
+        template_embeddings: Embeddings of the templates for the event primitives.
+        index: Index built from the embeddings. If given, the embeddings are not needed.
+
+    Returns:
+        List of predictions (in order of most similar -> least similar) in a dictionary containing the primitive,
+        possible primitive subsubtypes, and the text that formed the basis of the prediction.
+    """
+    return request_top_n_batch(
+        [description],
+        n=n,
+        ss_model=ss_model,
+        definition_embeddings=definition_embeddings,
+        template_embeddings=template_embeddings,
+        index=index,
+    )[0]
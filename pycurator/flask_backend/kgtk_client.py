@@ -0,0 +1,186 @@
+"""Client for KGTK's Wikidata search API, with pooled connections, retries, and a circuit breaker."""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from typing import Any, List, Mapping, Optional, Sequence
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from pycurator.common.config import settings
+
+# Statuses of responses which are retried, since they are usually temporary
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class KgtkUnavailable(Exception):
+    """Raised when KGTK can't be reached or returns an error."""
+
+
+class CircuitBreaker:
+    """Tracks consecutive failures of a service, so that requests fail fast while it is down.
+
+    After enough consecutive failures, the circuit opens and requests are rejected. Once the reset
+    timeout has passed, a single request is let through, and its outcome closes or reopens the
+    circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        """Constructor.
+
+        Args:
+            failure_threshold: Number of consecutive failures which opens the circuit.
+            reset_timeout: Time in seconds before a request is let through an open circuit.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Checks whether a request may be made.
+
+        Returns:
+            Whether the circuit is closed, or this is the trial request of an open circuit.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at >= self.reset_timeout:
+                # Let this request through, but keep the circuit open for concurrent ones
+                self.opened_at = now
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Closes the circuit."""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        """Counts a failure, opening the circuit if there have been too many."""
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Checks whether a failed request may succeed if it is made again.
+
+    Args:
+        error: Exception raised by the request.
+
+    Returns:
+        Whether the request failed to connect, timed out, or received a temporary error status.
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUSES
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class KgtkClient:
+    """Client making concurrent searches of KGTK over a shared pool of connections.
+
+    Every attempt at a search, including retries, counts toward the circuit breaker, and retries
+    stop as soon as the circuit opens. When KGTK can't be reached or doesn't respond, each attempt
+    fails after the timeout, so a search fails after at most
+    `(retries + 1) * timeout + backoff * (2 ** retries - 1)` seconds, which is 15.6 seconds with the
+    default settings.
+    """
+
+    def __init__(
+        self,
+        url: str = settings.kgtk_url,
+        timeout: float = settings.kgtk_timeout,
+        retries: int = settings.kgtk_retries,
+        backoff: float = settings.kgtk_backoff,
+        max_workers: int = 4,
+        failure_threshold: int = settings.kgtk_failure_threshold,
+        reset_timeout: float = settings.kgtk_reset_timeout,
+    ) -> None:
+        """Constructor.
+
+        Args:
+            url: URL of KGTK's search API.
+            timeout: Time in seconds to wait for each attempt.
+            retries: Number of times a failed request is retried.
+            backoff: Base of the exponential backoff between retries in seconds.
+            max_workers: Maximum number of concurrent requests.
+            failure_threshold: Number of consecutive failed searches after which searches fail
+                immediately.
+            reset_timeout: Time in seconds after which a search is tried again once searches fail
+                immediately.
+        """
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        # Retries are made by `search` rather than the adapter, so that the breaker sees each one
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="kgtk")
+
+    def search(self, query: str) -> List[Mapping[str, Any]]:
+        """Searches for exact matches of a query among Wikidata classes.
+
+        Args:
+            query: A string to query against KGTK's Wikidata.
+
+        Returns:
+            A list of candidates.
+
+        Raises:
+            KgtkUnavailable: If KGTK can't be reached or returns an error, or has recently failed
+                too often to try again yet.
+        """
+        formatted_query = urllib.parse.quote(query)
+        request_url = (
+            f"{self.url}?q={formatted_query}&extra_info=true&language=en&type=exact&is_class=true"
+        )
+        error: Optional[Exception] = None
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            if not self.breaker.allow():
+                raise KgtkUnavailable("KGTK has failed repeatedly; not trying again yet") from error
+            try:
+                response = self.session.get(request_url, timeout=self.timeout, verify=False)
+                response.raise_for_status()
+                candidates = list(response.json())
+            except (requests.exceptions.RequestException, ValueError) as ex:
+                self.breaker.record_failure()
+                error = ex
+                if not _is_retryable(ex):
+                    break
+                continue
+            self.breaker.record_success()
+            return candidates
+        raise KgtkUnavailable(str(error)) from error
+
+    def search_many(self, queries: Sequence[str]) -> Sequence[Optional[List[Mapping[str, Any]]]]:
+        """Searches for several queries concurrently.
+
+        Args:
+            queries: Strings to query against KGTK's Wikidata.
+
+        Returns:
+            Candidates for each query, or None for queries which failed.
+        """
+        futures = [self._executor.submit(self.search, query) for query in queries]
+        results: List[Optional[List[Mapping[str, Any]]]] = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except KgtkUnavailable:
+                results.append(None)
+        return results
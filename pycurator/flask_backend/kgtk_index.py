@@ -0,0 +1,269 @@
+"""Local index of Wikidata labels, aliases, and descriptions, used instead of KGTK's API offline.
+
+The index is built from a KGTK edge file (a TSV with `node1`, `label`, and `node2` columns), such as
+the label, alias, and description files of a Wikidata dump combined with its P31 and P279 edges.
+Names are language-qualified strings like `'attack'@en`; only English ones are kept. A qnode is a
+class if it is the object of a P31 (instance of) edge or either end of a P279 (subclass of) edge.
+Edges labeled `is_class` with a true value mark classes directly, for dumps that were pre-filtered.
+
+Searches match labels and aliases exactly, or ignoring case, and return candidates in the format of
+KGTK's API, with exact matches first.
+"""
+
+import argparse
+from collections import defaultdict
+import csv
+import gzip
+import json
+from pathlib import Path
+import sqlite3
+import sys
+import threading
+import time
+from typing import IO, Any, DefaultDict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from pycurator.common.paths import KGTK_INDEX_FILE
+
+TEXT_KINDS = ("label", "alias", "description")
+CLASS_OBJECT_PROPERTIES = ("P31", "P279")
+CLASS_SUBJECT_PROPERTIES = ("P279",)
+
+_SCHEMA = """
+CREATE TABLE texts (
+    qnode TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    text TEXT NOT NULL,
+    lower TEXT NOT NULL
+);
+CREATE TABLE classes (
+    qnode TEXT PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+_INDEXES = """
+CREATE INDEX texts_text ON texts (text) WHERE kind != 'description';
+CREATE INDEX texts_lower ON texts (lower) WHERE kind != 'description';
+CREATE INDEX texts_qnode ON texts (qnode);
+"""
+
+_BATCH_SIZE = 100_000
+
+
+def parse_string(value: str, language: str = "en") -> Optional[str]:
+    """Parses a KGTK string value.
+
+    Args:
+        value: Language-qualified string like `'attack'@en`, or a plain string like `"attack"`.
+        language: Language to keep.
+
+    Returns:
+        The text, or None if it is in another language or isn't a string.
+    """
+    if value.startswith("'"):
+        text, _, value_language = value[1:].rpartition("'@")
+        if value_language.split("-")[0] != language:
+            return None
+    elif value.startswith('"') and value.endswith('"') and len(value) >= 2:
+        text = value[1:-1]
+    else:
+        return None
+    return text.replace("\\'", "'").replace('\\"', '"').replace("\\|", "|")
+
+
+def read_edges(file: IO[str]) -> Iterator[Tuple[str, str, str]]:
+    """Reads the edges of a KGTK edge file.
+
+    Args:
+        file: Open file with a header row.
+
+    Yields:
+        Subject, property, and object of each edge.
+    """
+    reader = csv.reader(file, delimiter="\t", quoting=csv.QUOTE_NONE)
+    header = next(reader)
+    try:
+        node1, label, node2 = (header.index(column) for column in ("node1", "label", "node2"))
+    except ValueError as ex:
+        raise ValueError(f"KGTK edge files need node1, label, and node2 columns: {header}") from ex
+    for row in reader:
+        if len(row) > max(node1, label, node2):
+            yield row[node1], row[label], row[node2]
+
+
+def build_index(dump_paths: Sequence[Path], index_path: Path = KGTK_INDEX_FILE) -> int:
+    """Builds an index from KGTK edge files, replacing any existing index atomically.
+
+    Args:
+        dump_paths: Edge files, which may be compressed with gzip.
+        index_path: Index file path.
+
+    Returns:
+        Number of names and descriptions indexed.
+    """
+    temp_path = index_path.with_name(f".{index_path.name}.tmp")
+    if temp_path.exists():
+        temp_path.unlink()
+    connection = sqlite3.connect(str(temp_path))
+    count = 0
+    try:
+        connection.executescript(_SCHEMA)
+        texts: List[Tuple[str, str, str, str]] = []
+        classes: List[Tuple[str]] = []
+
+        def flush() -> None:
+            connection.executemany("INSERT INTO texts VALUES (?, ?, ?, ?)", texts)
+            connection.executemany("INSERT OR IGNORE INTO classes VALUES (?)", classes)
+            texts.clear()
+            classes.clear()
+
+        for dump_path in dump_paths:
+            opener = gzip.open if dump_path.suffix == ".gz" else open
+            with opener(dump_path, "rt", encoding="utf-8", newline="") as file:
+                for subject, prop, obj in read_edges(file):
+                    if prop in TEXT_KINDS:
+                        text = parse_string(obj)
+                        if text:
+                            texts.append((subject, prop, text, text.lower()))
+                            count += 1
+                    if prop in CLASS_OBJECT_PROPERTIES:
+                        classes.append((obj,))
+                    if prop in CLASS_SUBJECT_PROPERTIES or (
+                        prop == "is_class" and obj.lower() in ("true", "1")
+                    ):
+                        classes.append((subject,))
+                    if len(texts) + len(classes) >= _BATCH_SIZE:
+                        flush()
+        flush()
+        connection.executescript(_INDEXES)
+        connection.commit()
+    finally:
+        connection.close()
+    temp_path.replace(index_path)
+    return count
+
+
+class LocalKgtkIndex:
+    """Searches of a local index, with the same interface as `KgtkClient`."""
+
+    def __init__(self, path: Path = KGTK_INDEX_FILE) -> None:
+        """Constructor.
+
+        Args:
+            path: Index file path.
+        """
+        if not path.is_file():
+            raise FileNotFoundError(f"No KGTK index at {path}; build one with `kgtk_index build`")
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Gets this thread's read-only connection to the index.
+
+        Returns:
+            Connection returning rows which can be accessed by column name.
+        """
+        connection: Optional[sqlite3.Connection] = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            connection.row_factory = sqlite3.Row
+            self._local.connection = connection
+        return connection
+
+    def search(
+        self, query: str, ignore_case: bool = True, is_class: bool = True
+    ) -> List[Mapping[str, Any]]:
+        """Searches for qnodes with a label or alias matching a query.
+
+        Args:
+            query: A string to query against the index.
+            ignore_case: Whether to also match labels and aliases which differ only in case.
+            is_class: Whether to only return classes.
+
+        Returns:
+            Candidates with a qnode and lists of labels, aliases, and descriptions. Exact matches
+            come first, and then qnodes in numerical order.
+        """
+        connection = self._connection()
+        if ignore_case:
+            rows = connection.execute(
+                "SELECT qnode, MAX(text = ?) AS exact FROM texts "
+                "WHERE lower = ? AND kind != 'description' GROUP BY qnode",
+                (query, query.lower()),
+            ).fetchall()
+        else:
+            rows = connection.execute(
+                "SELECT DISTINCT qnode, 1 AS exact FROM texts "
+                "WHERE text = ? AND kind != 'description'",
+                (query,),
+            ).fetchall()
+        qnodes = [row["qnode"] for row in rows]
+        if is_class and qnodes:
+            placeholders = ", ".join("?" * len(qnodes))
+            classes = {
+                row["qnode"]
+                for row in connection.execute(
+                    f"SELECT qnode FROM classes WHERE qnode IN ({placeholders})", qnodes
+                )
+            }
+            rows = [row for row in rows if row["qnode"] in classes]
+        rows.sort(key=lambda row: (not row["exact"], len(row["qnode"]), row["qnode"]))
+
+        candidates: List[Mapping[str, Any]] = []
+        for row in rows:
+            fields: DefaultDict[str, List[str]] = defaultdict(list)
+            for text_row in connection.execute(
+                "SELECT kind, text FROM texts WHERE qnode = ? ORDER BY rowid", (row["qnode"],)
+            ):
+                fields[text_row["kind"]].append(text_row["text"])
+            # Like KGTK's API, only qnodes with labels are returned
+            if fields["label"]:
+                candidates.append(
+                    {
+                        "qnode": row["qnode"],
+                        "label": fields["label"][:1],
+                        "alias": fields["alias"],
+                        "description": fields["description"][:1],
+                    }
+                )
+        return candidates
+
+    def search_many(self, queries: Sequence[str]) -> Sequence[Optional[List[Mapping[str, Any]]]]:
+        """Searches for several queries.
+
+        Args:
+            queries: Strings to query against the index.
+
+        Returns:
+            Candidates for each query.
+        """
+        return [self.search(query) for query in queries]
+
+
+def main() -> None:
+    """Builds or searches the local index."""
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--index", type=Path, default=KGTK_INDEX_FILE, help="Index file path.")
+    subparsers = p.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Build the index from KGTK edge files.")
+    build.add_argument("dumps", type=Path, nargs="+", help="KGTK edge files (TSV, or .tsv.gz).")
+    search = subparsers.add_parser("search", help="Search the index.")
+    search.add_argument("queries", nargs="+", help="Strings to search for.")
+    args = p.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build_index(args.dumps, args.index)
+        print(f"Indexed {count} names and descriptions in {time.perf_counter() - start:.1f} s")
+        return
+    index = LocalKgtkIndex(args.index)
+    for query in args.queries:
+        start = time.perf_counter()
+        candidates = index.search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{query}: {len(candidates)} candidates in {elapsed:.2f} ms")
+        json.dump(candidates, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""Persistent cache of KGTK candidates and disambiguation responses, shared by all server workers.
+
+Entries are stored in a single SQLite database, grouped by namespace (e.g., raw candidates for a
+query, or the final response for an event verb). They expire after a time to live, which is shorter
+for empty results so that KGTK is asked again soon. Once the stored values exceed a total size, the
+least recently used entries are evicted.
+
+Since every write locks the whole database, lookups only record their access time if the recorded
+one is older than an interval, and expired and excess entries are only evicted every few stores.
+"""
+
+import argparse
+import json
+from pathlib import Path
+import sqlite3
+import time
+from typing import Any, Mapping, Optional
+
+from pycurator.common.config import settings
+from pycurator.common.database import DEFAULT_TIMEOUT, transaction
+from pycurator.common.paths import KGTK_CACHE_FILE, KGTK_EVENT_CACHE, KGTK_REFVAR_CACHE
+
+CANDIDATES = "candidates"
+EVENT_RESPONSES = "event"
+REFVAR_RESPONSES = "refvar"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    negative INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_created_at ON entries (created_at);
+"""
+
+# Time in seconds within which repeated lookups of an entry don't update its access time
+ACCESS_INTERVAL = 60.0
+# Number of stores by each process between evictions
+EVICT_INTERVAL = 100
+
+
+class KgtkStore:
+    """Cache of JSON values from KGTK, stored in an SQLite database."""
+
+    def __init__(
+        self,
+        path: Path = KGTK_CACHE_FILE,
+        ttl: float = settings.kgtk_cache_ttl,
+        negative_ttl: float = settings.kgtk_cache_negative_ttl,
+        max_bytes: int = settings.kgtk_cache_max_bytes,
+        wal: bool = settings.kgtk_cache_wal,
+        timeout: float = DEFAULT_TIMEOUT,
+        access_interval: float = ACCESS_INTERVAL,
+        evict_interval: int = EVICT_INTERVAL,
+    ) -> None:
+        """Constructor.
+
+        Args:
+            path: Database file path.
+            ttl: Time in seconds after which entries expire.
+            negative_ttl: Time in seconds after which empty results expire.
+            max_bytes: Maximum total size of the stored values in bytes.
+            wal: Whether to use write-ahead logging, which lets workers read while another writes.
+                It is not supported on network file systems, so it should only be enabled if the
+                database is on a local disk.
+            timeout: Time in seconds to wait for other writers.
+            access_interval: Time in seconds within which repeated lookups of an entry don't update
+                its access time, so that most lookups don't write to the database.
+            evict_interval: Number of stores between evictions. The stored values may exceed the
+                maximum size by up to this many values per process in between.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.access_interval = access_interval
+        self.evict_interval = evict_interval
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        with transaction(self.path, self.timeout) as connection:
+            connection.executescript(_SCHEMA)
+        self._set_journal_mode("wal" if wal else "delete")
+
+    def _set_journal_mode(self, mode: str) -> None:
+        """Switches the database's journal mode, since write-ahead logging persists in the file.
+
+        Switching doesn't wait for other connections, so it is retried while workers are starting.
+
+        Args:
+            mode: Either "wal" for write-ahead logging or "delete" for the rollback journal.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                with transaction(self.path, self.timeout) as connection:
+                    if connection.execute("PRAGMA journal_mode").fetchone()[0] != mode:
+                        connection.execute(f"PRAGMA journal_mode={mode}")
+                return
+            except sqlite3.OperationalError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Looks up a value.
+
+        Args:
+            namespace: Kind of value.
+            key: Key of the value within the namespace.
+
+        Returns:
+            Value, or None if it is missing or expired.
+        """
+        now = time.time()
+        with transaction(self.path, self.timeout) as connection:
+            row = connection.execute(
+                "SELECT value, negative, created_at, accessed_at FROM entries "
+                "WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is not None:
+                ttl = self.negative_ttl if row["negative"] else self.ttl
+                if now - row["created_at"] > ttl:
+                    connection.execute(
+                        "DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+                    )
+                    row = None
+                elif now - row["accessed_at"] > self.access_interval:
+                    connection.execute(
+                        "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                        (now, namespace, key),
+                    )
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row["value"])
+
+    def put(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        negative: bool = False,
+    ) -> None:
+        """Stores a value, periodically evicting the least recently used values if necessary.
+
+        Args:
+            namespace: Kind of value.
+            key: Key of the value within the namespace.
+            value: JSON-serializable value.
+            negative: Whether the value is an empty result, which expires sooner.
+        """
+        now = time.time()
+        serialized = json.dumps(value)
+        size = len(serialized.encode("utf-8"))
+        with transaction(self.path, self.timeout) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(namespace, key, value, negative, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, serialized, negative, size, now, now),
+            )
+            self._puts += 1
+            if self._puts % self.evict_interval == 0:
+                self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Deletes expired entries and then least recently used entries until under the limit.
+
+        Args:
+            connection: Connection within a transaction.
+        """
+        now = time.time()
+        connection.execute(
+            "DELETE FROM entries WHERE created_at < ? - (CASE negative WHEN 1 THEN ? ELSE ? END)",
+            (now, self.negative_ttl, self.ttl),
+        )
+        excess = connection.execute("SELECT total(size) FROM entries").fetchone()[0]
+        excess -= self.max_bytes
+        if excess <= 0:
+            return
+        evicted = []
+        rows = connection.execute(
+            "SELECT namespace, key, size FROM entries ORDER BY accessed_at"
+        ).fetchall()
+        for row in rows:
+            if excess <= 0:
+                break
+            evicted.append((row["namespace"], row["key"]))
+            excess -= row["size"]
+        connection.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", evicted)
+
+    def migrate(self, namespace: str, directory: Path) -> int:
+        """Imports values from a directory with one JSON file per key, as used to be the cache.
+
+        Existing entries are kept. Imported values expire as if they had just been retrieved, since
+        their files were never expired. Files are left in place.
+
+        Args:
+            namespace: Kind of value.
+            directory: Directory of files named after their keys.
+
+        Returns:
+            Number of values imported.
+        """
+        now = time.time()
+        entries = []
+        for file in sorted(directory.glob("*.json")):
+            with open(file, encoding="utf-8") as handle:
+                value = json.load(handle)
+            serialized = json.dumps(value)
+            negative = not value.get("options")
+            size = len(serialized.encode("utf-8"))
+            entries.append((namespace, file.stem, serialized, negative, size, now, now))
+        with transaction(self.path, self.timeout) as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO entries "
+                "(namespace, key, value, negative, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                entries,
+            )
+            imported = connection.total_changes - before
+            self._evict(connection)
+        return imported
+
+    def stats(self) -> Mapping[str, Any]:
+        """Summarizes the contents and activity of the cache.
+
+        Returns:
+            Number and total size of entries in each namespace, and this process' hits and misses.
+        """
+        with transaction(self.path, self.timeout) as connection:
+            rows = connection.execute(
+                "SELECT namespace, COUNT(*) AS entries, total(size) AS bytes "
+                "FROM entries GROUP BY namespace"
+            ).fetchall()
+        return {
+            "namespaces": {
+                row["namespace"]: {"entries": row["entries"], "bytes": int(row["bytes"])}
+                for row in rows
+            },
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def main() -> None:
+    """Imports the old per-file cache or shows the contents of the cache."""
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument(
+        "--migrate",
+        action="store_true",
+        help="Import responses cached as JSON files in the KGTK cache directories.",
+    )
+    args = p.parse_args()
+
+    store = KgtkStore()
+    if args.migrate:
+        for namespace, directory in (
+            (EVENT_RESPONSES, KGTK_EVENT_CACHE),
+            (REFVAR_RESPONSES, KGTK_REFVAR_CACHE),
+        ):
+            print(f"Imported {store.migrate(namespace, directory)} entries from {directory}")
+    for namespace, counts in store.stats()["namespaces"].items():
+        print(f"{namespace}: {counts['entries']} entries, {counts['bytes']} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,12 @@
 
 from collections import Counter
 import datetime
+import os
 from pathlib import Path
 from typing import Any, Counter as tCounter, Mapping, MutableMapping, Sequence
 
-from sdf import yaml2sdf
+from sdf import yaml_io
 from sdf.yaml_schema import Before, Order, Schema, Slot, Step
-import yaml
 
 
 def populate_slots(events: Sequence[Mapping[str, Any]]) -> Sequence[Slot]:
@@ -152,6 +152,10 @@ def create_schema(
 def save_schema(schema: Schema, output_directory: Path) -> Path:
     """Save Schema object as YAML file.
 
+    The file is written under a temporary name, synced to disk, and then renamed, so that it is
+    never seen partially written and survives a crash once this returns. It is not converted to
+    SDF here; see `sdf_conversion` for that.
+
     Args:
         schema: Schema to be saved.
         output_directory: Location on the NAS or local drive at which to store the schema.
@@ -161,9 +165,17 @@ def save_schema(schema: Schema, output_directory: Path) -> Path:
     """
     schemas = [schema.dict(exclude_none=True)]
     yaml_fname = output_directory / f"{schema.schema_id}_{schema.schema_version}.yaml"
-    with yaml_fname.open("w") as y_file:
-        yaml.dump(schemas, y_file, sort_keys=False)
-
-    yaml2sdf.convert_all_yaml_to_sdf(schemas, "isi", "https://example.org/kairos/", yaml_fname.stem)
+    temp_fname = yaml_fname.with_name(f".{yaml_fname.name}.{os.getpid()}.tmp")
+    with temp_fname.open("w") as y_file:
+        yaml_io.dump(schemas, y_file, sort_keys=False)
+        y_file.flush()
+        os.fsync(y_file.fileno())
+    temp_fname.replace(yaml_fname)
+    # Sync the directory too, so that the rename itself is durable
+    directory_fd = os.open(output_directory, os.O_RDONLY)
+    try:
+        os.fsync(directory_fd)
+    finally:
+        os.close(directory_fd)
 
     return yaml_fname
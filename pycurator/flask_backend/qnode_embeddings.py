@@ -0,0 +1,110 @@
+"""Persistent store of the embeddings of Wikidata qnodes' descriptions, shared by all workers.
+
+Since a qnode's description rarely changes, its embedding is computed once and reused by every
+request that ranks the qnode as a candidate. Embeddings are stored with a hash of the description
+they were computed from, so they are recomputed if it changes.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Any, Callable, List, Mapping, MutableMapping, Sequence, Tuple
+
+import numpy as np
+import torch
+from torch.nn import functional
+
+from pycurator.common.database import DEFAULT_TIMEOUT, transaction
+from pycurator.common.paths import QNODE_EMBEDDING_FILE
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model_id TEXT NOT NULL,
+    qnode TEXT NOT NULL,
+    description_hash TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    PRIMARY KEY (model_id, qnode)
+);
+"""
+
+
+def _description_hash(description: str) -> str:
+    """Hashes a description.
+
+    Args:
+        description: Description of a qnode.
+
+    Returns:
+        Hex digest of the description.
+    """
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+
+class QnodeEmbeddingStore:
+    """Normalized embeddings of qnode descriptions, stored in an SQLite database."""
+
+    def __init__(
+        self, model_id: str, path: Path = QNODE_EMBEDDING_FILE, timeout: float = DEFAULT_TIMEOUT
+    ) -> None:
+        """Constructor.
+
+        Args:
+            model_id: Name of the model computing the embeddings.
+            path: Database file path.
+            timeout: Time in seconds to wait for other writers.
+        """
+        self.model_id = model_id
+        self.path = path
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        with transaction(self.path, self.timeout) as connection:
+            connection.executescript(_SCHEMA)
+
+    def embed(
+        self,
+        candidates: Sequence[Mapping[str, Any]],
+        encode: Callable[[Sequence[str]], torch.Tensor],
+    ) -> torch.Tensor:
+        """Gets the embeddings of candidates' descriptions, encoding only those not yet stored.
+
+        Args:
+            candidates: KGTK candidates, each with a qnode and a description.
+            encode: Function encoding texts with the model.
+
+        Returns:
+            Normalized embeddings shaped (candidates, embedding size).
+        """
+        keys: List[Tuple[str, str]] = [
+            (candidate["qnode"], _description_hash(candidate["description"][0]))
+            for candidate in candidates
+        ]
+        found: MutableMapping[Tuple[str, str], torch.Tensor] = {}
+        with transaction(self.path, self.timeout) as connection:
+            for qnode, description_hash in set(keys):
+                row = connection.execute(
+                    "SELECT description_hash, embedding FROM embeddings "
+                    "WHERE model_id = ? AND qnode = ?",
+                    (self.model_id, qnode),
+                ).fetchone()
+                if row is not None and row["description_hash"] == description_hash:
+                    array = np.frombuffer(row["embedding"], dtype=np.float32)
+                    found[qnode, description_hash] = torch.from_numpy(array.copy())
+
+        missing = {key: i for i, key in enumerate(keys) if key not in found}
+        misses = sum(key in missing for key in keys)
+        self.hits += len(keys) - misses
+        self.misses += misses
+        if missing:
+            descriptions = [candidates[i]["description"][0] for i in missing.values()]
+            encoded = functional.normalize(encode(descriptions).float(), dim=1).cpu()
+            found.update(zip(missing, encoded))
+            with transaction(self.path, self.timeout) as connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings "
+                    "(model_id, qnode, description_hash, embedding) VALUES (?, ?, ?, ?)",
+                    [
+                        (self.model_id, qnode, description_hash, embedding.numpy().tobytes())
+                        for (qnode, description_hash), embedding in zip(missing, encoded)
+                    ],
+                )
+        return torch.stack([found[key] for key in keys])
@@ -0,0 +1,123 @@
+"""Cache of loaded schemas, so that reopening a schema doesn't parse its files again."""
+
+from collections import OrderedDict
+import hashlib
+import json
+from pathlib import Path
+import threading
+from typing import Any, Callable, Mapping, MutableMapping, Optional, Tuple
+
+# Modification time in nanoseconds and size of a file, or None if it doesn't exist
+FileSignature = Optional[Tuple[int, int]]
+# Entity tag and response
+CachedResponse = Tuple[str, Mapping[str, Any]]
+
+
+def file_signature(path: Path) -> FileSignature:
+    """Gets the signature of a file, which changes whenever the file is written.
+
+    Args:
+        path: File path.
+
+    Returns:
+        Modification time in nanoseconds and size of the file, or None if it doesn't exist.
+    """
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SchemaResponseCache:
+    """Responses built from schema and recommendation files, keyed by the files' signatures.
+
+    Responses are evicted in least recently used order once there are too many.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        """Constructor.
+
+        Args:
+            max_entries: Maximum number of cached responses.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: MutableMapping[Tuple[Path, Path], CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def etag(schema_path: Path, recommendation_path: Path) -> Optional[str]:
+        """Computes the entity tag of the response for a schema, without reading its files.
+
+        Args:
+            schema_path: Path to the schema file.
+            recommendation_path: Path to the schema's recommendation file, which may not exist.
+
+        Returns:
+            Tag which changes whenever either file is written, or None if the schema doesn't exist.
+        """
+        schema_signature = file_signature(schema_path)
+        if schema_signature is None:
+            return None
+        key = json.dumps([schema_path.name, schema_signature, file_signature(recommendation_path)])
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def get(
+        self,
+        schema_path: Path,
+        recommendation_path: Path,
+        build: Callable[[Path, Path], Mapping[str, Any]],
+    ) -> CachedResponse:
+        """Gets the response for a schema, building it if the files have changed since it was cached.
+
+        Args:
+            schema_path: Path to the schema file.
+            recommendation_path: Path to the schema's recommendation file, which may not exist.
+            build: Function reading the files and building the response.
+
+        Returns:
+            Entity tag and response.
+
+        Raises:
+            FileNotFoundError: If the schema file doesn't exist.
+        """
+        key = (schema_path, recommendation_path)
+        etag = self.etag(schema_path, recommendation_path)
+        if etag is None:
+            raise FileNotFoundError(f"No schema at {schema_path}")
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == etag:
+                self._entries.move_to_end(key)  # type: ignore
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        response = build(schema_path, recommendation_path)
+        # If a file was written while building, the response is cached under the old tag and is
+        # rebuilt next time
+        with self._lock:
+            self._entries[key] = (etag, response)
+            self._entries.move_to_end(key)  # type: ignore
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)  # type: ignore
+                self.evictions += 1
+        return etag, response
+
+    def stats(self) -> Mapping[str, Any]:
+        """Summarizes the cache's activity.
+
+        Returns:
+            Hit, miss, and eviction counts, and number of cached responses.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,173 @@
+"""Background conversion of saved schemas to SDF, which validates them.
+
+Saving a schema only writes its YAML file, and conversion is queued to run in a background thread
+of the same worker. Its progress is recorded in an SQLite database, so that any worker can report
+it. Conversions which were queued or running when their worker stopped are reported as failed once
+they are older than the stale timeout.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from pathlib import Path
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+from sdf import yaml2sdf, yaml_io
+
+from pycurator.common.database import DEFAULT_TIMEOUT, transaction
+from pycurator.common.paths import SDF_CONVERSION_FILE
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+IN_FLIGHT = (QUEUED, RUNNING)
+
+PERFORMER_PREFIX = "isi"
+PERFORMER_URI = "https://example.org/kairos/"
+
+# Queued or running conversions older than this are assumed to belong to workers that stopped
+DEFAULT_STALE_AFTER = 10 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversions (
+    file TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    error TEXT,
+    queued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+"""
+
+
+class Conversion(NamedTuple):
+    """Conversion of a schema file to SDF.
+
+    Attributes:
+        file: Name of the schema file, without its extension.
+        state: One of queued, running, finished, or failed.
+        error: Error message of a failed conversion.
+        queued_at: Time the conversion was queued.
+        started_at: Time the conversion started.
+        finished_at: Time the conversion finished or failed.
+    """
+
+    file: str
+    state: str
+    error: Optional[str]
+    queued_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+
+
+def convert_schema_file(yaml_path: Path) -> Any:
+    """Converts a saved schema file to SDF, which validates it.
+
+    Args:
+        yaml_path: Schema file path.
+
+    Returns:
+        SDF schema library.
+    """
+    with yaml_path.open(encoding="utf-8") as file:
+        schemas = yaml_io.load(file)
+    return yaml2sdf.convert_all_yaml_to_sdf(
+        schemas, PERFORMER_PREFIX, PERFORMER_URI, yaml_path.stem
+    )
+
+
+class ConversionQueue:
+    """Queue converting schema files one at a time in a background thread."""
+
+    def __init__(
+        self,
+        path: Path = SDF_CONVERSION_FILE,
+        convert: Callable[[Path], Any] = convert_schema_file,
+        stale_after: float = DEFAULT_STALE_AFTER,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> None:
+        """Constructor.
+
+        Args:
+            path: Database file path.
+            convert: Function converting a schema file, raising an exception if it is invalid.
+            stale_after: Time in seconds after which queued or running conversions are reported as
+                failed.
+            timeout: Time in seconds to wait for other writers.
+        """
+        self.path = path
+        self.convert = convert
+        self.stale_after = stale_after
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sdf-conversion")
+        with transaction(self.path, self.timeout) as connection:
+            connection.executescript(_SCHEMA)
+
+    def submit(self, yaml_path: Path) -> None:
+        """Queues the conversion of a schema file, replacing the status of any earlier conversion.
+
+        Args:
+            yaml_path: Schema file path.
+        """
+        with transaction(self.path, self.timeout) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO conversions (file, state, queued_at) VALUES (?, ?, ?)",
+                (yaml_path.stem, QUEUED, time.time()),
+            )
+        self._executor.submit(self._run, yaml_path)
+
+    def _run(self, yaml_path: Path) -> None:
+        """Converts a schema file, recording its progress.
+
+        Args:
+            yaml_path: Schema file path.
+        """
+        self._update(yaml_path.stem, state=RUNNING, started_at=time.time())
+        try:
+            self.convert(yaml_path)
+        except Exception as ex:  # pylint: disable=broad-except
+            logging.exception("Failed to convert %s to SDF", yaml_path)
+            self._update(yaml_path.stem, state=FAILED, error=repr(ex), finished_at=time.time())
+        else:
+            self._update(yaml_path.stem, state=FINISHED, finished_at=time.time())
+
+    def _update(self, file: str, **values: Any) -> None:
+        """Updates columns of a conversion.
+
+        Args:
+            file: Name of the schema file, without its extension.
+            **values: New values of columns.
+        """
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with transaction(self.path, self.timeout) as connection:
+            connection.execute(
+                f"UPDATE conversions SET {assignments} WHERE file = ?", (*values.values(), file)
+            )
+
+    def status(self, file: str) -> Optional[Conversion]:
+        """Gets the status of the latest conversion of a schema file.
+
+        Args:
+            file: Name of the schema file, without its extension.
+
+        Returns:
+            Conversion, or None if the file has never been queued.
+        """
+        with transaction(self.path, self.timeout) as connection:
+            row = connection.execute("SELECT * FROM conversions WHERE file = ?", (file,)).fetchone()
+        if row is None:
+            return None
+        conversion = Conversion(**row)
+        last_update = conversion.started_at or conversion.queued_at
+        if conversion.state in IN_FLIGHT and time.time() - last_update > self.stale_after:
+            return conversion._replace(state=FAILED, error="Conversion was interrupted")
+        return conversion
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops the background thread once queued conversions are done.
+
+        Args:
+            wait: Whether to wait for the queued conversions.
+        """
+        self._executor.shutdown(wait=wait)
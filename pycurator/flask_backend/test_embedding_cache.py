@@ -0,0 +1,72 @@
+# noqa
+from typing import List, Optional, Sequence
+from unittest import TestCase
+import weakref
+
+import torch
+
+from pycurator.flask_backend.embedding_cache import CachedEncoder
+
+
+class FakeModel:  # noqa
+    def __init__(self) -> None:  # noqa
+        self.calls: List[Sequence[str]] = []
+        self.output: Optional["weakref.ReferenceType[torch.Tensor]"] = None
+
+    def encode(  # noqa pylint: disable=unused-argument
+        self, sentences: Sequence[str], batch_size: int = 32, convert_to_tensor: bool = False
+    ) -> torch.Tensor:
+        self.calls.append(list(sentences))
+        output = torch.tensor([[float(len(text)), float(text.count("a"))] for text in sentences])
+        self.output = weakref.ref(output)
+        return output
+
+
+def storage_bytes(tensor: torch.Tensor) -> int:  # noqa
+    # `untyped_storage` replaced `storage` in newer versions of PyTorch
+    if hasattr(tensor, "untyped_storage"):
+        return int(tensor.untyped_storage().size())
+    return int(tensor.storage().size()) * tensor.element_size()  # type: ignore
+
+
+class TestCachedEncoder(TestCase):  # noqa
+    def test_encode(self) -> None:  # noqa
+        model = FakeModel()
+        encoder = CachedEncoder(model, "fake", max_bytes=2**20)
+
+        first = encoder.encode(["a cat", "a  dog "], convert_to_tensor=True)
+        second = encoder.encode(["a dog", "a bat", "a cat"], convert_to_tensor=True)
+        self.assertEqual(model.calls, [["a cat", "a dog"], ["a bat"]])
+        self.assertTrue(torch.equal(second[0], first[1]))
+        self.assertTrue(torch.equal(second[2], first[0]))
+        self.assertEqual(encoder.encode("a cat").tolist(), [5.0, 2.0])
+
+        stats = encoder.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (3, 3, 3))
+
+    def test_eviction(self) -> None:  # noqa
+        model = FakeModel()
+        # Room for two embeddings of two floats
+        encoder = CachedEncoder(model, "fake", max_bytes=16)
+
+        encoder.encode(["a", "b"])
+        encoder.encode(["a"])
+        encoder.encode(["c"])
+        encoder.encode(["a", "b"])
+        self.assertEqual(model.calls, [["a", "b"], ["c"], ["b"]])
+        self.assertEqual(encoder.stats()["evictions"], 2)
+        self.assertLessEqual(encoder.stats()["bytes"], 16)
+
+    def test_batch_freed(self) -> None:  # noqa
+        model = FakeModel()
+        encoder = CachedEncoder(model, "fake", max_bytes=16)
+        encoder.encode(["a", "b", "c", "d"])
+        # Cached embeddings own their storage rather than viewing the model's output
+        self.assertIsNotNone(model.output)
+        assert model.output is not None
+        self.assertIsNone(model.output())
+        for embedding in encoder._entries.values():  # pylint: disable=protected-access
+            self.assertEqual(
+                storage_bytes(embedding), embedding.element_size() * embedding.nelement()
+            )
+        self.assertEqual(encoder.stats()["bytes"], 16)
@@ -0,0 +1,70 @@
+# noqa
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import List, Sequence
+from unittest import TestCase
+
+import torch
+
+from pycurator.flask_backend.embedding_store import (
+    StoreHeader,
+    load_store,
+    read_header,
+    update_store,
+    write_store,
+)
+
+
+class TestEmbeddingStore(TestCase):  # noqa
+    def test_round_trip(self) -> None:  # noqa
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "primitives.emb"
+            self.assertIsNone(read_header(path))
+
+            header = StoreHeader(
+                ontology_hash="abc",
+                model_id="model",
+                dtype="float32",
+                dim=3,
+                rows=[("Life.Die.Unspecified", "definition"), ("Life.Die.Unspecified", "template")],
+                hashes=["def", "ghi"],
+            )
+            embeddings = torch.arange(6, dtype=torch.float).view(2, 3)
+            write_store(path, header, embeddings)
+            self.assertEqual(read_header(path), header)
+
+            loaded_header, loaded = load_store(path)
+            self.assertEqual(loaded_header, header)
+            self.assertTrue(torch.equal(loaded, embeddings))
+
+            path.write_bytes(b"not a store")
+            self.assertIsNone(read_header(path))
+
+    def test_update(self) -> None:  # noqa
+        encoded: List[str] = []
+
+        def encode(texts: Sequence[str]) -> torch.Tensor:
+            encoded.extend(texts)
+            return torch.tensor([[float(len(text)), 1.0] for text in texts])
+
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "primitives.emb"
+            rows = [("A", "definition"), ("B", "definition"), ("C", "definition")]
+
+            changes = update_store(path, "model", rows, ["a", "bb", "ccc"], encode)
+            self.assertEqual((len(changes.added), changes.reused), (3, 0))
+            changes = update_store(path, "model", rows, ["a", "bb", "ccc"], encode)
+            self.assertEqual((len(changes.added), changes.reused), (0, 3))
+            self.assertEqual(encoded, ["a", "bb", "ccc"])
+
+            new_rows = [("A", "definition"), ("C", "definition"), ("D", "definition")]
+            changes = update_store(path, "model", new_rows, ["a", "cc", "dddd"], encode)
+            self.assertEqual(changes.added, [("D", "definition")])
+            self.assertEqual(changes.changed, [("C", "definition")])
+            self.assertEqual(changes.removed, [("B", "definition")])
+            self.assertEqual(changes.reused, 1)
+            self.assertEqual(encoded[3:], ["cc", "dddd"])
+
+            _, embeddings = load_store(path)
+            expected = torch.tensor([[1.0, 1.0], [2.0, 1.0], [4.0, 1.0]])
+            self.assertTrue(torch.allclose(embeddings, torch.nn.functional.normalize(expected)))
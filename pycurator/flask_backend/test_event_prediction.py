@@ -0,0 +1,89 @@
+# noqa
+from typing import List, MutableMapping, Sequence, cast
+from unittest import TestCase
+import zlib
+
+from sdf.ontology import ontology
+import torch
+from torch.nn import functional
+
+from pycurator.flask_backend.event_prediction import (
+    NUM_EVENTS,
+    PrimitiveIndex,
+    request_top_n,
+    request_top_n_batch,
+)
+
+
+class FakeModel:  # noqa
+    def __init__(self) -> None:  # noqa
+        self.calls: List[Sequence[str]] = []
+
+    def encode(  # noqa pylint: disable=unused-argument
+        self, sentences: Sequence[str], batch_size: int = 32, convert_to_tensor: bool = False
+    ) -> torch.Tensor:
+        self.calls.append(list(sentences))
+        embeddings = []
+        for text in sentences:
+            generator = torch.Generator().manual_seed(zlib.crc32(text.encode("utf-8")))
+            embeddings.append(torch.randn(16, generator=generator))
+        return torch.stack(embeddings)
+
+
+class TestPrimitivePrediction(TestCase):  # noqa
+    def setUp(self) -> None:  # noqa
+        generator = torch.Generator().manual_seed(0)
+        self.definitions = cast(torch.FloatTensor, torch.randn(NUM_EVENTS, 16, generator=generator))
+        self.templates = cast(torch.FloatTensor, torch.randn(NUM_EVENTS, 16, generator=generator))
+        self.index = PrimitiveIndex.from_embeddings(self.definitions, self.templates)
+        self.descriptions = ["attack the city", "flee the country", "", "sign a treaty", "  "]
+
+    def expected_types(self, description: str, n: int) -> Sequence[str]:  # noqa
+        # Scores each subtype by its most similar definition or template, one event at a time
+        query = functional.normalize(FakeModel().encode([description])[0], dim=0)
+        subtype_scores: MutableMapping[str, float] = {}
+        for i, event in enumerate(ontology.events.values()):
+            primitive = f"{event.type}.{event.subtype}"
+            for embedding in (self.definitions[i], self.templates[i]):
+                score = float(query @ functional.normalize(embedding, dim=0))
+                subtype_scores[primitive] = max(subtype_scores.get(primitive, -2.0), score)
+        return sorted(subtype_scores, key=lambda primitive: -subtype_scores[primitive])[:n]
+
+    def test_batch_matches_single(self) -> None:  # noqa
+        model = FakeModel()
+        batch = request_top_n_batch(self.descriptions, n=3, ss_model=model, index=self.index)
+        # Empty descriptions are not encoded, but whitespace-only ones are
+        self.assertEqual(
+            model.calls, [["attack the city", "flee the country", "sign a treaty", "  "]]
+        )
+
+        self.assertEqual(len(batch), len(self.descriptions))
+        for description, predictions in zip(self.descriptions, batch):
+            single = request_top_n(description, n=3, ss_model=FakeModel(), index=self.index)
+            self.assertEqual(predictions, single)
+            if description:
+                self.assertEqual(
+                    [prediction["type"] for prediction in predictions],
+                    self.expected_types(description, 3),
+                )
+            else:
+                self.assertEqual(predictions, [])
+
+    def test_from_embeddings(self) -> None:  # noqa
+        batch = request_top_n_batch(
+            self.descriptions,
+            n=3,
+            ss_model=FakeModel(),
+            definition_embeddings=self.definitions,
+            template_embeddings=self.templates,
+        )
+        self.assertEqual(
+            batch,
+            request_top_n_batch(self.descriptions, n=3, ss_model=FakeModel(), index=self.index),
+        )
+
+    def test_empty(self) -> None:  # noqa
+        model = FakeModel()
+        self.assertEqual(request_top_n_batch([], n=3, ss_model=model, index=self.index), [])
+        self.assertEqual(request_top_n_batch([""], n=3, ss_model=model, index=self.index), [[]])
+        self.assertEqual(model.calls, [])
@@ -0,0 +1,101 @@
+# noqa
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from typing import Any, List
+from unittest import TestCase
+from urllib.parse import parse_qs, urlparse
+
+from pycurator.flask_backend.kgtk_client import KgtkClient, KgtkUnavailable
+
+
+class FakeKgtkHandler(BaseHTTPRequestHandler):  # noqa
+    server: "FakeKgtkServer"
+
+    def do_GET(self) -> None:  # noqa pylint: disable=invalid-name
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)["q"][0]
+        with server.lock:
+            server.queries.append(query)
+            failing = server.failures > 0
+            server.failures -= 1
+        time.sleep(server.latency)
+        if failing:
+            self.send_response(HTTPStatus.SERVICE_UNAVAILABLE)
+            self.end_headers()
+            return
+        body = json.dumps([{"qnode": "Q1", "label": [query]}]).encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:  # noqa
+        pass
+
+
+class FakeKgtkServer(ThreadingHTTPServer):  # noqa
+    def __init__(self, latency: float, failures: int) -> None:  # noqa
+        super().__init__(("127.0.0.1", 0), FakeKgtkHandler)
+        self.latency = latency
+        self.failures = failures
+        self.queries: List[str] = []
+        self.lock = threading.Lock()
+
+
+class TestKgtkClient(TestCase):  # noqa
+    def start_server(self, latency: float = 0.0, failures: int = 0) -> FakeKgtkServer:  # noqa
+        server = FakeKgtkServer(latency, failures)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def make_client(self, server: FakeKgtkServer, **kwargs: Any) -> KgtkClient:  # noqa
+        return KgtkClient(url=f"http://127.0.0.1:{server.server_port}/api", backoff=0.0, **kwargs)
+
+    def test_concurrent(self) -> None:  # noqa
+        server = self.start_server(latency=0.3)
+        client = self.make_client(server)
+        start = time.perf_counter()
+        results = client.search_many(["attack", "attacking", "war crime"])
+        elapsed = time.perf_counter() - start
+        self.assertEqual(
+            [result and result[0]["label"] for result in results],
+            [["attack"], ["attacking"], ["war crime"]],
+        )
+        self.assertLess(elapsed, 0.6)
+
+    def test_retry(self) -> None:  # noqa
+        server = self.start_server(failures=2)
+        client = self.make_client(server, retries=2)
+        self.assertEqual(client.search("attack")[0]["qnode"], "Q1")
+        self.assertEqual(len(server.queries), 3)
+
+    def test_circuit_breaker(self) -> None:  # noqa
+        server = self.start_server(failures=100)
+        client = self.make_client(server, retries=0, failure_threshold=2, reset_timeout=0.2)
+        self.assertEqual(client.search_many(["a", "b", "c"]), [None, None, None])
+        self.assertLessEqual(len(server.queries), 3)
+
+        requested = len(server.queries)
+        with self.assertRaises(KgtkUnavailable):
+            client.search("d")
+        self.assertEqual(len(server.queries), requested)
+
+        time.sleep(0.3)
+        server.failures = 0
+        self.assertEqual(client.search("e")[0]["qnode"], "Q1")
+        self.assertEqual(client.search("f")[0]["qnode"], "Q1")
+
+    def test_retries_count_toward_breaker(self) -> None:  # noqa
+        server = self.start_server(failures=100)
+        client = self.make_client(server, retries=5, failure_threshold=2, reset_timeout=60)
+        with self.assertRaises(KgtkUnavailable):
+            client.search("a")
+        # Retrying stops once the circuit opens
+        self.assertEqual(len(server.queries), 2)
@@ -0,0 +1,55 @@
+# noqa
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from pycurator.flask_backend.kgtk_index import LocalKgtkIndex, build_index, parse_string
+
+EDGES = """id\tnode1\tlabel\tnode2
+e1\tQ1\tlabel\t'attack'@en
+e2\tQ1\tlabel\t'Angriff'@de
+e3\tQ1\talias\t'assault'@en
+e4\tQ1\tdescription\t'offensive action'@en
+e5\tQ2\tlabel\t'Attack'@en
+e6\tQ2\tdescription\t'band'@en
+e7\tQ3\tlabel\t'attack'@en
+e8\tQ4\tP31\tQ1
+e9\tQ2\tP279\tQ5
+"""
+
+
+class TestKgtkIndex(TestCase):  # noqa
+    def test_parse_string(self) -> None:  # noqa
+        self.assertEqual(parse_string("'it\\'s'@en"), "it's")
+        self.assertEqual(parse_string("'attack'@en-gb"), "attack")
+        self.assertIsNone(parse_string("'Angriff'@de"))
+        self.assertIsNone(parse_string("Q5"))
+
+    def test_search(self) -> None:  # noqa
+        with TemporaryDirectory() as temp_dir:
+            dump_path = Path(temp_dir) / "dump.tsv"
+            dump_path.write_text(EDGES)
+            index_path = Path(temp_dir) / "index.sqlite"
+            self.assertEqual(build_index([dump_path], index_path), 6)
+            index = LocalKgtkIndex(index_path)
+
+            self.assertEqual(
+                index.search("attack"),
+                [
+                    {
+                        "qnode": "Q1",
+                        "label": ["attack"],
+                        "alias": ["assault"],
+                        "description": ["offensive action"],
+                    },
+                    {"qnode": "Q2", "label": ["Attack"], "alias": [], "description": ["band"]},
+                ],
+            )
+            self.assertEqual([c["qnode"] for c in index.search("assault")], ["Q1"])
+            self.assertEqual(
+                [c["qnode"] for c in index.search("Attack", ignore_case=False)], ["Q2"]
+            )
+            self.assertEqual(
+                [c["qnode"] for c in index.search("attack", is_class=False)], ["Q1", "Q3", "Q2"]
+            )
+            self.assertEqual(index.search_many(["war", "ASSAULT"])[0], [])
@@ -0,0 +1,109 @@
+# noqa
+import json
+from pathlib import Path
+import sqlite3
+from tempfile import TemporaryDirectory
+import time
+from unittest import TestCase
+
+from pycurator.flask_backend.kgtk_store import CANDIDATES, EVENT_RESPONSES, KgtkStore
+
+
+class TestKgtkStore(TestCase):  # noqa
+    def setUp(self) -> None:  # noqa
+        self.temp_dir = TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.directory = Path(self.temp_dir.name)
+        self.path = self.directory / "kgtk_cache.sqlite"
+
+    def test_expiry(self) -> None:  # noqa
+        store = KgtkStore(self.path, ttl=60, negative_ttl=0.1, max_bytes=10_000)
+        self.assertIsNone(store.get(CANDIDATES, "attack"))
+        store.put(CANDIDATES, "attack", [{"qnode": "Q1"}])
+        store.put(CANDIDATES, "xyzzy", [], negative=True)
+        self.assertEqual(store.get(CANDIDATES, "attack"), [{"qnode": "Q1"}])
+        self.assertEqual(store.get(CANDIDATES, "xyzzy"), [])
+        self.assertIsNone(store.get(EVENT_RESPONSES, "attack"))
+
+        time.sleep(0.2)
+        self.assertIsNone(store.get(CANDIDATES, "xyzzy"))
+        self.assertEqual(KgtkStore(self.path).get(CANDIDATES, "attack"), [{"qnode": "Q1"}])
+        self.assertEqual((store.hits, store.misses), (2, 3))
+
+    def test_journal_mode(self) -> None:  # noqa
+        def journal_mode() -> str:
+            connection = sqlite3.connect(str(self.path))
+            try:
+                mode: str = connection.execute("PRAGMA journal_mode").fetchone()[0]
+            finally:
+                connection.close()
+            return mode
+
+        KgtkStore(self.path)
+        self.assertEqual(journal_mode(), "delete")
+        KgtkStore(self.path, wal=True)
+        self.assertEqual(journal_mode(), "wal")
+        # Write-ahead logging persists in the file, so disabling it switches back
+        KgtkStore(self.path, wal=False)
+        self.assertEqual(journal_mode(), "delete")
+
+    def test_eviction(self) -> None:  # noqa
+        store = KgtkStore(self.path, max_bytes=100, access_interval=0, evict_interval=1)
+        value = ["x" * 40]
+        store.put(CANDIDATES, "a", value)
+        store.put(CANDIDATES, "b", value)
+        store.get(CANDIDATES, "a")
+        store.put(CANDIDATES, "c", value)
+        self.assertIsNone(store.get(CANDIDATES, "b"))
+        self.assertEqual(store.get(CANDIDATES, "a"), value)
+        self.assertEqual(store.get(CANDIDATES, "c"), value)
+
+    def test_evict_interval(self) -> None:  # noqa
+        store = KgtkStore(self.path, max_bytes=100, access_interval=0, evict_interval=3)
+        value = ["x" * 40]
+        for key in ("a", "b", "c"):
+            self.assertIsNone(store.get(CANDIDATES, key))
+            store.put(CANDIDATES, key, value)
+            # Excess entries are only evicted every third store
+            if key != "c":
+                self.assertEqual(store.get(CANDIDATES, "a"), value)
+        self.assertIsNone(store.get(CANDIDATES, "b"))
+        self.assertEqual(store.get(CANDIDATES, "c"), value)
+        self.assertEqual(store.stats()["namespaces"][CANDIDATES]["entries"], 2)
+
+    def test_access_interval(self) -> None:  # noqa
+        def accessed_at() -> float:
+            connection = sqlite3.connect(str(self.path))
+            try:
+                accessed: float = connection.execute("SELECT accessed_at FROM entries").fetchone()[
+                    0
+                ]
+            finally:
+                connection.close()
+            return accessed
+
+        store = KgtkStore(self.path, access_interval=0.1)
+        store.put(CANDIDATES, "attack", [{"qnode": "Q1"}])
+        stored = accessed_at()
+        # Lookups soon after the last recorded access don't write
+        store.get(CANDIDATES, "attack")
+        self.assertEqual(accessed_at(), stored)
+        time.sleep(0.2)
+        store.get(CANDIDATES, "attack")
+        self.assertGreater(accessed_at(), stored)
+
+    def test_migrate(self) -> None:  # noqa
+        cache_dir = self.directory / "events"
+        cache_dir.mkdir()
+        response = {"event_verb": "attack", "options": [{"qnode": "Q1"}]}
+        (cache_dir / "attack.json").write_text(json.dumps(response))
+        (cache_dir / "xyzzy.json").write_text(json.dumps({"event_verb": [], "options": []}))
+
+        store = KgtkStore(self.path)
+        store.put(EVENT_RESPONSES, "xyzzy", {"event_verb": "xyzzy", "options": []}, negative=True)
+        self.assertEqual(store.migrate(EVENT_RESPONSES, cache_dir), 1)
+        self.assertEqual(store.migrate(EVENT_RESPONSES, cache_dir), 0)
+        self.assertEqual(store.get(EVENT_RESPONSES, "attack"), response)
+        kept = store.get(EVENT_RESPONSES, "xyzzy")
+        assert kept is not None
+        self.assertEqual(kept["event_verb"], "xyzzy")
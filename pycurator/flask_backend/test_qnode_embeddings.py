@@ -0,0 +1,38 @@
+# noqa
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import List, Sequence
+from unittest import TestCase
+
+import torch
+
+from pycurator.flask_backend.qnode_embeddings import QnodeEmbeddingStore
+
+
+class TestQnodeEmbeddingStore(TestCase):  # noqa
+    def test_embed(self) -> None:  # noqa
+        encoded: List[str] = []
+
+        def encode(texts: Sequence[str]) -> torch.Tensor:
+            encoded.extend(texts)
+            return torch.tensor([[float(len(text)), 1.0] for text in texts])
+
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "qnode_embeddings.sqlite"
+            store = QnodeEmbeddingStore("model", path)
+            candidates = [
+                {"qnode": "Q1", "description": ["a"]},
+                {"qnode": "Q2", "description": ["bbb"]},
+            ]
+            first = store.embed(candidates, encode)
+            expected = torch.nn.functional.normalize(torch.tensor([[1.0, 1.0], [3.0, 1.0]]))
+            self.assertTrue(torch.allclose(first, expected))
+
+            changed = [{"qnode": "Q2", "description": ["cc"]}, candidates[0]]
+            second = QnodeEmbeddingStore("model", path).embed(changed, encode)
+            self.assertTrue(torch.allclose(second[1], first[0]))
+            self.assertEqual(encoded, ["a", "bbb", "cc"])
+
+            QnodeEmbeddingStore("other model", path).embed(candidates[:1], encode)
+            self.assertEqual(encoded[3:], ["a"])
+            self.assertEqual((store.hits, store.misses), (0, 2))
@@ -0,0 +1,54 @@
+# noqa
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, List, Mapping
+from unittest import TestCase
+
+from pycurator.flask_backend.schema_cache import SchemaResponseCache
+
+
+class TestSchemaResponseCache(TestCase):  # noqa
+    def test_get(self) -> None:  # noqa
+        built: List[str] = []
+
+        def build(schema_path: Path, recommendation_path: Path) -> Mapping[str, Any]:
+            built.append(schema_path.stem)
+            return {
+                "schema": schema_path.read_text(),
+                "recommended": recommendation_path.exists(),
+            }
+
+        with TemporaryDirectory() as temp_dir:
+            cache = SchemaResponseCache(max_entries=1)
+            a_path = Path(temp_dir) / "a.yaml"
+            a_recommendations = Path(temp_dir) / "a.json"
+            b_path = Path(temp_dir) / "b.yaml"
+            a_path.write_text("a")
+            b_path.write_text("b")
+
+            etag, response = cache.get(a_path, a_recommendations, build)
+            self.assertEqual(response, {"schema": "a", "recommended": False})
+            self.assertEqual(cache.get(a_path, a_recommendations, build), (etag, response))
+            self.assertEqual(cache.etag(a_path, a_recommendations), etag)
+            self.assertEqual(built, ["a"])
+
+            a_recommendations.write_text("{}")
+            new_etag, response = cache.get(a_path, a_recommendations, build)
+            self.assertNotEqual(new_etag, etag)
+            self.assertTrue(response["recommended"])
+
+            a_path.write_text("aa")
+            os.utime(a_path, ns=(0, 0))
+            _, response = cache.get(a_path, a_recommendations, build)
+            self.assertEqual(response["schema"], "aa")
+            self.assertEqual(built, ["a", "a", "a"])
+
+            cache.get(b_path, Path(temp_dir) / "b.json", build)
+            cache.get(a_path, a_recommendations, build)
+            self.assertEqual(built, ["a", "a", "a", "b", "a"])
+            self.assertEqual(cache.stats()["evictions"], 2)
+
+            self.assertIsNone(cache.etag(Path(temp_dir) / "c.yaml", a_recommendations))
+            with self.assertRaises(FileNotFoundError):
+                cache.get(Path(temp_dir) / "c.yaml", a_recommendations, build)
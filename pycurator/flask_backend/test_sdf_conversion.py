@@ -0,0 +1,50 @@
+# noqa
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import threading
+import time
+from typing import Any
+from unittest import TestCase
+
+from pycurator.flask_backend.sdf_conversion import FAILED, FINISHED, QUEUED, ConversionQueue
+
+
+class TestConversionQueue(TestCase):  # noqa
+    def test_submit(self) -> None:  # noqa
+        release = threading.Event()
+
+        def convert(yaml_path: Path) -> Any:
+            release.wait()
+            if yaml_path.stem == "bad":
+                raise ValueError("invalid schema")
+            return {}
+
+        with TemporaryDirectory() as temp_dir:
+            queue = ConversionQueue(Path(temp_dir) / "conversions.sqlite", convert)
+            queue.submit(Path(temp_dir) / "good.yaml")
+            queue.submit(Path(temp_dir) / "bad.yaml")
+            bad = queue.status("bad")
+            assert bad is not None
+            self.assertEqual(bad.state, QUEUED)
+            self.assertIsNone(queue.status("missing"))
+
+            release.set()
+            queue.shutdown()
+            good = queue.status("good")
+            bad = queue.status("bad")
+            assert good is not None and bad is not None
+            self.assertEqual(good.state, FINISHED)
+            self.assertEqual(bad.state, FAILED)
+            self.assertIn("invalid schema", bad.error or "")
+
+    def test_stale(self) -> None:  # noqa
+        with TemporaryDirectory() as temp_dir:
+            queue = ConversionQueue(
+                Path(temp_dir) / "conversions.sqlite", lambda path: time.sleep(1), stale_after=0.1
+            )
+            queue.submit(Path(temp_dir) / "slow.yaml")
+            time.sleep(0.2)
+            slow = queue.status("slow")
+            assert slow is not None
+            self.assertEqual(slow.state, FAILED)
+            queue.shutdown()
@@ -1,11 +1,22 @@
 """Module for querying and selecting KGTK candidates."""
 
-from typing import Any, Callable, List, Mapping, Sequence
-import urllib
+import functools
+from typing import Any, Callable, List, Mapping, Optional, Sequence, Union
 
-import numpy as np
-import requests
-from sentence_transformers import SentenceTransformer, util as ss_util
+from sentence_transformers import util as ss_util
+from torch.nn import functional
+
+from pycurator.common.config import settings
+from pycurator.flask_backend.embedding_cache import Encoder
+from pycurator.flask_backend.kgtk_client import KgtkClient
+from pycurator.flask_backend.kgtk_index import LocalKgtkIndex
+from pycurator.flask_backend.qnode_embeddings import QnodeEmbeddingStore
+
+# Source of candidates, either KGTK's API or a local index with the same interface
+KgtkBackend = Union[KgtkClient, LocalKgtkIndex]
+
+# Shared by all requests, so that connections are reused
+KGTK_CLIENT: KgtkBackend = LocalKgtkIndex() if settings.kgtk_backend == "local" else KgtkClient()
 
 
 def make_kgtk_candidates_filter(source_str: str) -> Callable[[Mapping[str, Any]], bool]:
@@ -28,71 +39,95 @@ def make_kgtk_candidates_filter(source_str: str) -> Callable[[Mapping[str, Any]]
 
 
 def get_ss_model_similarity(
-    ss_model: SentenceTransformer, source_str: str, candidates: List[Mapping[str, Any]]
+    ss_model: Encoder,
+    source_str: str,
+    candidates: List[Mapping[str, Any]],
+    qnode_store: Optional[QnodeEmbeddingStore] = None,
 ) -> Any:
     """Computes cosine similarity between source string (event description or refvar) and candidate descriptions.
 
     Args:
-        ss_model: A SentenceTransformer model.
+        ss_model: A SentenceTransformer model, or cache wrapping it.
         source_str: The source string for comparing embedding similarity.
         candidates: A list of JSON (dict) objects representing candidates.
+        qnode_store: Store of candidate description embeddings. If given, only descriptions which
+            aren't stored are encoded.
 
     Returns:
         A tensor of similarity scores.
     """
-    all_strings = [source_str] + [candidate["description"][0] for candidate in candidates]
-    all_encodings = ss_model.encode(all_strings, convert_to_tensor=True)
-    source_emb, candidate_emb = all_encodings[0], all_encodings[1:]
-    sim_scores = ss_util.pytorch_cos_sim(source_emb, candidate_emb)[0]
-    return sim_scores
+    if qnode_store is None:
+        all_strings = [source_str] + [candidate["description"][0] for candidate in candidates]
+        all_encodings = ss_model.encode(all_strings, convert_to_tensor=True)
+        source_emb, candidate_emb = all_encodings[0], all_encodings[1:]
+        sim_scores = ss_util.pytorch_cos_sim(source_emb, candidate_emb)[0]
+        return sim_scores
+
+    encode = functools.partial(ss_model.encode, convert_to_tensor=True)
+    candidate_emb = qnode_store.embed(candidates, encode)
+    source_emb = functional.normalize(encode([source_str]).float(), dim=1).to(candidate_emb)
+    return (source_emb @ candidate_emb.T)[0]
 
 
-def get_request_kgtk(query: str) -> List[Mapping[str, Any]]:
+def get_request_kgtk(query: str, client: KgtkBackend = KGTK_CLIENT) -> List[Mapping[str, Any]]:
     """Submits a GET request to KGTK's API.
 
     Args:
         query: A string to query against KGTK's Wikidata.
+        client: Client for KGTK's API, or local index.
 
     Returns:
         A list of candidates, or an empty list.
     """
-    formatted_query = urllib.parse.quote(query)
-    kgtk_request_url = f"https://kgtk.isi.edu/api?q={formatted_query}&extra_info=true&language=en&type=exact&is_class=true"
-    try:
-        kgtk_response = requests.get(kgtk_request_url, timeout=5, verify=False)
-    except requests.exceptions.RequestException:
-        return []
-    if kgtk_response.status_code != 200:
-        return []
-    else:
-        candidates = list(kgtk_response.json())
-        filtered_candidates = list(filter(make_kgtk_candidates_filter(query), candidates))
-        return filtered_candidates
+    return get_requests_kgtk([query], client)[0] or []
+
+
+def get_requests_kgtk(
+    queries: Sequence[str], client: KgtkBackend = KGTK_CLIENT
+) -> Sequence[Optional[List[Mapping[str, Any]]]]:
+    """Submits GET requests for several queries to KGTK's API concurrently.
+
+    Args:
+        queries: Strings to query against KGTK's Wikidata.
+        client: Client for KGTK's API, or local index.
+
+    Returns:
+        A list of candidates for each query, or None for queries which failed.
+    """
+    return [
+        None if candidates is None else list(filter(make_kgtk_candidates_filter(query), candidates))
+        for query, candidates in zip(queries, client.search_many(queries))
+    ]
 
 
 def wikidata_topk(
-    ss_model: SentenceTransformer,
+    ss_model: Encoder,
     source_str: str,
     candidates: List[Mapping[str, Any]],
     k: int,
     thresh: float = 0.15,
+    qnode_store: Optional[QnodeEmbeddingStore] = None,
 ) -> Sequence[Mapping[str, Any]]:
     """Returns top k candidates for string according to scoring function.
 
     Args:
-        ss_model: A SentenceTransformer model.
+        ss_model: A SentenceTransformer model, or cache wrapping it.
         source_str: A string that candidates will be generated for.
         candidates: A list of JSON (dict) objects representing candidates.
         k: The maximum number of top candidates to return.
         thresh: The minimum cosine similarity to be selected.
+        qnode_store: Store of candidate description embeddings.
 
     Returns:
         A list of k candidates.
     """
-    sent_sim_scores = get_ss_model_similarity(ss_model, source_str, candidates)
-    top_k_idx = np.argsort(-sent_sim_scores)[:k]
-    top_k_scores = list(zip(top_k_idx, sent_sim_scores[top_k_idx]))
-    top_k = [candidates[idx] for idx, score in top_k_scores if score >= thresh]
+    sent_sim_scores = get_ss_model_similarity(ss_model, source_str, candidates, qnode_store)
+    top_k_scores = sent_sim_scores.topk(min(k, len(candidates)))
+    top_k = [
+        candidates[idx]
+        for idx, score in zip(top_k_scores.indices.tolist(), top_k_scores.values.tolist())
+        if score >= thresh
+    ]
     return top_k
 
 
@@ -5,6 +5,7 @@ from pathlib import Path
 import subprocess
 
 from pycurator.common.paths import EVENT_REC_DIR, SCHEMA_DIR
+from pycurator.gpt2_component.ledger import DEFAULT_STALE_AFTER, JobLedger, file_hash
 
 SLURM_LOG_DIR = Path("slurm_logs")
 
@@ -12,6 +13,12 @@ SLURM_LOG_DIR = Path("slurm_logs")
 def main() -> None:
     """Starts jobs for each schema."""
     p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument(
+        "--stale-hours",
+        type=float,
+        default=DEFAULT_STALE_AFTER / 3600,
+        help="Number of hours after which queued or running schemas are assumed to have died.",
+    )
     args = p.parse_args()
 
     if not SCHEMA_DIR.is_dir():
@@ -22,26 +29,37 @@ def main() -> None:
 
     # Read in file paths
     input_paths = sorted(SCHEMA_DIR.glob("*.yaml"))
+    ledger = JobLedger()
 
     total = 0
     for yaml_path in input_paths:
         # Determine output path
         json_path = EVENT_REC_DIR / f"{yaml_path.stem}.json"
 
-        # Don't re-run on existing schemas
-        if json_path.exists():
+        # Don't re-run on schemas which are up to date or already queued or running
+        if not ledger.needs_run(yaml_path, json_path, args.stale_hours * 3600):
             continue
 
-        # Submit Slurm job for each partition
-        command_tokens = ["sbatch"]
+        # Queue before submitting, since the job may start before `sbatch` returns
+        run_id = ledger.queue(yaml_path.stem, file_hash(yaml_path))
+
+        # Submit Slurm job for each schema
+        command_tokens = ["sbatch", "--parsable"]
         command_tokens.extend(("run_slurm.sh", str(yaml_path), str(json_path)))
         command = " ".join(command_tokens)
         print(f"Submitting `{command}`")
-        subprocess.run(command, shell=True, check=True)
+        try:
+            result = subprocess.run(
+                command, shell=True, check=True, stdout=subprocess.PIPE, universal_newlines=True
+            )
+        except BaseException as ex:
+            ledger.fail(run_id, repr(ex))
+            raise
+        ledger.set_job_id(run_id, result.stdout.strip())
 
         total += 1
 
-    print(f"{total} schema runs started on {args.slurm_partition}")
+    print(f"{total} schema runs started")
 
 
 if __name__ == "__main__":
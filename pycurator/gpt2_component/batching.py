@@ -0,0 +1,134 @@
+"""Dynamic batching of concurrent GPT-2 prediction requests."""
+
+from collections import Counter
+from concurrent.futures import Future
+import logging
+import queue
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Counter as tCounter,
+    Generic,
+    List,
+    Mapping,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+RequestT = TypeVar("RequestT")
+ResultT = TypeVar("ResultT")
+
+
+class BatchScheduler(Generic[RequestT, ResultT]):
+    """Collects requests arriving within a short window and runs them as a single batch.
+
+    A single background thread owns the model, so requests from any number of server threads can be
+    submitted concurrently.
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[Sequence[RequestT]], Sequence[ResultT]],
+        max_batch_size: int,
+        max_wait: float,
+    ) -> None:
+        """Constructor.
+
+        Args:
+            predict: Function making predictions for a batch of requests, in the same order.
+            max_batch_size: Maximum number of requests in a batch.
+            max_wait: Maximum time in seconds to wait for more requests after the first one arrives.
+        """
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        # Request, future for its result, and time it was queued
+        self._queue: "queue.Queue[Tuple[RequestT, Future[ResultT], float]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes: tCounter[int] = Counter()
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+        self._total_run_time = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, request: RequestT) -> ResultT:
+        """Queues a request and waits for its predictions.
+
+        Args:
+            request: Request, such as an input text.
+
+        Returns:
+            Predictions for the request.
+        """
+        future: "Future[ResultT]" = Future()
+        self._queue.put((request, future, time.monotonic()))
+        return future.result()
+
+    def metrics(self) -> Mapping[str, Any]:
+        """Summarizes the scheduler's activity.
+
+        Returns:
+            Queue depth, batch size, wait time, and run time statistics.
+        """
+        with self._lock:
+            num_batches = sum(self._batch_sizes.values())
+            num_requests = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": num_batches,
+                "requests": num_requests,
+                "mean_batch_size": num_requests / num_batches if num_batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "mean_wait_seconds": self._total_wait / num_requests if num_requests else 0.0,
+                "max_wait_seconds": self._max_wait_seen,
+                "mean_run_seconds": self._total_run_time / num_batches if num_batches else 0.0,
+            }
+
+    def _collect(self) -> List[Tuple[RequestT, "Future[ResultT]", float]]:
+        """Blocks until a request arrives, then collects more until the batch is full or times out.
+
+        Returns:
+            Requests in the batch.
+        """
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Requests that queued up during the previous batch are taken without waiting
+            timeout = max(deadline - time.monotonic(), 0.0)
+            try:
+                batch.append(
+                    self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        """Runs batches until the process exits."""
+        while True:
+            batch = self._collect()
+            start = time.monotonic()
+            waits = [start - queued for _, _, queued in batch]
+            try:
+                predictions = self.predict([request for request, _, _ in batch])
+            except Exception as ex:  # pylint: disable=broad-except
+                logging.exception("Batch of %d requests failed", len(batch))
+                for _, future, _ in batch:
+                    future.set_exception(ex)
+                continue
+            run_time = time.monotonic() - start
+
+            for (_, future, _), prediction in zip(batch, predictions):
+                future.set_result(prediction)
+
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._total_wait += sum(waits)
+                self._max_wait_seen = max(self._max_wait_seen, *waits)
+                self._total_run_time += run_time
@@ -0,0 +1,119 @@
+"""Preparation of GPT-2 for inference on machines without a GPU."""
+
+import os
+from typing import Optional, Set
+
+import torch
+from torch import nn
+from transformers import GPT2LMHeadModel
+from transformers.modeling_utils import Conv1D
+
+from pycurator.common.logger import return_logger
+from pycurator.common.paths import LOG_DIR
+
+# fp32 keeps full precision, bf16 halves memory use, and int8 quantizes weights of linear layers
+CPU_PRECISIONS = ("fp32", "bf16", "int8")
+
+logging = return_logger(LOG_DIR / "gpt2_component.log")
+
+
+def parse_cores(cores: str) -> Set[int]:
+    """Parses a list of CPU cores.
+
+    Args:
+        cores: Comma-separated cores or inclusive ranges of cores, e.g., "0-3,8".
+
+    Returns:
+        Core numbers.
+    """
+    parsed: Set[int] = set()
+    for part in cores.split(","):
+        first, _, last = part.strip().partition("-")
+        parsed.update(range(int(first), int(last or first) + 1))
+    return parsed
+
+
+def configure_cpu(num_threads: Optional[int] = None, cores: Optional[str] = None) -> None:
+    """Pins the process to CPU cores and sets the number of threads used by PyTorch.
+
+    This must be called before the model is run, so that PyTorch's threads are created on the
+    selected cores.
+
+    Args:
+        num_threads: Number of threads for operations such as matrix multiplication. If None, one
+            thread per selected core is used, or PyTorch's default if no cores are selected.
+        cores: Comma-separated cores or inclusive ranges of cores to run on, e.g., "0-3,8". If None,
+            the process may run on any core.
+    """
+    if cores is not None:
+        core_set = parse_cores(cores)
+        os.sched_setaffinity(0, core_set)
+        if num_threads is None:
+            num_threads = len(core_set)
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    logging.info(
+        "Running on cores %s with %d threads",
+        sorted(os.sched_getaffinity(0)),
+        torch.get_num_threads(),
+    )
+
+
+def convert_conv1d_to_linear(module: nn.Module) -> None:
+    """Replaces GPT-2's Conv1D layers with equivalent linear layers, in place.
+
+    Conv1D is a linear layer with transposed weights, which dynamic quantization doesn't recognize.
+
+    Args:
+        module: Module containing Conv1D layers.
+    """
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = nn.Linear(in_features, out_features)
+            linear.weight = nn.Parameter(child.weight.detach().t().contiguous())
+            linear.bias = nn.Parameter(child.bias.detach())
+            setattr(module, name, linear)
+        else:
+            convert_conv1d_to_linear(child)
+
+
+def prepare_for_cpu(gpt2: GPT2LMHeadModel, precision: str) -> GPT2LMHeadModel:
+    """Converts GPT-2 to a precision suitable for running on CPUs.
+
+    FP16 is not used, as most of its operations are slow or not implemented on CPUs.
+
+    Args:
+        gpt2: GPT-2 model in FP32.
+        precision: One of "fp32", "bf16", or "int8".
+
+    Returns:
+        Converted model.
+    """
+    if precision not in CPU_PRECISIONS:
+        raise ValueError(f"CPU precision must be one of {CPU_PRECISIONS}, not {precision!r}")
+    logging.info("Using %s precision on CPU", precision)
+    if precision == "bf16":
+        return gpt2.to(torch.bfloat16)
+    if precision == "int8":
+        convert_conv1d_to_linear(gpt2)
+        quantized: GPT2LMHeadModel = torch.quantization.quantize_dynamic(
+            gpt2, {nn.Linear}, dtype=torch.qint8
+        )
+        return quantized
+    return gpt2
+
+
+def model_precision(gpt2: nn.Module) -> str:
+    """Describes the precision of a model, which affects its outputs.
+
+    Args:
+        gpt2: Model, possibly converted by `prepare_for_cpu` or to FP16.
+
+    Returns:
+        "int8" if its linear layers are quantized, otherwise the type of its parameters, e.g.,
+        "float16".
+    """
+    if any(isinstance(module, torch.nn.quantized.dynamic.Linear) for module in gpt2.modules()):
+        return "int8"
+    return str(next(gpt2.parameters()).dtype).replace("torch.", "")
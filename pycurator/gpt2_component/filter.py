@@ -85,6 +85,34 @@ def cut_trailing_sentence(text: str) -> str:
     return text.strip()
 
 
+def has_complete_sentence(text: str, next_step_number: Optional[int] = None) -> bool:
+    """Checks whether generated text already contains everything that `result_replace` keeps.
+
+    Generation can stop once this is true. The last word is ignored because the next token might
+    extend it, which could change how the first sentence is detected.
+
+    Args:
+        text: Generated text.
+        next_step_number: Number of the step after the generated one. If the text reaches it, the
+            generated step is complete.
+
+    Returns:
+        True if the first sentence is complete, False otherwise.
+    """
+    text = standardize_punctuation(text.replace('."', '".'))
+    last_space = max(text.rfind(" "), text.rfind("\n"))
+    complete_text = text[:last_space] if last_space >= 0 else ""
+
+    if next_step_number is not None and re.search(
+        rf"(?:^|\s){next_step_number}\.(?:\s|$)", complete_text
+    ):
+        return True
+
+    if re.search(pattern=r"[.?!]", string=complete_text) is None:
+        return False
+    return len(SENT_DETECTOR.tokenize(complete_text)) >= 2
+
+
 def result_replace(result: str) -> str:
     """Clean result with filtering character.
 
@@ -1,10 +1,22 @@
 """Execute GPT-2 with extracted sequences."""
 
 import argparse
+import hashlib
 import json
 from pathlib import Path
 import re
-from typing import MutableMapping, MutableSequence, Sequence, Set, Tuple
+from typing import (
+    Any,
+    Callable,
+    List,
+    Mapping,
+    MutableMapping,
+    MutableSequence,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 import unicodedata
 
 import torch
@@ -12,11 +24,34 @@ from transformers import GPT2LMHeadModel, GPT2Tokenizer
 
 from pycurator.common.logger import return_logger
 from pycurator.common.paths import LOG_DIR
-from pycurator.gpt2_component.filter import DefaultCriteria, get_only_k, result_replace
+from pycurator.gpt2_component.cpu_inference import (
+    CPU_PRECISIONS,
+    model_precision,
+    prepare_for_cpu,
+)
+from pycurator.gpt2_component.filter import (
+    Criteria,
+    DefaultCriteria,
+    get_only_k,
+    has_complete_sentence,
+    result_replace,
+)
+from pycurator.gpt2_component.ledger import JobLedger, file_hash
+from pycurator.gpt2_component.prefix_cache import PrefixCache
+from pycurator.gpt2_component.sampling import sample
 from pycurator.gpt2_component.sequences import load_schemas, schema_to_sequences
+from pycurator.gpt2_component.suggestion_cache import SuggestionCache
 
 CACHE_DIR = Path(__file__).resolve().parent / ".model_cache"
 MODEL_NAME = "gpt2-large"
+# Long inputs usually result in useless outputs, so no predictions are made for them
+MAX_INPUT_LENGTH = 300
+# Enforce maximum generated length to prevent memory issues
+MAX_TOTAL_LENGTH = 350
+NUM_SAMPLES = 40
+SAMPLING_PARAMS: Mapping[str, Any] = {"temperature": 0.8, "top_k": 50, "top_p": 0.8}
+# Budget for a single batch, measured as generated rows times their maximum length
+DEFAULT_MAX_BATCH_TOKENS = 32768
 logging = return_logger(LOG_DIR / "gpt2_component.log")
 
 
@@ -32,12 +67,16 @@ def get_device() -> torch.device:
     return device
 
 
-def load_gpt2(name: str, device: torch.device) -> Tuple[GPT2Tokenizer, GPT2LMHeadModel]:
+def load_gpt2(
+    name: str, device: torch.device, cpu_precision: str = "fp32"
+) -> Tuple[GPT2Tokenizer, GPT2LMHeadModel]:
     """Loads GPT-2 into memory.
 
     Args:
         name: Model name.
         device: GPT-2 device.
+        cpu_precision: Precision of the model when running on CPU, one of "fp32", "bf16", or
+            "int8". On GPU, FP16 is always used.
 
     Returns:
         GPT-2 tokenizer and model.
@@ -47,7 +86,11 @@ def load_gpt2(name: str, device: torch.device) -> Tuple[GPT2Tokenizer, GPT2LMHea
     gpt2 = GPT2LMHeadModel.from_pretrained(
         name, pad_token_id=tokenizer.eos_token_id, cache_dir=CACHE_DIR
     ).to(device)
-    gpt2.half()  # Convert to FP16
+    if device.type == "cuda":
+        gpt2.half()  # Convert to FP16
+    else:
+        gpt2 = prepare_for_cpu(gpt2, cpu_precision)
+    gpt2.eval()
     return tokenizer, gpt2
 
 
@@ -66,20 +109,48 @@ def convert_sequence_to_text(
     Returns:
         Text to use as input.
     """
-    formatted_desc = re.sub(r"\s+", " ", schema_desc)
-    initial_input = f"{formatted_desc} Describe steps of {schema_name.replace('_', ' ')}. "
     last_number = f"{len(sequence) + 1}. "
-    sentences = [f"{i + 1}. {p}." for i, p in enumerate(sequence)] + [last_number]
-    text = initial_input + " ".join(sentences)
+    text = get_text_prefixes(schema_name, schema_desc, sequence)[-1] + " " + last_number
     return text
 
 
+def get_text_prefixes(
+    schema_name: str,
+    schema_desc: str,
+    sequence: Sequence[str],
+) -> Sequence[str]:
+    """Gets the prefixes of a sequence's GPT-2 input that other sequences can share.
+
+    The first prefix is the schema description and instruction, and each following prefix adds one
+    step. Prefixes end before a space, so they tokenize the same way on their own as they do within
+    the full input.
+
+    Args:
+        schema_name: Name of schema to run on.
+        schema_desc: Description / definition of the schema.
+        sequence: Sequence of steps.
+
+    Returns:
+        Prefixes, from shortest to longest.
+    """
+    formatted_desc = re.sub(r"\s+", " ", schema_desc)
+    prefix = f"{formatted_desc} Describe steps of {schema_name.replace('_', ' ')}."
+    prefixes = [prefix]
+    for i, p in enumerate(sequence):
+        prefix += f" {i + 1}. {p}."
+        prefixes.append(prefix)
+    return prefixes
+
+
 def make_predictions(
     text: str,
     tokenizer: GPT2Tokenizer,
     gpt2: GPT2LMHeadModel,
     device: torch.device,
     max_output_length: int = 100,
+    prefix_cache: Optional[PrefixCache] = None,
+    prefixes: Sequence[str] = (),
+    stop_at_sentence: bool = False,
 ) -> Sequence[str]:
     """Make predictions for text using GPT-2.
 
@@ -89,50 +160,284 @@ def make_predictions(
         gpt2: GPT-2 model.
         device: GPT-2 device.
         max_output_length: Maximum length of generated sequence.
+        prefix_cache: Cache of prefixes shared with other inputs. If None, the whole input is run
+            through the model.
+        prefixes: Prefixes of the text to look up in or add to the prefix cache, from shortest to
+            longest. Prefixes that do not tokenize as a prefix of the text are ignored.
+        stop_at_sentence: Stop each sample once its first sentence or step is complete.
 
     Returns:
         List of predicted strings after the provided text, or an empty list if the input is over 300
         tokens long.
     """
-    text = unicodedata.normalize("NFKC", text)
-    input_ids = tokenizer.encode(text)
-    input_ids = torch.tensor([input_ids]).to(device)  # pylint: disable=not-callable
-    input_id_length = len(input_ids[0])
+    if prefix_cache is None:
+        return make_batch_predictions(
+            texts=[text],
+            tokenizer=tokenizer,
+            gpt2=gpt2,
+            device=device,
+            max_output_length=max_output_length,
+            stop_at_sentence=stop_at_sentence,
+        )[0]
+
+    input_ids = tokenizer.encode(unicodedata.normalize("NFKC", text))
+    input_id_length = len(input_ids)
 
     # Long inputs usually result in useless outputs, so no predictions are acceptable
-    if input_id_length > 300:
+    if input_id_length > MAX_INPUT_LENGTH:
         return []
 
-    # Enforce maximum generated length to prevent memory issues
-    max_length = min(input_id_length + max_output_length, 350)
-
-    with torch.cuda.amp.autocast():  # Run with FP16
-        sample_outputs = gpt2.generate(
-            input_ids,
-            do_sample=True,
-            max_length=max_length,
-            min_length=2,  # We want output that is at least two words
-            temperature=0.8,
-            top_k=50,
-            top_p=0.8,
-            num_return_sequences=40,
+    prefix_ids = []
+    for prefix in prefixes:
+        ids = tokenizer.encode(unicodedata.normalize("NFKC", prefix))
+        # At least one token must follow the prefix to get the next token's logits
+        if len(ids) < input_id_length and input_ids[: len(ids)] == ids:
+            prefix_ids.append(ids)
+
+    past = prefix_cache.get(prefix_ids)
+    if past is None:
+        return make_predictions(
+            text, tokenizer, gpt2, device, max_output_length, stop_at_sentence=stop_at_sentence
         )
 
+    remaining_ids = torch.tensor(  # pylint: disable=not-callable
+        [input_ids[len(prefix_ids[-1]) :]] * NUM_SAMPLES
+    ).to(device)
+    max_length = min(input_id_length + max_output_length, MAX_TOTAL_LENGTH)
+    sample_outputs = sample(
+        gpt2,
+        remaining_ids,
+        torch.ones_like(remaining_ids),
+        past=past,
+        max_new_tokens=max_length - input_id_length,
+        eos_token_id=tokenizer.eos_token_id,
+        should_stop=make_sentence_stopper(tokenizer, [text]) if stop_at_sentence else None,
+        **SAMPLING_PARAMS,
+    )
+
     suggestions = []
     for output in sample_outputs:
-        decoded_output = result_replace(tokenizer.decode(output[input_id_length:]))
+        decoded_output = result_replace(tokenizer.decode(output))
         suggestions.append(decoded_output)
 
     return suggestions
 
 
+def make_sentence_stopper(
+    tokenizer: GPT2Tokenizer, texts: Sequence[str], num_samples: int = NUM_SAMPLES
+) -> Callable[[int, torch.Tensor], bool]:
+    """Makes a function that stops samples once their first sentence or step is complete.
+
+    Args:
+        tokenizer: GPT-2 tokenizer.
+        texts: Input texts, each of which has contiguous rows for its samples.
+        num_samples: Number of samples for each text.
+
+    Returns:
+        Function given a row index and its generated token IDs, returning whether to stop the row.
+    """
+    next_step_numbers = []
+    for text in texts:
+        # Inputs end with the number of the step to generate
+        match = re.search(r"(\d+)\.\s*$", text)
+        next_step_numbers.append(int(match.group(1)) + 1 if match is not None else None)
+
+    def should_stop(row: int, output: torch.Tensor) -> bool:
+        return has_complete_sentence(
+            tokenizer.decode(output), next_step_numbers[row // num_samples]
+        )
+
+    return should_stop
+
+
+def pack_batches(
+    input_lengths: Sequence[int], max_output_length: int, max_batch_tokens: int, num_samples: int
+) -> Sequence[Sequence[int]]:
+    """Groups inputs into batches that fit within a token budget.
+
+    Inputs are sorted by length so that each batch needs as little padding as possible. The cost of
+    a batch is the number of generated rows multiplied by the maximum length of those rows. An input
+    that exceeds the budget by itself is placed in its own batch.
+
+    Inputs long enough for the total length limit to cut their output short are only batched with
+    inputs of the same length, since a batch generates as many tokens as its longest input allows.
+
+    Args:
+        input_lengths: Token lengths of the inputs.
+        max_output_length: Maximum length of generated sequence.
+        max_batch_tokens: Token budget of a single batch.
+        num_samples: Number of samples generated for each input.
+
+    Returns:
+        Batches of input indices.
+    """
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    batch_output_length = 0
+    for index in sorted(range(len(input_lengths)), key=lambda i: input_lengths[i]):
+        # Inputs are sorted, so the current input is always the longest in the batch
+        max_length = min(input_lengths[index] + max_output_length, MAX_TOTAL_LENGTH)
+        output_length = max_length - input_lengths[index]
+        if batch and (
+            (len(batch) + 1) * num_samples * max_length > max_batch_tokens
+            or output_length != batch_output_length
+        ):
+            batches.append(batch)
+            batch = []
+        batch.append(index)
+        batch_output_length = output_length
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def make_batch_predictions(
+    texts: Sequence[str],
+    tokenizer: GPT2Tokenizer,
+    gpt2: GPT2LMHeadModel,
+    device: torch.device,
+    max_output_length: int = 100,
+    max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+    stop_at_sentence: bool = False,
+    num_samples: int = NUM_SAMPLES,
+) -> Sequence[Sequence[str]]:
+    """Make predictions for multiple texts using batched GPT-2 generation.
+
+    Inputs are left-padded so that generation continues directly after each text.
+
+    Args:
+        texts: Input texts.
+        tokenizer: GPT-2 tokenizer.
+        gpt2: GPT-2 model.
+        device: GPT-2 device.
+        max_output_length: Maximum length of generated sequence.
+        max_batch_tokens: Token budget of a single batch, which limits memory usage.
+        stop_at_sentence: Stop each sample once its first sentence or step is complete, and stop
+            the batch once all samples have stopped.
+        num_samples: Number of samples to generate for each text.
+
+    Returns:
+        List of predicted strings for each text, in the same order as the texts. Texts over 300
+        tokens long receive an empty list.
+    """
+    all_input_ids = [tokenizer.encode(unicodedata.normalize("NFKC", text)) for text in texts]
+    predictions: List[List[str]] = [[] for _ in texts]
+
+    valid_indices = [i for i, ids in enumerate(all_input_ids) if len(ids) <= MAX_INPUT_LENGTH]
+    batches = pack_batches(
+        [len(all_input_ids[i]) for i in valid_indices],
+        max_output_length=max_output_length,
+        max_batch_tokens=max_batch_tokens,
+        num_samples=num_samples,
+    )
+
+    for batch_index, batch in enumerate(batches, start=1):
+        batch_input_ids = [all_input_ids[valid_indices[i]] for i in batch]
+        input_id_length = max(len(ids) for ids in batch_input_ids)
+        padded_input_ids = [
+            [tokenizer.eos_token_id] * (input_id_length - len(ids)) + ids for ids in batch_input_ids
+        ]
+        padding_mask = [
+            [0] * (input_id_length - len(ids)) + [1] * len(ids) for ids in batch_input_ids
+        ]
+        input_ids = torch.tensor(padded_input_ids).to(device)  # pylint: disable=not-callable
+        attention_mask = torch.tensor(padding_mask).to(device)  # pylint: disable=not-callable
+
+        max_length = min(input_id_length + max_output_length, MAX_TOTAL_LENGTH)
+
+        if stop_at_sentence:
+            sample_outputs = sample(
+                gpt2,
+                input_ids.repeat_interleave(num_samples, dim=0),
+                attention_mask.repeat_interleave(num_samples, dim=0),
+                max_new_tokens=max_length - input_id_length,
+                eos_token_id=tokenizer.eos_token_id,
+                should_stop=make_sentence_stopper(
+                    tokenizer, [texts[valid_indices[i]] for i in batch], num_samples
+                ),
+                **SAMPLING_PARAMS,
+            )
+        else:
+            with torch.cuda.amp.autocast(enabled=device.type == "cuda"):  # Run with FP16 on GPU
+                sample_outputs = gpt2.generate(
+                    input_ids,
+                    attention_mask=attention_mask,
+                    do_sample=True,
+                    max_length=max_length,
+                    min_length=2,  # We want output that is at least two words
+                    num_return_sequences=num_samples,
+                    **SAMPLING_PARAMS,
+                )
+            sample_outputs = sample_outputs[:, input_id_length:]
+
+        # Samples for each input are returned contiguously
+        for output_index, output in enumerate(sample_outputs):
+            text_index = valid_indices[batch[output_index // num_samples]]
+            decoded_output = result_replace(tokenizer.decode(output))
+            predictions[text_index].append(decoded_output)
+
+        if len(batches) > 1:
+            logging.info(
+                "Finished processing batch %d / %d (%d inputs)",
+                batch_index,
+                len(batches),
+                len(batch),
+            )
+
+    return predictions
+
+
+def sample_adaptively(
+    draw: Callable[[int], Sequence[str]],
+    criteria: Criteria,
+    keep: int,
+    round_size: int = 8,
+    max_rounds: int = 5,
+) -> Sequence[str]:
+    """Draws predictions in rounds until enough of them pass the filters.
+
+    Most requests only need a handful of suggestions, so this avoids always drawing the full
+    `NUM_SAMPLES` predictions. The filters are rerun on all predictions after each round, so
+    duplicates across rounds are handled.
+
+    Args:
+        draw: Function drawing the given number of predictions.
+        criteria: Filters that kept predictions must pass.
+        keep: Number of kept predictions after which to stop.
+        round_size: Number of predictions to draw in each round.
+        max_rounds: Maximum number of rounds.
+
+    Returns:
+        All drawn predictions, before filtering.
+    """
+    predictions: List[str] = []
+    kept: Sequence[str] = []
+    rounds = 0
+    while rounds < max_rounds and len(kept) < keep:
+        predictions.extend(draw(round_size))
+        kept = criteria.meet_criteria(list(predictions))
+        rounds += 1
+    logging.info(
+        "Adaptive sampling drew %d predictions in %d rounds and kept %d / %d",
+        len(predictions),
+        rounds,
+        len(kept),
+        keep,
+    )
+    return predictions
+
+
 def run_gpt2(
     tokenizer: GPT2Tokenizer,
     gpt2: GPT2LMHeadModel,
-    sequences: Sequence[str],
+    sequences: Sequence[Sequence[str]],
     device: torch.device,
     schema_name: str,
     schema_desc: str,
+    max_batch_tokens: Optional[int] = None,
+    share_prefixes: bool = False,
+    stop_at_sentence: bool = False,
+    suggestion_cache: Optional[SuggestionCache] = None,
 ) -> MutableMapping[str, MutableSequence[str]]:
     """Executes GPT-2 to generate recommendations for each event.
 
@@ -151,33 +456,94 @@ def run_gpt2(
         device : GPT-2 device.
         schema_name: Name of schema to run on.
         schema_desc: Description / definition of the schema.
+        max_batch_tokens: Token budget for batched generation. If None, each sequence is run
+            separately.
+        share_prefixes: Compute the model's key/value cache once for the schema description and
+            for leading steps shared by sequences, instead of once per sequence. Cannot be combined
+            with batched generation.
+        stop_at_sentence: Stop each sample once its first sentence or step is complete, since the
+            rest is discarded when filtering.
+        suggestion_cache: Cache of suggestions from earlier runs. Only sequences whose prompts are
+            not cached are run, and their suggestions are added to the cache.
 
     Returns:
         List of schemas, containing events and corresponding recommendations.
     """
+    if max_batch_tokens is not None and share_prefixes:
+        raise ValueError("Batched generation cannot be combined with prefix sharing")
+
     logging.info("Processing %d sequences", len(sequences))
     suggested_events: MutableMapping[str, MutableSequence[str]] = {}
 
-    for seq_index, sequence in enumerate(sequences, start=1):
-        preceding_step = sequence[-1]
-        if preceding_step not in suggested_events:
-            suggested_events[preceding_step] = []
-
-        text = convert_sequence_to_text(
+    texts = [
+        convert_sequence_to_text(
             schema_name=schema_name,
             schema_desc=schema_desc,
             sequence=sequence,
         )
-        suggestions = make_predictions(
-            text=text,
+        for sequence in sequences
+    ]
+
+    # Everything besides the prompt and model name that affects the suggestions
+    params = {
+        **SAMPLING_PARAMS,
+        "precision": model_precision(gpt2),
+        "num_samples": NUM_SAMPLES,
+        "max_output_length": 100,
+        "stop_at_sentence": stop_at_sentence,
+    }
+    all_suggestions: List[Optional[Sequence[str]]] = [None] * len(texts)
+    if suggestion_cache is not None:
+        all_suggestions = list(suggestion_cache.get_many(texts, params))
+    pending = [index for index, suggestions in enumerate(all_suggestions) if suggestions is None]
+
+    new_suggestions: Sequence[Sequence[str]]
+    if not pending:
+        new_suggestions = []
+    elif max_batch_tokens is not None:
+        new_suggestions = make_batch_predictions(
+            texts=[texts[index] for index in pending],
             tokenizer=tokenizer,
             gpt2=gpt2,
             device=device,
+            max_batch_tokens=max_batch_tokens,
+            stop_at_sentence=stop_at_sentence,
+        )
+    else:
+        prefix_cache = PrefixCache(gpt2, device) if share_prefixes else None
+        new_suggestions = []
+        for seq_index, index in enumerate(pending, start=1):
+            suggestions = make_predictions(
+                text=texts[index],
+                tokenizer=tokenizer,
+                gpt2=gpt2,
+                device=device,
+                prefix_cache=prefix_cache,
+                prefixes=get_text_prefixes(schema_name, schema_desc, sequences[index]),
+                stop_at_sentence=stop_at_sentence,
+            )
+            new_suggestions.append(suggestions)
+            logging.info("Finished processing sequence %d / %d", seq_index, len(pending))
+        if prefix_cache is not None:
+            logging.info(
+                "Prefix cache hits: %d, misses: %d", prefix_cache.hits, prefix_cache.misses
+            )
+
+    for index, suggestions in zip(pending, new_suggestions):
+        all_suggestions[index] = suggestions
+    if suggestion_cache is not None:
+        suggestion_cache.put_many([texts[index] for index in pending], params, new_suggestions)
+        logging.info(
+            "Suggestion cache hits: %d, misses: %d", len(texts) - len(pending), len(pending)
         )
 
-        suggested_events[preceding_step].extend(suggestions)
-
-        logging.info("Finished processing sequence %d / %d", seq_index, len(sequences))
+    for sequence, sequence_suggestions in zip(sequences, all_suggestions):
+        if sequence_suggestions is None:
+            continue
+        preceding_step = sequence[-1]
+        if preceding_step not in suggested_events:
+            suggested_events[preceding_step] = []
+        suggested_events[preceding_step].extend(sequence_suggestions)
 
     return suggested_events
 
@@ -205,46 +571,139 @@ def filter_suggestions(
     return suggestions_to_keep
 
 
+def prepare_schema(input_file: Path) -> Mapping[str, Any]:
+    """Loads the first schema in a file and extracts its sequences.
+
+    Args:
+        input_file: Input YAML file path.
+
+    Returns:
+        Mapping containing extracted sequences and schema metadata, as well as the schema's existing
+        events and a hash of everything that affects its recommendations.
+    """
+    schema = load_schemas(input_file)[0]
+    sequences_from_schema = dict(schema_to_sequences(schema))
+    sequences_from_schema["existing_events"] = {s.id for s in schema.steps}
+    hashed = {
+        **sequences_from_schema,
+        "existing_events": sorted(sequences_from_schema["existing_events"]),
+    }
+    sequences_from_schema["sequences_hash"] = hashlib.sha256(
+        json.dumps(hashed, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return sequences_from_schema
+
+
+def write_recommendations(
+    suggestions: MutableMapping[str, MutableSequence[str]],
+    sequences_from_schema: Mapping[str, Any],
+    output_file: Path,
+) -> None:
+    """Filters suggestions and writes them as event recommendations.
+
+    The file is written under a temporary name and then renamed, so readers never see a partial
+    file.
+
+    Args:
+        suggestions: Suggestions for each preceding step.
+        sequences_from_schema: Output of `prepare_schema` for the schema.
+        output_file: Output JSON file path.
+    """
+    suggestions_to_keep = filter_suggestions(suggestions, sequences_from_schema["existing_events"])
+    suggestions_to_keep = get_only_k(suggestions_to_keep, 12)
+
+    output_json = {
+        "format_version": "1.0",
+        "schema_id": sequences_from_schema["schema_id"],
+        "schema_name": sequences_from_schema["name"],
+        "events": suggestions_to_keep,
+    }
+    temp_file = output_file.with_name(f".{output_file.name}.tmp")
+    with open(temp_file, "w", encoding="utf-8") as outfile:
+        json.dump(output_json, outfile, ensure_ascii=False, indent=2)
+    temp_file.replace(output_file)
+
+
+def add_generation_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds command-line arguments controlling generation.
+
+    Args:
+        parser: Parser to add arguments to.
+    """
+    parser.add_argument(
+        "--max-batch-tokens",
+        type=int,
+        help="Generate for multiple sequences at once, using batches of at most this many tokens. "
+        f"{DEFAULT_MAX_BATCH_TOKENS} is a reasonable value. If omitted, sequences are run one at "
+        "a time.",
+    )
+    parser.add_argument(
+        "--share-prefixes",
+        action="store_true",
+        help="Reuse the model's key/value cache for input prefixes shared between sequences.",
+    )
+    parser.add_argument(
+        "--stop-at-sentence",
+        action="store_true",
+        help="Stop generating each sample once its first sentence or step is complete.",
+    )
+    parser.add_argument(
+        "--cpu-precision",
+        choices=CPU_PRECISIONS,
+        default="fp32",
+        help="Precision of the model when running without a GPU.",
+    )
+    parser.add_argument(
+        "--no-suggestion-cache",
+        dest="suggestion_cache",
+        action="store_false",
+        help="Generate suggestions for every sequence, instead of reusing cached suggestions for "
+        "prompts seen in earlier runs.",
+    )
+
+
 def main() -> None:
     """Executes GPT-2 with extracted sequences."""
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--input-file", type=Path, required=True, help="Input YAML file path.")
     parser.add_argument("--output-file", type=Path, required=True, help="Output JSON file path.")
+    add_generation_arguments(parser)
     args = parser.parse_args()
     logging.info(args)
 
-    device = get_device()
-
-    tokenizer, gpt2 = load_gpt2(MODEL_NAME, device)
-
-    schemas = load_schemas(args.input_file)
-    schema = schemas[0]
-    sequences_from_schema = schema_to_sequences(schema)
-    existing_events: Set[str] = {s.id for s in schema.steps}
-    schema_id = sequences_from_schema["schema_id"]
-    schema_name = sequences_from_schema["name"]
-    schema_dscpt = sequences_from_schema["description"]
-    all_sequences = sequences_from_schema["sequences"]
-    suggestions = run_gpt2(
-        tokenizer=tokenizer,
-        gpt2=gpt2,
-        sequences=all_sequences,
-        device=device,
-        schema_name=schema_name,
-        schema_desc=schema_dscpt,
-    )
+    schema = args.input_file.stem
+    ledger = JobLedger()
+    run_id = ledger.start(schema, file_hash(args.input_file))
+    try:
+        sequences_from_schema = prepare_schema(args.input_file)
+        if ledger.unchanged(run_id, sequences_from_schema["sequences_hash"], args.output_file):
+            logging.info("Sequences of %s are unchanged, keeping existing output", schema)
+            ledger.finish(run_id)
+            return
 
-    suggestions_to_keep = filter_suggestions(suggestions, existing_events)
-    suggestions_to_keep = get_only_k(suggestions_to_keep, 12)
+        device = get_device()
 
-    output_json = {
-        "format_version": "1.0",
-        "schema_id": schema_id,
-        "schema_name": schema_name,
-        "events": suggestions_to_keep,
-    }
-    with open(args.output_file, "w") as outfile:
-        json.dump(output_json, outfile, ensure_ascii=False, indent=2)
+        tokenizer, gpt2 = load_gpt2(MODEL_NAME, device, args.cpu_precision)
+        suggestion_cache = SuggestionCache(MODEL_NAME) if args.suggestion_cache else None
+
+        suggestions = run_gpt2(
+            tokenizer=tokenizer,
+            gpt2=gpt2,
+            sequences=sequences_from_schema["sequences"],
+            device=device,
+            schema_name=sequences_from_schema["name"],
+            schema_desc=sequences_from_schema["description"],
+            max_batch_tokens=args.max_batch_tokens,
+            share_prefixes=args.share_prefixes,
+            stop_at_sentence=args.stop_at_sentence,
+            suggestion_cache=suggestion_cache,
+        )
+
+        write_recommendations(suggestions, sequences_from_schema, args.output_file)
+    except BaseException as ex:
+        ledger.fail(run_id, repr(ex))
+        raise
+    ledger.finish(run_id)
 
 
 if __name__ == "__main__":
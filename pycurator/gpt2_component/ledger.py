@@ -0,0 +1,359 @@
+"""Ledger of GPT-2 recommendation runs, shared by all runners.
+
+Each attempt at generating recommendations for a schema file is recorded with its state, the hash of
+the file's content, and the hash of the sequences extracted from it. This allows runners to skip
+schemas which are already queued or running, and to re-run only schemas which have changed.
+
+This module only uses the standard library, so that it can be used by `batch_run.py`.
+"""
+
+import argparse
+import hashlib
+from pathlib import Path
+import time
+from typing import Any, Mapping, NamedTuple, Optional, Sequence
+
+from pycurator.common.database import DEFAULT_TIMEOUT, transaction
+from pycurator.common.paths import STATUS_FILE
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+STATES = (QUEUED, RUNNING, FINISHED, FAILED)
+IN_FLIGHT = (QUEUED, RUNNING)
+
+# Queued or running entries older than this are assumed to belong to jobs that died
+DEFAULT_STALE_AFTER = 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    schema TEXT NOT NULL,
+    state TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    sequences_hash TEXT,
+    job_id TEXT,
+    error TEXT,
+    queued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS runs_schema ON runs (schema, id);
+"""
+
+
+class Run(NamedTuple):
+    """Single attempt at generating recommendations for a schema.
+
+    Attributes:
+        id: Run ID.
+        schema: Name of the schema file, without its extension.
+        state: One of queued, running, finished, or failed.
+        content_hash: Hash of the schema file's content.
+        sequences_hash: Hash of the sequences extracted from the schema, once known.
+        job_id: ID of the Slurm job, if any.
+        error: Error message of a failed run.
+        queued_at: Time the run was queued.
+        started_at: Time the run started.
+        finished_at: Time the run finished or failed.
+    """
+
+    id: int
+    schema: str
+    state: str
+    content_hash: str
+    sequences_hash: Optional[str]
+    job_id: Optional[str]
+    error: Optional[str]
+    queued_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+
+
+def file_hash(path: Path) -> str:
+    """Hashes the content of a file.
+
+    Args:
+        path: File path.
+
+    Returns:
+        Hex digest of the file's content.
+    """
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class JobLedger:
+    """Persistent record of recommendation runs, stored in an SQLite database.
+
+    Every method runs in its own transaction, so the ledger can be shared by concurrent jobs.
+    """
+
+    def __init__(self, path: Path = STATUS_FILE, timeout: float = DEFAULT_TIMEOUT) -> None:
+        """Constructor.
+
+        Args:
+            path: Database file path.
+            timeout: Time in seconds to wait for other writers.
+        """
+        self.path = path
+        self.timeout = timeout
+        with transaction(self.path, self.timeout) as connection:
+            connection.executescript(_SCHEMA)
+
+    def latest(self, schema: str) -> Optional[Run]:
+        """Gets the most recent run of a schema.
+
+        Args:
+            schema: Name of the schema file, without its extension.
+
+        Returns:
+            Most recent run, or None if the schema has never been run.
+        """
+        with transaction(self.path, self.timeout) as connection:
+            row = connection.execute(
+                "SELECT * FROM runs WHERE schema = ? ORDER BY id DESC LIMIT 1", (schema,)
+            ).fetchone()
+        return None if row is None else Run(**row)
+
+    def last_finished(self, schema: str) -> Optional[Run]:
+        """Gets the most recent finished run of a schema.
+
+        Args:
+            schema: Name of the schema file, without its extension.
+
+        Returns:
+            Most recent finished run, or None if no run has finished.
+        """
+        with transaction(self.path, self.timeout) as connection:
+            row = connection.execute(
+                "SELECT * FROM runs WHERE schema = ? AND state = ? ORDER BY id DESC LIMIT 1",
+                (schema, FINISHED),
+            ).fetchone()
+        return None if row is None else Run(**row)
+
+    def needs_run(
+        self, yaml_path: Path, output_path: Path, stale_after: float = DEFAULT_STALE_AFTER
+    ) -> bool:
+        """Determines whether a schema should be run.
+
+        A schema is skipped if it is queued or running, or if its output exists and its content has
+        not changed since the last finished run. Schemas with output but no recorded runs are
+        assumed to be up to date, as they were run before the ledger existed.
+
+        Args:
+            yaml_path: Schema file path.
+            output_path: Output JSON file path.
+            stale_after: Time in seconds after which queued or running entries are ignored.
+
+        Returns:
+            Whether the schema should be run.
+        """
+        latest = self.latest(yaml_path.stem)
+        if latest is None:
+            return not output_path.exists()
+        if latest.state in IN_FLIGHT:
+            last_update = latest.started_at or latest.queued_at
+            return time.time() - last_update > stale_after
+        if not output_path.exists():
+            return True
+        last_finished = self.last_finished(yaml_path.stem)
+        return last_finished is None or last_finished.content_hash != file_hash(yaml_path)
+
+    def queue(self, schema: str, content_hash: str, job_id: Optional[str] = None) -> int:
+        """Records that a schema has been queued.
+
+        Args:
+            schema: Name of the schema file, without its extension.
+            content_hash: Hash of the schema file's content.
+            job_id: ID of the Slurm job, if any.
+
+        Returns:
+            Run ID.
+        """
+        with transaction(self.path, self.timeout) as connection:
+            connection.execute(
+                "INSERT INTO runs (schema, state, content_hash, job_id, queued_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (schema, QUEUED, content_hash, job_id, time.time()),
+            )
+            run_id: int = connection.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return run_id
+
+    def set_job_id(self, run_id: int, job_id: str) -> None:
+        """Records the Slurm job of a run, once it has been submitted.
+
+        The run is queued before the job is submitted, so that a job starting right away finds it.
+
+        Args:
+            run_id: Run ID.
+            job_id: ID of the Slurm job.
+        """
+        self._update(run_id, job_id=job_id)
+
+    def start(self, schema: str, content_hash: str) -> int:
+        """Records that a schema has started running.
+
+        The latest run of the schema is reused if it is queued, so runs submitted by `batch_run.py`
+        keep their queueing time and job ID.
+
+        Args:
+            schema: Name of the schema file, without its extension.
+            content_hash: Hash of the schema file's content.
+
+        Returns:
+            Run ID.
+        """
+        now = time.time()
+        with transaction(self.path, self.timeout) as connection:
+            row = connection.execute(
+                "SELECT id, state FROM runs WHERE schema = ? ORDER BY id DESC LIMIT 1", (schema,)
+            ).fetchone()
+            if row is not None and row["state"] == QUEUED:
+                run_id: int = row["id"]
+                connection.execute(
+                    "UPDATE runs SET state = ?, content_hash = ?, started_at = ? WHERE id = ?",
+                    (RUNNING, content_hash, now, run_id),
+                )
+            else:
+                connection.execute(
+                    "INSERT INTO runs (schema, state, content_hash, queued_at, started_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (schema, RUNNING, content_hash, now, now),
+                )
+                run_id = connection.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return run_id
+
+    def unchanged(self, run_id: int, sequences_hash: str, output_path: Path) -> bool:
+        """Records the hash of the sequences extracted for a run and checks whether it is unchanged.
+
+        Args:
+            run_id: Run ID.
+            sequences_hash: Hash of the extracted sequences.
+            output_path: Output JSON file path.
+
+        Returns:
+            Whether the output exists and the previous finished run of the schema had the same
+            sequences, in which case the existing output can be kept.
+        """
+        with transaction(self.path, self.timeout) as connection:
+            connection.execute(
+                "UPDATE runs SET sequences_hash = ? WHERE id = ?", (sequences_hash, run_id)
+            )
+            row = connection.execute(
+                "SELECT sequences_hash FROM runs WHERE schema = "
+                "(SELECT schema FROM runs WHERE id = ?) AND state = ? AND id < ? "
+                "ORDER BY id DESC LIMIT 1",
+                (run_id, FINISHED, run_id),
+            ).fetchone()
+        return output_path.exists() and row is not None and row["sequences_hash"] == sequences_hash
+
+    def finish(self, run_id: int) -> None:
+        """Records that a run has finished.
+
+        Args:
+            run_id: Run ID.
+        """
+        self._update(run_id, state=FINISHED, finished_at=time.time())
+
+    def fail(self, run_id: int, error: str) -> None:
+        """Records that a run has failed.
+
+        Args:
+            run_id: Run ID.
+            error: Error message.
+        """
+        self._update(run_id, state=FAILED, error=error, finished_at=time.time())
+
+    def _update(self, run_id: int, **values: Any) -> None:
+        """Updates columns of a run.
+
+        Args:
+            run_id: Run ID.
+            **values: New values of columns.
+        """
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with transaction(self.path, self.timeout) as connection:
+            connection.execute(
+                f"UPDATE runs SET {assignments} WHERE id = ?", (*values.values(), run_id)
+            )
+
+    def failures(self) -> Sequence[Run]:
+        """Gets the runs of schemas whose latest run failed.
+
+        Returns:
+            Failed runs, ordered by schema.
+        """
+        with transaction(self.path, self.timeout) as connection:
+            rows = connection.execute(
+                "SELECT * FROM runs WHERE state = ? AND id IN "
+                "(SELECT MAX(id) FROM runs GROUP BY schema) ORDER BY schema",
+                (FAILED,),
+            ).fetchall()
+        return [Run(**row) for row in rows]
+
+    def stats(self, window: float = DEFAULT_STALE_AFTER) -> Mapping[str, Any]:
+        """Summarizes the queue and recent throughput.
+
+        Args:
+            window: Time in seconds over which throughput is measured.
+
+        Returns:
+            Number of schemas in each state, based on their latest run, and throughput, run time,
+            and queue wait statistics of runs finished within the window.
+        """
+        since = time.time() - window
+        with transaction(self.path, self.timeout) as connection:
+            states = dict(
+                connection.execute(
+                    "SELECT state, COUNT(*) FROM runs WHERE id IN "
+                    "(SELECT MAX(id) FROM runs GROUP BY schema) GROUP BY state"
+                ).fetchall()
+            )
+            recent = connection.execute(
+                "SELECT COUNT(*), AVG(finished_at - started_at), AVG(started_at - queued_at), "
+                "SUM(state = ?) FROM runs WHERE finished_at >= ?",
+                (FAILED, since),
+            ).fetchone()
+        completed, mean_run, mean_wait, failed = recent
+        return {
+            "schemas": {state: states.get(state, 0) for state in STATES},
+            "window_hours": window / 3600,
+            "completed": completed,
+            "failed": failed or 0,
+            "per_hour": completed / (window / 3600),
+            "mean_run_seconds": mean_run or 0.0,
+            "mean_wait_seconds": mean_wait or 0.0,
+        }
+
+
+def main() -> None:
+    """Prints statistics of the ledger."""
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument(
+        "--window-hours",
+        type=float,
+        default=DEFAULT_STALE_AFTER / 3600,
+        help="Number of hours over which throughput is measured.",
+    )
+    p.add_argument("--failures", action="store_true", help="List schemas whose latest run failed.")
+    args = p.parse_args()
+
+    ledger = JobLedger()
+    stats = ledger.stats(args.window_hours * 3600)
+    for state, count in stats["schemas"].items():
+        print(f"{state}: {count}")
+    print(
+        f"Last {stats['window_hours']:g} h: {stats['completed']} runs completed "
+        f"({stats['failed']} failed), {stats['per_hour']:.2f} per hour, "
+        f"mean run time {stats['mean_run_seconds']:.1f} s, "
+        f"mean queue wait {stats['mean_wait_seconds']:.1f} s"
+    )
+
+    if args.failures:
+        for run in ledger.failures():
+            print(f"{run.schema}: {run.error}")
+
+
+if __name__ == "__main__":
+    main()
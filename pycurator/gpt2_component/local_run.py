@@ -0,0 +1,136 @@
+"""Runs GPT-2 component on all pending schemas in a single process, without Slurm."""
+
+import argparse
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+import multiprocessing
+import os
+from pathlib import Path
+import time
+from typing import Any, Mapping, MutableMapping
+
+from pycurator.common.logger import return_logger
+from pycurator.common.paths import EVENT_REC_DIR, LOG_DIR, SCHEMA_DIR
+from pycurator.common.schema_catalog import SchemaCatalog
+from pycurator.gpt2_component.gpt2 import (
+    MODEL_NAME,
+    add_generation_arguments,
+    get_device,
+    load_gpt2,
+    prepare_schema,
+    run_gpt2,
+    write_recommendations,
+)
+from pycurator.gpt2_component.ledger import DEFAULT_STALE_AFTER, JobLedger, file_hash
+from pycurator.gpt2_component.suggestion_cache import SuggestionCache
+
+logger = return_logger(LOG_DIR / "gpt2_component.log")
+
+
+def main() -> None:
+    """Generates recommendations for each schema which is new or has changed."""
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes for loading schemas and filtering suggestions.",
+    )
+    p.add_argument(
+        "--stale-hours",
+        type=float,
+        default=DEFAULT_STALE_AFTER / 3600,
+        help="Number of hours after which queued or running schemas are assumed to have died.",
+    )
+    add_generation_arguments(p)
+    args = p.parse_args()
+    logger.info(args)
+
+    if not SCHEMA_DIR.is_dir():
+        raise IOError(f"Schema directory {SCHEMA_DIR} is not an existing directory")
+
+    EVENT_REC_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Don't re-run on schemas which are up to date or in progress elsewhere
+    ledger = JobLedger()
+    catalog = SchemaCatalog()
+    run_ids: MutableMapping[Path, int] = {}
+    for yaml_path in sorted(SCHEMA_DIR.glob("*.yaml")):
+        json_path = EVENT_REC_DIR / f"{yaml_path.stem}.json"
+        if ledger.needs_run(yaml_path, json_path, args.stale_hours * 3600):
+            run_ids[yaml_path] = ledger.queue(yaml_path.stem, file_hash(yaml_path))
+    logger.info("Found %d pending schemas", len(run_ids))
+    if not run_ids:
+        return
+
+    start = time.time()
+    device = get_device()
+    tokenizer, gpt2 = load_gpt2(MODEL_NAME, device, args.cpu_precision)
+    suggestion_cache = SuggestionCache(MODEL_NAME) if args.suggestion_cache else None
+
+    finished = 0
+    failed = 0
+    # Workers are spawned rather than forked so that they don't inherit the CUDA context
+    with ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        prepared: Mapping["Future[Mapping[str, Any]]", Path] = {
+            pool.submit(prepare_schema, yaml_path): yaml_path for yaml_path in run_ids
+        }
+        written: MutableMapping["Future[None]", Path] = {}
+        # The model runs in this process while workers load upcoming schemas
+        for future in as_completed(prepared):
+            yaml_path = prepared[future]
+            json_path = EVENT_REC_DIR / f"{yaml_path.stem}.json"
+            run_id = ledger.start(yaml_path.stem, file_hash(yaml_path))
+            try:
+                sequences_from_schema = future.result()
+                if ledger.unchanged(run_id, sequences_from_schema["sequences_hash"], json_path):
+                    logger.info("Sequences of %s are unchanged, keeping existing output", yaml_path)
+                    ledger.finish(run_id)
+                    finished += 1
+                    continue
+                suggestions = run_gpt2(
+                    tokenizer=tokenizer,
+                    gpt2=gpt2,
+                    sequences=sequences_from_schema["sequences"],
+                    device=device,
+                    schema_name=sequences_from_schema["name"],
+                    schema_desc=sequences_from_schema["description"],
+                    max_batch_tokens=args.max_batch_tokens,
+                    share_prefixes=args.share_prefixes,
+                    stop_at_sentence=args.stop_at_sentence,
+                    suggestion_cache=suggestion_cache,
+                )
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.exception("Failed to generate recommendations for %s", yaml_path)
+                ledger.fail(run_id, repr(ex))
+                failed += 1
+                continue
+            written[
+                pool.submit(write_recommendations, suggestions, sequences_from_schema, json_path)
+            ] = yaml_path
+
+        for write_future in as_completed(written):
+            yaml_path = written[write_future]
+            try:
+                write_future.result()
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.exception("Failed to write recommendations for %s", yaml_path)
+                ledger.fail(run_ids[yaml_path], repr(ex))
+                failed += 1
+            else:
+                ledger.finish(run_ids[yaml_path])
+                catalog.set_augmented(yaml_path.stem)
+                finished += 1
+
+    logger.info(
+        "Finished %d schemas with %d failures in %.1f s", finished, failed, time.time() - start
+    )
+    if suggestion_cache is not None:
+        logger.info(
+            "Suggestion cache hits: %d, misses: %d", suggestion_cache.hits, suggestion_cache.misses
+        )
+
+
+if __name__ == "__main__":
+    main()
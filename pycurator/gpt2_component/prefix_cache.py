@@ -0,0 +1,79 @@
+"""Reuse of GPT-2 key/value caches across inputs sharing a prefix."""
+
+from collections import OrderedDict
+from typing import MutableMapping, Optional, Sequence, Tuple
+
+import torch
+from transformers import GPT2LMHeadModel
+
+from pycurator.gpt2_component.sampling import PastKeyValues
+
+
+class PrefixCache:
+    """Key/value caches of GPT-2 for token prefixes, with least-recently-used eviction.
+
+    Caches are computed for a single row and are never modified, so they can be shared by any number
+    of later inputs and samples.
+    """
+
+    def __init__(self, gpt2: GPT2LMHeadModel, device: torch.device, max_entries: int = 64) -> None:
+        """Constructor.
+
+        Args:
+            gpt2: GPT-2 model.
+            device: GPT-2 device.
+            max_entries: Maximum number of prefixes to keep cached.
+        """
+        self.gpt2 = gpt2
+        self.device = device
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: MutableMapping[Tuple[int, ...], PastKeyValues] = OrderedDict()
+
+    def get(self, prefixes: Sequence[Sequence[int]]) -> Optional[PastKeyValues]:
+        """Gets the cache of the longest prefix, computing any missing prefixes.
+
+        Each missing prefix is computed by extending the previous one, so only tokens not covered by
+        a shorter prefix are run through the model.
+
+        Args:
+            prefixes: Token IDs of nested prefixes, from shortest to longest.
+
+        Returns:
+            Key/value cache of the longest prefix, or None if no prefixes are given.
+        """
+        past: Optional[PastKeyValues] = None
+        length = 0
+        for prefix in prefixes:
+            key = tuple(prefix)
+            cached = self._entries.get(key)
+            if cached is None:
+                self.misses += 1
+                cached = self._extend(past, prefix[length:])
+                self._entries[key] = cached
+            else:
+                self.hits += 1
+            self._entries.move_to_end(key)  # type: ignore
+            past, length = cached, len(prefix)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)  # type: ignore
+
+        return past
+
+    def _extend(self, past: Optional[PastKeyValues], input_ids: Sequence[int]) -> PastKeyValues:
+        """Runs tokens through the model after an existing cache.
+
+        Args:
+            past: Key/value cache of the preceding tokens, if any.
+            input_ids: Token IDs to add.
+
+        Returns:
+            Key/value cache covering the preceding and added tokens.
+        """
+        input_tensor = torch.tensor([input_ids]).to(self.device)  # pylint: disable=not-callable
+        with torch.no_grad(), torch.cuda.amp.autocast(enabled=self.device.type == "cuda"):
+            outputs = self.gpt2(input_ids=input_tensor, past_key_values=past, use_cache=True)
+        new_past: PastKeyValues = outputs.past_key_values
+        return new_past
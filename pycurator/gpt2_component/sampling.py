@@ -0,0 +1,108 @@
+"""Sampling loop for GPT-2 with support for cached prefixes and per-sequence stopping."""
+
+from typing import Callable, Optional, Tuple
+
+import torch
+from transformers import (
+    GPT2LMHeadModel,
+    LogitsProcessorList,
+    TemperatureLogitsWarper,
+    TopKLogitsWarper,
+    TopPLogitsWarper,
+)
+
+# Keys and values of every layer, each shaped (batch, heads, length, head size)
+PastKeyValues = Tuple[Tuple[torch.Tensor, ...], ...]
+
+
+def sample(
+    gpt2: GPT2LMHeadModel,
+    input_ids: torch.Tensor,
+    attention_mask: torch.Tensor,
+    *,
+    max_new_tokens: int,
+    eos_token_id: int,
+    temperature: float,
+    top_k: int,
+    top_p: float,
+    past: Optional[PastKeyValues] = None,
+    should_stop: Optional[Callable[[int, torch.Tensor], bool]] = None,
+) -> torch.Tensor:
+    """Samples continuations of left-padded inputs.
+
+    This mirrors the sampling done by `generate`, which in the pinned version of transformers can
+    neither resume from a cache nor stop individual sequences early. Finished sequences are padded
+    with the end-of-text token, and sampling ends once every sequence has finished.
+
+    Args:
+        gpt2: GPT-2 model.
+        input_ids: Left-padded token IDs, shaped (rows, length). Must not be empty.
+        attention_mask: Mask of the input tokens that are not padding, shaped like the input IDs.
+        max_new_tokens: Maximum number of tokens to generate.
+        eos_token_id: ID of the end-of-text token.
+        temperature: Sampling temperature.
+        top_k: Number of most likely tokens to sample from.
+        top_p: Cumulative probability of most likely tokens to sample from.
+        past: Key/value cache of a prefix shared by all rows, for a single row. It is expanded to
+            all rows without copying.
+        should_stop: Function given a row index and its generated token IDs so far, returning
+            whether that row should stop. It is only called for unfinished rows.
+
+    Returns:
+        Generated token IDs, shaped (rows, generated length).
+    """
+    logits_warper = LogitsProcessorList(
+        [
+            TemperatureLogitsWarper(temperature),
+            TopKLogitsWarper(top_k),
+            TopPLogitsWarper(top_p),
+        ]
+    )
+
+    num_rows = input_ids.shape[0]
+    device = input_ids.device
+    past_length = 0
+    if past is not None:
+        past_length = past[0][0].shape[2]
+        past = tuple(tuple(t.expand(num_rows, -1, -1, -1) for t in layer) for layer in past)
+        prefix_mask = torch.ones((num_rows, past_length), dtype=attention_mask.dtype, device=device)
+        attention_mask = torch.cat((prefix_mask, attention_mask), dim=1)
+    # Positions skip left padding, so each row continues from the end of its own input
+    position_ids = past_length + (attention_mask[:, past_length:].cumsum(dim=1) - 1).clamp(min=0)
+
+    next_input = input_ids
+    unfinished = torch.ones(num_rows, dtype=torch.bool, device=device)
+    generated = torch.empty((num_rows, 0), dtype=torch.long, device=device)
+
+    with torch.no_grad(), torch.cuda.amp.autocast(enabled=device.type == "cuda"):
+        for _ in range(max_new_tokens):
+            outputs = gpt2(
+                input_ids=next_input,
+                past_key_values=past,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                use_cache=True,
+            )
+            past = outputs.past_key_values
+            scores = logits_warper(next_input, outputs.logits[:, -1, :].float())
+            next_tokens = torch.multinomial(torch.softmax(scores, dim=-1), num_samples=1)[:, 0]
+            next_tokens = torch.where(
+                unfinished, next_tokens, torch.full_like(next_tokens, eos_token_id)
+            )
+            generated = torch.cat((generated, next_tokens[:, None]), dim=1)
+
+            unfinished &= next_tokens != eos_token_id
+            if should_stop is not None:
+                for row in unfinished.nonzero()[:, 0].tolist():
+                    if should_stop(row, generated[row]):
+                        unfinished[row] = False
+            if not unfinished.any():
+                break
+
+            next_input = next_tokens[:, None]
+            attention_mask = torch.cat(
+                (attention_mask, attention_mask.new_ones((num_rows, 1))), dim=1
+            )
+            position_ids = position_ids[:, -1:] + 1
+
+    return generated
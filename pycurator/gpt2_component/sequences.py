@@ -1,12 +1,13 @@
 """Extract sequences from YAML schemas."""
 
+from collections import Counter
 from pathlib import Path
-from typing import Any, List, Mapping, Sequence
+from typing import Any, Counter as tCounter, Iterable, Iterator, List, Mapping, Optional, Sequence
 
 import networkx as nx
 from pydantic import parse_obj_as
+from sdf import yaml_io
 from sdf.yaml_schema import Before, Schema
-import yaml
 
 
 def load_schemas(yaml_path: Path) -> Sequence[Schema]:
@@ -19,12 +20,78 @@ def load_schemas(yaml_path: Path) -> Sequence[Schema]:
         List of schemas.
     """
     with yaml_path.open() as file:
-        schemas: Sequence[Schema] = parse_obj_as(List[Schema], yaml.safe_load(file))
+        schemas: Sequence[Schema] = parse_obj_as(List[Schema], yaml_io.load(file))
     return schemas
 
 
+def enumerate_paths(
+    graph: nx.DiGraph,
+    start_nodes: Iterable[str],
+    min_length: int,
+    max_length: int,
+    max_per_step: Optional[int] = None,
+) -> Iterator[List[str]]:
+    """Enumerates simple paths of bounded length.
+
+    Paths are extended depth-first and never beyond the maximum length, so no time is spent on
+    paths which would be discarded. Nodes are visited in sorted order, so paths are yielded in
+    sorted order.
+
+    Args:
+        graph: Event graph.
+        start_nodes: Nodes to start paths from.
+        min_length: Minimum number of nodes in a path.
+        max_length: Maximum number of nodes in a path.
+        max_per_step: Maximum number of paths ending in each step. A value of 1 keeps only the first
+            path ending in each step. If None, all paths are yielded.
+
+    Yields:
+        Paths, as lists of nodes.
+    """
+    successors = {node: sorted(graph.successors(node)) for node in graph.nodes}
+    per_step: tCounter[str] = Counter()
+
+    def accept(path: List[str]) -> bool:
+        if len(path) < min_length:
+            return False
+        if max_per_step is not None:
+            if per_step[path[-1]] >= max_per_step:
+                return False
+            per_step[path[-1]] += 1
+        return True
+
+    if max_length < 1:
+        return
+    for start in sorted(start_nodes):
+        path = [start]
+        on_path = {start}
+        if accept(path):
+            yield list(path)
+        children = [iter(successors[start])] if max_length > 1 else []
+        while children:
+            child = next(children[-1], None)
+            if child is None:
+                children.pop()
+                on_path.remove(path.pop())
+                continue
+            if child in on_path:
+                continue
+            path.append(child)
+            on_path.add(child)
+            if accept(path):
+                yield list(path)
+            if len(path) < max_length:
+                children.append(iter(successors[child]))
+            else:
+                on_path.remove(path.pop())
+
+
 def schema_to_sequences(
-    schema: Schema, min_length: int = 1, max_length: int = 4, starting_steps_only: bool = True
+    schema: Schema,
+    min_length: int = 1,
+    max_length: int = 4,
+    starting_steps_only: bool = True,
+    max_per_step: Optional[int] = None,
 ) -> Mapping[str, Any]:
     """Converts schema to sequences, alongside schema metadata.
 
@@ -33,6 +100,8 @@ def schema_to_sequences(
         min_length: Minimum sequence length to include.
         max_length: Maximum sequence length to include.
         starting_steps_only: Only include sequences that begin with a starting step.
+        max_per_step: Maximum number of sequences ending in each step. If None, all sequences are
+            included.
 
     Returns:
         Mapping containing extracted sequences, alongside the schema's ID, name, and description.
@@ -46,22 +115,13 @@ def schema_to_sequences(
     graph = nx.DiGraph(edges)
 
     # Extract paths
-    all_paths = []
     if starting_steps_only:
         seq_start_nodes = [n for n, d in graph.in_degree if d == 0]
     else:
         seq_start_nodes = graph.nodes
-    if min_length <= 1:
-        all_paths.extend([[n] for n in seq_start_nodes])
-    for node in seq_start_nodes:
-        other_nodes = set(graph.nodes) - {node}
-        paths = [
-            p
-            for p in nx.all_simple_paths(graph, node, other_nodes, cutoff=max_length + 1)
-            if min_length <= len(p) <= max_length
-        ]
-        all_paths.extend(paths)
-    all_paths.sort()
+    all_paths = list(
+        enumerate_paths(graph, seq_start_nodes, min_length, max_length, max_per_step=max_per_step)
+    )
 
     # Format output
     sequences = {
@@ -3,14 +3,25 @@
 from http import HTTPStatus
 import logging
 from pathlib import Path
-from typing import Any
+from typing import Any, List, Sequence, Tuple
 
 from flask import Flask, abort, request
 from flask_cors import CORS
 
+from pycurator.common.config import settings
 from pycurator.common.logger import return_logger
 from pycurator.common.paths import LOG_DIR
-from pycurator.gpt2_component.gpt2 import MODEL_NAME, get_device, load_gpt2, make_predictions
+from pycurator.gpt2_component.batching import BatchScheduler
+from pycurator.gpt2_component.cpu_inference import configure_cpu
+from pycurator.gpt2_component.filter import DefaultCriteria
+from pycurator.gpt2_component.gpt2 import (
+    MODEL_NAME,
+    NUM_SAMPLES,
+    get_device,
+    load_gpt2,
+    make_batch_predictions,
+    sample_adaptively,
+)
 
 PARENT_DIR = Path(__file__).resolve().parent
 
@@ -22,13 +33,55 @@ logger = return_logger(LOG_DIR / Path("gpt2_server.log"))
 
 # Initialize GPT-2 model
 DEVICE = get_device()
-TOKENIZER, MODEL = load_gpt2(MODEL_NAME, DEVICE)
+if DEVICE.type == "cpu":
+    configure_cpu(settings.gpt2_num_threads, settings.gpt2_cpu_cores)
+TOKENIZER, MODEL = load_gpt2(MODEL_NAME, DEVICE, settings.gpt2_cpu_precision)
+
+
+def predict_batch(requests: Sequence[Tuple[str, int]]) -> Sequence[Sequence[str]]:
+    """Makes predictions for a batch of texts, grouped by number of samples.
+
+    Each group is split into generation calls that fit within the token budget.
+
+    Args:
+        requests: Input texts and the number of samples to draw for them.
+
+    Returns:
+        Predictions for each request.
+    """
+    predictions: List[Sequence[str]] = [[] for _ in requests]
+    for num_samples in sorted(set(n for _, n in requests)):
+        indices = [i for i, (_, n) in enumerate(requests) if n == num_samples]
+        texts = [requests[i][0] for i in indices]
+        batch_predictions = make_batch_predictions(
+            texts=texts,
+            tokenizer=TOKENIZER,
+            gpt2=MODEL,
+            device=DEVICE,
+            max_output_length=50,
+            max_batch_tokens=settings.gpt2_max_batch_tokens,
+            stop_at_sentence=settings.gpt2_stop_at_sentence,
+            num_samples=num_samples,
+        )
+        for i, prediction in zip(indices, batch_predictions):
+            predictions[i] = prediction
+    return predictions
+
+
+SCHEDULER: BatchScheduler[Tuple[str, int], Sequence[str]] = BatchScheduler(
+    predict_batch,
+    max_batch_size=settings.gpt2_max_batch_size,
+    max_wait=settings.gpt2_max_batch_wait,
+)
 
 
 @app.route("/api/get_prediction", methods=["GET"])
 def get_prediction() -> Any:
     """Gets predictions from GPT-2, given a text string.
 
+    If `keep` is given, predictions are drawn in rounds until that many pass the default filters,
+    using `events` as the existing events. Otherwise, a fixed number of predictions is drawn.
+
     Returns:
         A JSON response.
     """
@@ -39,18 +92,32 @@ def get_prediction() -> Any:
         abort(HTTPStatus.BAD_REQUEST)
     logger.info("text: %s", text)
 
-    predictions = make_predictions(
-        text=text,
-        tokenizer=TOKENIZER,
-        gpt2=MODEL,
-        device=DEVICE,
-        max_output_length=50,
-    )
+    keep = request.args.get("keep", type=int)
+    if keep is None:
+        predictions = SCHEDULER.submit((text, NUM_SAMPLES))
+    else:
+        predictions = sample_adaptively(
+            lambda num_samples: SCHEDULER.submit((text, num_samples)),
+            DefaultCriteria(existing_events=set(request.args.getlist("events")), keep=keep),
+            keep=keep,
+            round_size=settings.gpt2_adaptive_round_size,
+            max_rounds=settings.gpt2_adaptive_max_rounds,
+        )
     logger.info("predictions: %s", predictions)
 
     return {"predictions": predictions}
 
 
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics() -> Any:
+    """Gets statistics of request batching.
+
+    Returns:
+        A JSON response.
+    """
+    return {"batching": SCHEDULER.metrics()}
+
+
 if __name__ == "__main__":
     app.run(debug=True, load_dotenv=False)
 else:
@@ -10,10 +10,12 @@
 set -euo pipefail
 
 # Indefinite timeout used to keep the model in memory for a long time
+# Threads allow concurrent requests to be batched together by the single worker
 
 ../venv/bin/gunicorn \
   --config ../gunicorn.conf.py \
   --access-logfile ../data/logs/gpt2_server.log \
   --bind "$(hostname)".isi.edu:5001 \
   --timeout 0 \
+  --threads 16 \
   server:app
@@ -0,0 +1,105 @@
+"""Persistent cache of raw GPT-2 suggestions, keyed by prompt text and generation settings."""
+
+import hashlib
+import json
+from pathlib import Path
+import time
+from typing import Any, Mapping, MutableMapping, Optional, Sequence
+
+from pycurator.common.database import DEFAULT_TIMEOUT, transaction
+from pycurator.common.paths import SUGGESTION_CACHE_FILE
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS suggestions (
+    key TEXT PRIMARY KEY,
+    suggestions TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class SuggestionCache:
+    """Unfiltered suggestions for prompts, stored in an SQLite database.
+
+    Since schemas are saved repeatedly as new versions, most of their prompts are identical to those
+    of earlier versions. Suggestions are only reused for the same model and generation settings,
+    which include the model's precision.
+    """
+
+    def __init__(
+        self, model_name: str, path: Path = SUGGESTION_CACHE_FILE, timeout: float = DEFAULT_TIMEOUT
+    ) -> None:
+        """Constructor.
+
+        Args:
+            model_name: Name of the model generating suggestions.
+            path: Database file path.
+            timeout: Time in seconds to wait for other writers.
+        """
+        self.model_name = model_name
+        self.path = path
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        with transaction(self.path, self.timeout) as connection:
+            connection.executescript(_SCHEMA)
+
+    def _key(self, text: str, params: Mapping[str, Any]) -> str:
+        """Computes the key of a prompt.
+
+        Args:
+            text: Prompt text.
+            params: Generation settings.
+
+        Returns:
+            Hex digest of the prompt, model name, and settings.
+        """
+        key = json.dumps([text, self.model_name, params], sort_keys=True)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get_many(
+        self, texts: Sequence[str], params: Mapping[str, Any]
+    ) -> Sequence[Optional[Sequence[str]]]:
+        """Looks up suggestions for prompts.
+
+        Args:
+            texts: Prompt texts.
+            params: Generation settings.
+
+        Returns:
+            Suggestions for each prompt, or None for prompts which are not cached.
+        """
+        keys = [self._key(text, params) for text in texts]
+        found: MutableMapping[str, Sequence[str]] = {}
+        with transaction(self.path, self.timeout) as connection:
+            for key in set(keys):
+                row = connection.execute(
+                    "SELECT suggestions FROM suggestions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    found[key] = json.loads(row["suggestions"])
+        results = [found.get(key) for key in keys]
+        hits = sum(result is not None for result in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def put_many(
+        self, texts: Sequence[str], params: Mapping[str, Any], suggestions: Sequence[Sequence[str]]
+    ) -> None:
+        """Stores suggestions for prompts.
+
+        Args:
+            texts: Prompt texts.
+            params: Generation settings.
+            suggestions: Suggestions for each prompt.
+        """
+        now = time.time()
+        with transaction(self.path, self.timeout) as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO suggestions (key, suggestions, created_at) VALUES (?, ?, ?)",
+                [
+                    (self._key(text, params), json.dumps(list(text_suggestions)), now)
+                    for text, text_suggestions in zip(texts, suggestions)
+                ],
+            )
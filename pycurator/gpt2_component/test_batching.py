@@ -0,0 +1,69 @@
+# noqa
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from typing import List, Sequence
+from unittest import TestCase
+
+from pycurator.gpt2_component.batching import BatchScheduler
+
+
+class TestBatchScheduler(TestCase):  # noqa
+    def setUp(self) -> None:  # noqa
+        self.batches: List[Sequence[int]] = []
+        self.lock = threading.Lock()
+
+    def predict(self, requests: Sequence[int]) -> Sequence[str]:  # noqa
+        with self.lock:
+            self.batches.append(list(requests))
+        return [f"result {request}" for request in requests]
+
+    def test_results(self) -> None:  # noqa
+        scheduler = BatchScheduler(self.predict, max_batch_size=4, max_wait=0.05)
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(scheduler.submit, range(10)))
+        self.assertEqual(results, [f"result {i}" for i in range(10)])
+        self.assertEqual(sorted(r for batch in self.batches for r in batch), list(range(10)))
+        self.assertEqual(scheduler.metrics()["requests"], 10)
+
+    def test_max_batch_size(self) -> None:  # noqa
+        scheduler = BatchScheduler(self.predict, max_batch_size=3, max_wait=0.5)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(scheduler.submit, range(8)))
+        self.assertTrue(all(len(batch) <= 3 for batch in self.batches))
+        self.assertLess(max(scheduler.metrics()["batch_sizes"]), 4)
+
+    def test_max_wait(self) -> None:  # noqa
+        scheduler = BatchScheduler(self.predict, max_batch_size=8, max_wait=0.05)
+        start = time.monotonic()
+        self.assertEqual(scheduler.submit(1), "result 1")
+        # A lone request runs once the wait expires, rather than waiting for a full batch
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(self.batches, [[1]])
+
+        # Requests arriving within the wait are batched together
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(scheduler.submit, [2, 3, 4]))
+        self.assertEqual(sorted(self.batches[1]), [2, 3, 4])
+
+    def test_exception(self) -> None:  # noqa
+        def predict(requests: Sequence[int]) -> Sequence[str]:
+            if 0 in requests:
+                raise RuntimeError("model failed")
+            return self.predict(requests)
+
+        scheduler = BatchScheduler(predict, max_batch_size=4, max_wait=0.2)
+        barrier = threading.Barrier(3)
+
+        def submit(request: int) -> str:
+            barrier.wait()
+            return scheduler.submit(request)
+
+        with self.assertLogs(level="ERROR"), ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(submit, request) for request in (0, 1, 2)]
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, "model failed"):
+                future.result()
+
+        # The scheduler keeps running after a failed batch
+        self.assertEqual(scheduler.submit(5), "result 5")
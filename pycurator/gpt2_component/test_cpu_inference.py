@@ -0,0 +1,24 @@
+# noqa
+from unittest import TestCase
+
+import torch
+from transformers import GPT2Config, GPT2LMHeadModel
+
+from pycurator.gpt2_component.cpu_inference import model_precision, parse_cores, prepare_for_cpu
+
+
+def tiny_gpt2() -> GPT2LMHeadModel:  # noqa
+    torch.manual_seed(0)
+    config = GPT2Config(vocab_size=100, n_positions=64, n_embd=16, n_layer=2, n_head=2)
+    return GPT2LMHeadModel(config).eval()
+
+
+class TestCpuInference(TestCase):  # noqa
+    def test_parse_cores(self) -> None:  # noqa
+        self.assertEqual(parse_cores("0-3, 8"), {0, 1, 2, 3, 8})
+
+    def test_model_precision(self) -> None:  # noqa
+        self.assertEqual(model_precision(prepare_for_cpu(tiny_gpt2(), "fp32")), "float32")
+        self.assertEqual(model_precision(prepare_for_cpu(tiny_gpt2(), "bf16")), "bfloat16")
+        self.assertEqual(model_precision(prepare_for_cpu(tiny_gpt2(), "int8")), "int8")
+        self.assertEqual(model_precision(tiny_gpt2().half()), "float16")
@@ -14,6 +14,7 @@ from pycurator.gpt2_component.filter import (
     cut_trailing_quotes,
     cut_trailing_sentence,
     get_only_k,
+    has_complete_sentence,
     result_replace,
 )
 
@@ -36,6 +37,27 @@ class TestFilterUtilities(TestCase):  # noqa
                 f"Failed with input <{input_data}>. Expected <{expected}>, but got <{actual}>.",
             )
 
+    def test_has_complete_sentence(self) -> None:  # noqa
+        data = [
+            ("", None, False),
+            ("First sent", None, False),
+            ("First sent.", None, False),
+            ("First sent. Sec", None, False),
+            ("First sent. Second sent", None, True),
+            ("First sent? Second sent", None, True),
+            ('"First sent." Second sent', None, True),
+            ("First sent 4.", 4, False),
+            ("First sent 4. sec", 4, True),
+            ("First sent 4. sec", 5, False),
+        ]
+        for input_data, next_step_number, expected in data:
+            actual = has_complete_sentence(input_data, next_step_number)
+            self.assertEqual(
+                expected,
+                actual,
+                f"Failed with input <{input_data}>. Expected <{expected}>, but got <{actual}>.",
+            )
+
     def test_cut_trailing_quotes(self) -> None:  # noqa
         data = [
             ("No quotes", "No quotes"),
@@ -0,0 +1,51 @@
+# noqa
+from unittest import TestCase
+from unittest.mock import patch
+
+import torch
+from transformers import GPT2Config, GPT2LMHeadModel
+
+from pycurator.gpt2_component import gpt2
+from pycurator.gpt2_component.test_prefix_cache import CharTokenizer
+
+
+class TestBatchPredictions(TestCase):  # noqa
+    def test_pack_batches(self) -> None:  # noqa
+        # Output lengths are 100, 100, 90, 70, 70, and 50 within the total length limit
+        lengths = [10, 250, 260, 280, 280, 300]
+        self.assertEqual(
+            gpt2.pack_batches(
+                lengths, max_output_length=100, max_batch_tokens=10**6, num_samples=2
+            ),
+            [[0, 1], [2], [3, 4], [5]],
+        )
+        self.assertEqual(
+            gpt2.pack_batches(lengths, max_output_length=100, max_batch_tokens=1000, num_samples=2),
+            [[0], [1], [2], [3], [4], [5]],
+        )
+
+    def test_output_length(self) -> None:  # noqa
+        torch.manual_seed(0)
+        config = GPT2Config(
+            vocab_size=128,
+            n_positions=gpt2.MAX_TOTAL_LENGTH,
+            n_embd=32,
+            n_layer=2,
+            n_head=2,
+            pad_token_id=0,
+            initializer_range=1.0,
+        )
+        model = GPT2LMHeadModel(config).eval()
+        tokenizer = CharTokenizer()
+        texts = ["Step 1. attack.", "x" * 290]
+        # Never end early, so that every sample uses its whole output length
+        with patch.dict(gpt2.SAMPLING_PARAMS, {"bad_words_ids": [[tokenizer.eos_token_id]]}):
+            predictions = gpt2.make_batch_predictions(
+                texts, tokenizer, model, torch.device("cpu"), max_output_length=100, num_samples=2
+            )
+        self.assertEqual([len(samples) for samples in predictions], [2, 2])
+        # The short input is not limited by the long one's room within the total length
+        self.assertEqual(
+            [len(ids) for ids in tokenizer.decoded],
+            [100, 100, gpt2.MAX_TOTAL_LENGTH - 290, gpt2.MAX_TOTAL_LENGTH - 290],
+        )
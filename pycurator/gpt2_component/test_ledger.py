@@ -0,0 +1,68 @@
+# noqa
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import time
+from unittest import TestCase
+
+from pycurator.gpt2_component.ledger import FAILED, FINISHED, QUEUED, RUNNING, JobLedger, file_hash
+
+
+class TestJobLedger(TestCase):  # noqa
+    def setUp(self) -> None:  # noqa
+        self.temp_dir = TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        directory = Path(self.temp_dir.name)
+        self.ledger = JobLedger(directory / "status")
+        self.yaml_path = directory / "schema.yaml"
+        self.yaml_path.write_text("schema: 1")
+        self.json_path = directory / "schema.json"
+
+    def test_lifecycle(self) -> None:  # noqa
+        self.assertTrue(self.ledger.needs_run(self.yaml_path, self.json_path))
+
+        run_id = self.ledger.queue("schema", file_hash(self.yaml_path), job_id="123")
+        self.assertFalse(self.ledger.needs_run(self.yaml_path, self.json_path))
+        self.assertEqual(self.ledger.start("schema", file_hash(self.yaml_path)), run_id)
+        run = self.ledger.latest("schema")
+        assert run is not None
+        self.assertEqual((run.state, run.job_id), (RUNNING, "123"))
+        self.assertFalse(self.ledger.needs_run(self.yaml_path, self.json_path))
+
+        self.assertFalse(self.ledger.unchanged(run_id, "abc", self.json_path))
+        self.json_path.write_text("{}")
+        self.ledger.finish(run_id)
+        self.assertFalse(self.ledger.needs_run(self.yaml_path, self.json_path))
+
+        self.yaml_path.write_text("schema: 2")
+        self.assertTrue(self.ledger.needs_run(self.yaml_path, self.json_path))
+        run_id = self.ledger.start("schema", file_hash(self.yaml_path))
+        self.assertTrue(self.ledger.unchanged(run_id, "abc", self.json_path))
+        self.ledger.fail(run_id, "error")
+        self.assertTrue(self.ledger.needs_run(self.yaml_path, self.json_path))
+        self.assertEqual([run.error for run in self.ledger.failures()], ["error"])
+
+        stats = self.ledger.stats()
+        self.assertEqual(stats["schemas"], {QUEUED: 0, RUNNING: 0, FINISHED: 0, FAILED: 1})
+        self.assertEqual((stats["completed"], stats["failed"]), (2, 1))
+
+    def test_job_starts_before_submission_returns(self) -> None:  # noqa
+        run_id = self.ledger.queue("schema", file_hash(self.yaml_path))
+        self.assertEqual(self.ledger.start("schema", file_hash(self.yaml_path)), run_id)
+        self.ledger.set_job_id(run_id, "123")
+        run = self.ledger.latest("schema")
+        assert run is not None
+        self.assertEqual((run.id, run.state, run.job_id), (run_id, RUNNING, "123"))
+
+        self.json_path.write_text("{}")
+        self.ledger.finish(run_id)
+        self.assertFalse(self.ledger.needs_run(self.yaml_path, self.json_path))
+
+    def test_existing_output(self) -> None:  # noqa
+        self.json_path.write_text("{}")
+        self.assertFalse(self.ledger.needs_run(self.yaml_path, self.json_path))
+
+    def test_stale(self) -> None:  # noqa
+        self.ledger.queue("schema", file_hash(self.yaml_path))
+        self.assertFalse(self.ledger.needs_run(self.yaml_path, self.json_path))
+        time.sleep(0.01)
+        self.assertTrue(self.ledger.needs_run(self.yaml_path, self.json_path, stale_after=0.0))
@@ -0,0 +1,111 @@
+# noqa
+from typing import List, Sequence
+from unittest import TestCase
+from unittest.mock import patch
+
+import torch
+from transformers import GPT2Config, GPT2LMHeadModel
+
+from pycurator.gpt2_component import gpt2
+from pycurator.gpt2_component.prefix_cache import PrefixCache
+
+
+class CharTokenizer:  # noqa
+    # Tokenizes ASCII characters, so that every prefix of a text tokenizes as a prefix
+    eos_token_id = 0
+
+    def __init__(self) -> None:  # noqa
+        # Generated token IDs, since a random model's text is mostly filtered out
+        self.decoded: List[List[int]] = []
+
+    def encode(self, text: str) -> List[int]:  # noqa
+        return [ord(char) for char in text]
+
+    def decode(self, ids: Sequence[int]) -> str:  # noqa
+        self.decoded.append([int(i) for i in ids])
+        return "".join(chr(int(i)) for i in ids if i != self.eos_token_id)
+
+
+def tiny_gpt2() -> GPT2LMHeadModel:  # noqa
+    torch.manual_seed(0)
+    # Large initial weights make outputs depend on the context, instead of repeating one token
+    config = GPT2Config(
+        vocab_size=128,
+        n_positions=128,
+        n_embd=32,
+        n_layer=2,
+        n_head=2,
+        pad_token_id=0,
+        initializer_range=1.0,
+    )
+    return GPT2LMHeadModel(config).eval()
+
+
+class TestPrefixCache(TestCase):  # noqa
+    def setUp(self) -> None:  # noqa
+        self.tokenizer = CharTokenizer()
+        self.gpt2 = tiny_gpt2()
+        self.device = torch.device("cpu")
+        self.prefixes = gpt2.get_text_prefixes("attack", "An attack.", ["gather", "plan"])
+        self.text = gpt2.convert_sequence_to_text("attack", "An attack.", ["gather", "plan"])
+        # Sampling only from the most likely token is greedy decoding
+        greedy = patch.dict(gpt2.SAMPLING_PARAMS, {"top_k": 1})
+        greedy.start()
+        self.addCleanup(greedy.stop)
+
+    def predict(self, **kwargs: object) -> Sequence[Sequence[int]]:  # noqa
+        self.tokenizer.decoded = []
+        predictions = gpt2.make_predictions(
+            self.text,
+            self.tokenizer,
+            self.gpt2,
+            self.device,
+            max_output_length=12,
+            **kwargs,  # type: ignore
+        )
+        self.assertEqual(len(predictions), gpt2.NUM_SAMPLES)
+        return self.tokenizer.decoded
+
+    def test_same_output(self) -> None:  # noqa
+        for stop_at_sentence in (False, True):
+            cache = PrefixCache(self.gpt2, self.device)
+            expected = self.predict(stop_at_sentence=stop_at_sentence)
+            if not stop_at_sentence:
+                self.assertGreater(len(set(expected[0])), 1)
+            for _ in range(2):
+                actual = self.predict(
+                    prefix_cache=cache, prefixes=self.prefixes, stop_at_sentence=stop_at_sentence
+                )
+                self.assertEqual(actual, expected)
+            self.assertEqual((cache.misses, cache.hits), (len(self.prefixes), len(self.prefixes)))
+
+    def test_prefix_mismatch(self) -> None:  # noqa
+        cache = PrefixCache(self.gpt2, self.device)
+        prefixes = gpt2.get_text_prefixes("bombing", "A bombing.", ["gather", "plan"])
+        with patch.object(
+            gpt2, "make_batch_predictions", wraps=gpt2.make_batch_predictions
+        ) as uncached:
+            actual = self.predict(prefix_cache=cache, prefixes=prefixes, stop_at_sentence=True)
+        self.assertEqual(uncached.call_count, 1)
+        self.assertEqual((cache.misses, cache.hits), (0, 0))
+        self.assertEqual(actual, self.predict(stop_at_sentence=True))
+
+    def test_get(self) -> None:  # noqa
+        cache = PrefixCache(self.gpt2, self.device, max_entries=2)
+        self.assertIsNone(cache.get([]))
+        ids = [self.tokenizer.encode(prefix) for prefix in self.prefixes]
+        past = cache.get(ids)
+        assert past is not None
+        self.assertEqual(past[0][0].shape[2], len(ids[-1]))
+
+        # The cache of a prefix computed in steps matches computing it at once
+        with torch.no_grad():
+            outputs = self.gpt2(input_ids=torch.tensor([ids[-1]]), use_cache=True)
+        for layer, expected_layer in zip(past, outputs.past_key_values):
+            for tensor, expected_tensor in zip(layer, expected_layer):
+                self.assertTrue(torch.allclose(tensor, expected_tensor, atol=1e-5))
+
+        # Only the most recently used prefixes are kept
+        self.assertEqual(cache.misses, 3)
+        cache.get(ids[:1])
+        self.assertEqual((cache.misses, cache.hits), (4, 0))
@@ -0,0 +1,115 @@
+# noqa
+from collections import Counter
+from typing import Counter as tCounter, List, Optional, Sequence
+from unittest import TestCase
+
+import networkx as nx
+from sdf.yaml_schema import Before, Container, Schema
+
+from pycurator.gpt2_component.sequences import enumerate_paths, schema_to_sequences
+
+
+def previous_paths(  # noqa
+    graph: nx.DiGraph,
+    start_nodes: Sequence[str],
+    min_length: int,
+    max_length: int,
+    max_per_step: Optional[int] = None,
+) -> List[List[str]]:
+    # Extraction with `nx.all_simple_paths`, as `schema_to_sequences` used to do it
+    all_paths = []
+    if min_length <= 1:
+        all_paths.extend([[n] for n in start_nodes])
+    for node in start_nodes:
+        other_nodes = set(graph.nodes) - {node}
+        all_paths.extend(
+            p
+            for p in nx.all_simple_paths(graph, node, other_nodes, cutoff=max_length + 1)
+            if min_length <= len(p) <= max_length
+        )
+    all_paths.sort()
+    if max_per_step is None:
+        return all_paths
+    per_step: tCounter[str] = Counter()
+    kept = []
+    for path in all_paths:
+        if per_step[path[-1]] < max_per_step:
+            per_step[path[-1]] += 1
+            kept.append(path)
+    return kept
+
+
+class TestSequences(TestCase):  # noqa
+    def setUp(self) -> None:  # noqa
+        # Branches that rejoin, a cycle, and a step reachable by paths of several lengths
+        self.graph = nx.DiGraph(
+            [
+                ("gather", "plan"),
+                ("gather", "recruit"),
+                ("plan", "attack"),
+                ("recruit", "train"),
+                ("train", "attack"),
+                ("recruit", "attack"),
+                ("attack", "flee"),
+                ("flee", "regroup"),
+                ("regroup", "attack"),
+                ("scout", "plan"),
+            ]
+        )
+
+    def test_enumerate_paths(self) -> None:  # noqa
+        starts = [
+            sorted(node for node, degree in self.graph.in_degree if degree == 0),
+            sorted(self.graph.nodes),
+        ]
+        for start_nodes in starts:
+            for min_length in range(0, 4):
+                # A maximum length of 0 used to still include single steps, and now includes none
+                for max_length in range(1, 6):
+                    for max_per_step in (None, 1, 2):
+                        expected = previous_paths(
+                            self.graph, start_nodes, min_length, max_length, max_per_step
+                        )
+                        actual = list(
+                            enumerate_paths(
+                                self.graph, start_nodes, min_length, max_length, max_per_step
+                            )
+                        )
+                        self.assertEqual(
+                            actual, expected, (start_nodes, min_length, max_length, max_per_step)
+                        )
+
+    def test_max_per_step(self) -> None:  # noqa
+        paths = list(enumerate_paths(self.graph, ["gather", "scout"], 1, 4, max_per_step=1))
+        self.assertEqual(
+            paths,
+            [
+                ["gather"],
+                ["gather", "plan"],
+                ["gather", "plan", "attack"],
+                ["gather", "plan", "attack", "flee"],
+                ["gather", "recruit"],
+                ["gather", "recruit", "train"],
+                ["scout"],
+            ],
+        )
+
+    def test_schema_to_sequences(self) -> None:  # noqa
+        schema = Schema(
+            schema_id="cx:Attack",
+            schema_name="Attack",
+            schema_dscpt="An attack",
+            schema_version="2021-04-30-12-34-56-789012",
+            slots=[],
+            steps=[],
+            order=[Before(before=before, after=after) for before, after in self.graph.edges]
+            + [Container(container="attack", contained="flee")],
+        )
+        sequences = schema_to_sequences(schema, max_per_step=2)
+        self.assertEqual(
+            (sequences["schema_id"], sequences["name"], sequences["description"]),
+            ("cx:Attack", "Attack", "An attack"),
+        )
+        self.assertEqual(
+            sequences["sequences"], previous_paths(self.graph, ["gather", "scout"], 1, 4, 2)
+        )
@@ -0,0 +1,45 @@
+# noqa
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from pycurator.gpt2_component.suggestion_cache import SuggestionCache
+
+PARAMS = {"temperature": 0.8, "num_samples": 40, "precision": "float32"}
+
+
+class TestSuggestionCache(TestCase):  # noqa
+    def setUp(self) -> None:  # noqa
+        self.temp_dir = TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = Path(self.temp_dir.name) / "suggestion_cache.sqlite"
+
+    def test_hits_and_misses(self) -> None:  # noqa
+        cache = SuggestionCache("gpt2", self.path)
+        self.assertEqual(cache.get_many(["a", "b"], PARAMS), [None, None])
+        cache.put_many(["a"], PARAMS, [["attack", "bomb"]])
+        self.assertEqual(
+            cache.get_many(["a", "b", "a"], PARAMS),
+            [["attack", "bomb"], None, ["attack", "bomb"]],
+        )
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+
+        # Suggestions persist across instances
+        self.assertEqual(
+            SuggestionCache("gpt2", self.path).get_many(["a"], PARAMS), [["attack", "bomb"]]
+        )
+
+    def test_key(self) -> None:  # noqa
+        cache = SuggestionCache("gpt2", self.path)
+        cache.put_many(["a"], PARAMS, [["attack"]])
+        self.assertEqual(cache.get_many(["a"], dict(reversed(list(PARAMS.items())))), [["attack"]])
+
+        for params in (
+            {**PARAMS, "precision": "int8"},
+            {**PARAMS, "precision": "bfloat16"},
+            {**PARAMS, "num_samples": 8},
+            {key: value for key, value in PARAMS.items() if key != "precision"},
+        ):
+            self.assertEqual(cache.get_many(["a"], params), [None], params)
+        self.assertEqual(cache.get_many(["a "], PARAMS), [None])
+        self.assertEqual(SuggestionCache("gpt2-large", self.path).get_many(["a"], PARAMS), [None])
@@ -16,8 +16,8 @@ from typing import Any, List, Optional, cast
 from pydantic import BaseModel
 from pydantic.tools import parse_obj_as
 import requests
+from sdf import yaml_io
 from sdf.yaml_schema import Schema
-import yaml
 
 
 class LogItem(BaseModel):
@@ -68,7 +68,7 @@ def main() -> None:
     yaml_schemas = []
     for yaml_file in yaml_files:
         with yaml_file.open() as file:
-            yaml_data = yaml.safe_load(file)
+            yaml_data = yaml_io.load(file)
         yaml_schemas.extend(yaml_data)
     schemas: List[Schema] = parse_obj_as(List[Schema], yaml_schemas)
 
@@ -0,0 +1,136 @@
+"""Benchmark extraction of sequences from large synthetic schema graphs."""
+
+import argparse
+from functools import partial
+import random
+import time
+from typing import Callable, List, Sequence
+
+import networkx as nx
+
+from pycurator.gpt2_component.sequences import enumerate_paths
+
+
+def make_graph(num_steps: int, out_degree: int, window: int, seed: int) -> nx.DiGraph:
+    """Generates a random acyclic event graph.
+
+    Args:
+        num_steps: Number of steps.
+        out_degree: Number of later steps each step is before.
+        window: Number of following steps from which later steps are chosen.
+        seed: Random seed.
+
+    Returns:
+        Event graph.
+    """
+    rng = random.Random(seed)
+    graph = nx.DiGraph()
+    graph.add_nodes_from(f"step-{i:05d}" for i in range(num_steps))
+    for i in range(num_steps - 1):
+        later = range(i + 1, min(i + 1 + window, num_steps))
+        for j in rng.sample(later, min(out_degree, len(later))):
+            graph.add_edge(f"step-{i:05d}", f"step-{j:05d}")
+    return graph
+
+
+def all_simple_paths(
+    graph: nx.DiGraph, start_nodes: Sequence[str], min_length: int, max_length: int
+) -> List[List[str]]:
+    """Extracts sequences with `nx.all_simple_paths`, as `schema_to_sequences` used to.
+
+    Args:
+        graph: Event graph.
+        start_nodes: Nodes to start paths from.
+        min_length: Minimum number of nodes in a path.
+        max_length: Maximum number of nodes in a path.
+
+    Returns:
+        Sorted paths.
+    """
+    all_paths = []
+    if min_length <= 1:
+        all_paths.extend([[n] for n in start_nodes])
+    for node in start_nodes:
+        other_nodes = set(graph.nodes) - {node}
+        all_paths.extend(
+            p
+            for p in nx.all_simple_paths(graph, node, other_nodes, cutoff=max_length + 1)
+            if min_length <= len(p) <= max_length
+        )
+    all_paths.sort()
+    return all_paths
+
+
+def bounded_paths(
+    graph: nx.DiGraph, start_nodes: Sequence[str], min_length: int, max_length: int
+) -> List[List[str]]:
+    """Extracts sequences with `enumerate_paths`.
+
+    Args:
+        graph: Event graph.
+        start_nodes: Nodes to start paths from.
+        min_length: Minimum number of nodes in a path.
+        max_length: Maximum number of nodes in a path.
+
+    Returns:
+        Sorted paths.
+    """
+    return list(enumerate_paths(graph, start_nodes, min_length, max_length))
+
+
+def time_best(function: Callable[[], List[List[str]]], repeats: int) -> float:
+    """Times a function.
+
+    Args:
+        function: Function to time.
+        repeats: Number of times to run the function.
+
+    Returns:
+        Fastest time in seconds.
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    """Compares sequence extraction methods."""
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument(
+        "--steps", type=int, nargs="+", default=[100, 300, 1000], help="Numbers of steps."
+    )
+    p.add_argument("--out-degree", type=int, default=4, help="Number of successors of each step.")
+    p.add_argument(
+        "--window", type=int, default=10, help="Range of following steps to choose successors from."
+    )
+    p.add_argument("--min-length", type=int, default=1, help="Minimum sequence length.")
+    p.add_argument("--max-length", type=int, default=4, help="Maximum sequence length.")
+    p.add_argument("--repeats", type=int, default=3, help="Number of timed runs per method.")
+    p.add_argument("--seed", type=int, default=0, help="Random seed.")
+    args = p.parse_args()
+
+    print(f"{'steps':>6} {'sequences':>10} {'old (s)':>10} {'new (s)':>10} {'speedup':>8}")
+    for num_steps in args.steps:
+        graph = make_graph(num_steps, args.out_degree, args.window, args.seed)
+        # Every step is a start node, as with `starting_steps_only=False`
+        start_nodes = sorted(graph.nodes)
+
+        old = partial(all_simple_paths, graph, start_nodes, args.min_length, args.max_length)
+        new = partial(bounded_paths, graph, start_nodes, args.min_length, args.max_length)
+        expected = old()
+        if new() != expected:
+            raise ValueError("Methods extracted different sequences")
+
+        old_time = time_best(old, args.repeats)
+        new_time = time_best(new, args.repeats)
+        print(
+            f"{num_steps:>6} {len(expected):>10} {old_time:>10.3f} {new_time:>10.3f} "
+            f"{old_time / new_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Benchmark reading and writing saved schemas with PyYAML's pure-Python and LibYAML classes."""
+
+import argparse
+from io import StringIO
+from pathlib import Path
+import random
+import time
+from typing import Any, Callable, List, Mapping, Sequence
+
+from sdf import yaml_io
+import yaml
+
+from pycurator.common.paths import SCHEMA_DIR
+
+
+def make_schema(index: int, num_steps: int, num_log_items: int, seed: int) -> Mapping[str, Any]:
+    """Generates a schema resembling those saved by the curation interface.
+
+    Args:
+        index: Index of the schema.
+        num_steps: Number of steps.
+        num_log_items: Number of items in the tracking log.
+        seed: Random seed.
+
+    Returns:
+        Schema.
+    """
+    rng = random.Random(seed + index)
+    refvars = [f"entity {i}" for i in range(num_steps // 2 + 1)]
+    steps = [
+        {
+            "id": f"entity {rng.choice(refvars)} attacks target {i}",
+            "primitive": "Conflict.Attack.Unspecified",
+            "slots": [
+                {
+                    "role": role,
+                    "refvar": rng.choice(refvars),
+                    "constraints": sorted(rng.sample(["GPE", "ORG", "PER", "WEA", "VEH"], 2)),
+                    "reference": f"wiki:Q{rng.randrange(1, 1_000_000)}",
+                }
+                for role in ("Attacker", "Target", "Instrument")
+            ],
+            "reference": f"wiki:Q{rng.randrange(1, 1_000_000)}",
+        }
+        for i in range(num_steps)
+    ]
+    return {
+        "schema_id": f"cx:Schema{index}",
+        "schema_name": f"Schema {index}",
+        "schema_dscpt": "A synthetic schema, with non-ASCII text – and «quotes».",
+        "schema_version": "2021-04-30-12-34-56-789012",
+        "slots": [{"role": "Attacker", "refvar": refvars[0], "constraints": ["PER"]}],
+        "steps": steps,
+        "order": [
+            {"before": steps[i]["id"], "after": steps[i + 1]["id"]} for i in range(num_steps - 1)
+        ],
+        "private_data": {
+            "tracking": [
+                {
+                    "date": f"2021-04-30T12:{i // 60 % 60:02d}:{i % 60:02d}.000Z",
+                    "type": rng.choice(["add-event", "edit-event", "add-link", "select-qnode"]),
+                    "data": {"event": steps[i % num_steps]["id"], "value": rng.random()},
+                }
+                for i in range(num_log_items)
+            ]
+        },
+    }
+
+
+def time_best(function: Callable[[], Any], repeats: int) -> float:
+    """Times a function.
+
+    Args:
+        function: Function to time.
+        repeats: Number of times to run the function.
+
+    Returns:
+        Fastest time in seconds.
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    """Compares YAML loading and dumping of a schema corpus."""
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument(
+        "--schema-dir",
+        type=Path,
+        default=SCHEMA_DIR,
+        help="Directory of saved schemas. Synthetic schemas are used if it has none.",
+    )
+    p.add_argument(
+        "--synthetic", type=int, default=20, help="Number of synthetic schemas to generate."
+    )
+    p.add_argument("--steps", type=int, default=40, help="Number of steps per synthetic schema.")
+    p.add_argument(
+        "--log-items", type=int, default=1000, help="Number of tracking items per synthetic schema."
+    )
+    p.add_argument("--repeats", type=int, default=3, help="Number of timed runs per method.")
+    p.add_argument("--seed", type=int, default=0, help="Random seed.")
+    args = p.parse_args()
+
+    if not yaml_io.LIBYAML:
+        print("PyYAML was built without LibYAML, so both methods are the same")
+    texts: Sequence[str] = [path.read_text() for path in sorted(args.schema_dir.glob("*.yaml"))]
+    if not texts:
+        texts = [
+            yaml.dump([make_schema(i, args.steps, args.log_items, args.seed)], sort_keys=False)
+            for i in range(args.synthetic)
+        ]
+    print(f"{len(texts)} schemas, {sum(len(text) for text in texts) / 1024 / 1024:.1f} MiB")
+
+    def old_load() -> List[Any]:
+        return [yaml.safe_load(text) for text in texts]
+
+    def new_load() -> List[Any]:
+        return [yaml_io.load(text) for text in texts]
+
+    data = old_load()
+    if new_load() != data:
+        raise ValueError("Methods loaded different data")
+
+    # Files are saved with `yaml.dump`, as `make_yaml.save_schema` used to
+    def old_dump() -> List[str]:
+        outputs = []
+        for schemas in data:
+            stream = StringIO()
+            yaml.dump(schemas, stream, sort_keys=False)
+            outputs.append(stream.getvalue())
+        return outputs
+
+    def new_dump() -> List[str]:
+        outputs = []
+        for schemas in data:
+            stream = StringIO()
+            yaml_io.dump(schemas, stream, sort_keys=False)
+            outputs.append(stream.getvalue())
+        return outputs
+
+    old_texts = old_dump()
+    new_texts = new_dump()
+    if [yaml.safe_load(text) for text in new_texts] != data:
+        raise ValueError("Dumped text doesn't load as the original data")
+    differing = sum(old_text != new_text for old_text, new_text in zip(old_texts, new_texts))
+    print(f"{differing} schemas dumped with differently wrapped lines")
+
+    print(f"{'operation':>9} {'old (s)':>10} {'new (s)':>10} {'speedup':>8}")
+    for operation, old, new in (("load", old_load, new_load), ("dump", old_dump, new_dump)):
+        old_time = time_best(old, args.repeats)
+        new_time = time_best(new, args.repeats)
+        print(f"{operation:>9} {old_time:>10.3f} {new_time:>10.3f} {old_time / new_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
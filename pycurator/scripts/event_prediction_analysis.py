@@ -11,7 +11,12 @@ import pandas as pd
 import seaborn as sn
 from sklearn.metrics import confusion_matrix
 
-from pycurator.flask_backend.event_prediction import init_embeddings, init_ss_model, request_top_n
+from pycurator.flask_backend.event_prediction import (
+    PrimitiveIndex,
+    init_embeddings,
+    init_ss_model,
+    request_top_n_batch,
+)
 
 
 @dataclass
@@ -44,29 +49,22 @@ def main(args: Namespace) -> None:
     schemas = read_in_schemas(schema_path)
 
     ss_model = init_ss_model()
-    definition_emb, template_emb = init_embeddings(ss_model)
+    index = PrimitiveIndex(*init_embeddings(ss_model))
+
+    steps = [step for schema in schemas for step in schema["steps"]]
+    descriptions = [step["name"].replace(",", ";").replace("-", " ") for step in steps]
+    predictions = request_top_n_batch(descriptions, n=5, ss_model=ss_model, index=index)
 
     annotated_schemas = []
 
-    for schema in schemas:
-        for step in schema["steps"]:
-            description = step["name"].replace(",", ";").replace("-", " ")
-            top_5: List[str] = []
-            for pred in request_top_n(
-                description,
-                n=5,
-                ss_model=ss_model,
-                definition_embeddings=definition_emb,
-                template_embeddings=template_emb,
-            ):
-                pred_type = cast(str, pred["type"])
-                top_5.append(pred_type)
-            s = SchemaAnalysisObj(
-                description,
-                ".".join(step["@type"].split("/")[-1].split(".")[:2]),
-                top_5,
-            )
-            annotated_schemas.append(s)
+    for step, description, step_predictions in zip(steps, descriptions, predictions):
+        top_5: List[str] = [cast(str, pred["type"]) for pred in step_predictions]
+        s = SchemaAnalysisObj(
+            description,
+            ".".join(step["@type"].split("/")[-1].split(".")[:2]),
+            top_5,
+        )
+        annotated_schemas.append(s)
 
     path_to_schema_events = Path("all_schema_events.csv")
     # Checkpoint in case we want to do anything else with this information
@@ -0,0 +1,47 @@
+"""Update the stored primitive embeddings after changes to the ontology or templates."""
+
+import argparse
+import time
+from typing import Sequence, Tuple
+
+from pycurator.flask_backend.event_prediction import (
+    PRIMITIVE_EMB_FILE,
+    init_ss_model,
+    update_embeddings,
+)
+
+
+def print_rows(label: str, rows: Sequence[Tuple[str, str]]) -> None:
+    """Prints rows of the store.
+
+    Args:
+        label: Kind of change.
+        rows: Event primitive and kind of text of each row.
+    """
+    print(f"{label}: {len(rows)}")
+    for event, kind in rows:
+        print(f"  {event} ({kind})")
+
+
+def main() -> None:
+    """Updates the embeddings, reporting changes."""
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument(
+        "--force", action="store_true", help="Encode all texts, even those which are unchanged."
+    )
+    args = p.parse_args()
+
+    ss_model = init_ss_model()
+    start = time.perf_counter()
+    changes = update_embeddings(ss_model, force=args.force)
+    elapsed = time.perf_counter() - start
+
+    print_rows("Added", changes.added)
+    print_rows("Changed", changes.changed)
+    print_rows("Removed", changes.removed)
+    print(f"Reused: {changes.reused}")
+    print(f"Updated {PRIMITIVE_EMB_FILE} in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Fill the KGTK disambiguation cache with the event verbs and refvars of all saved schemas."""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+import threading
+import time
+from typing import Any, Callable, List, Mapping, Set, Tuple
+
+from sdf import yaml_io
+import spacy
+
+from pycurator.common.paths import SCHEMA_DIR
+from pycurator.flask_backend.disambiguation import Disambiguator, clean_text
+from pycurator.flask_backend.event_prediction import SS_MODEL_NAME, init_ss_model
+from pycurator.flask_backend.kgtk_store import EVENT_RESPONSES, REFVAR_RESPONSES, KgtkStore
+from pycurator.flask_backend.qnode_embeddings import QnodeEmbeddingStore
+
+
+class RateLimiter:
+    """Spaces out calls shared between threads to at most a given rate."""
+
+    def __init__(self, rate: float) -> None:
+        """Constructor.
+
+        Args:
+            rate: Maximum number of calls per second, or 0 for no limit.
+        """
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self.next_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Blocks until the next call is allowed."""
+        with self._lock:
+            now = time.monotonic()
+            scheduled = max(now, self.next_time)
+            self.next_time = scheduled + self.interval
+        time.sleep(scheduled - now)
+
+
+def read_schema_texts(schema_dir: Path) -> Tuple[List[str], List[str]]:
+    """Reads the step descriptions and refvars of saved schemas.
+
+    Args:
+        schema_dir: Directory of saved schemas.
+
+    Returns:
+        Unique step descriptions and refvars, in order of appearance.
+    """
+    descriptions: List[str] = []
+    refvars: List[str] = []
+    for path in sorted(schema_dir.glob("*.yaml")):
+        with path.open() as file:
+            schemas = yaml_io.load(file) or []
+        for schema in schemas:
+            for step in schema.get("steps") or []:
+                descriptions.append(step["id"])
+                for slot in step.get("slots") or []:
+                    if slot.get("refvar"):
+                        refvars.append(slot["refvar"])
+    return list(dict.fromkeys(descriptions)), list(dict.fromkeys(refvars))
+
+
+def warm(
+    tasks: List[Tuple[str, Callable[[], Mapping[str, Any]]]], workers: int, rate: float
+) -> Tuple[int, int]:
+    """Runs disambiguations concurrently, reporting progress.
+
+    Args:
+        tasks: Name and disambiguation function of each uncached key.
+        workers: Number of concurrent disambiguations.
+        rate: Maximum number of disambiguations started per second, or 0 for no limit.
+
+    Returns:
+        Number of misses filled with options, and number with no options or whose lookups failed.
+    """
+    limiter = RateLimiter(rate)
+
+    def run(task: Callable[[], Mapping[str, Any]]) -> Mapping[str, Any]:
+        limiter.wait()
+        return task()
+
+    filled = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run, task): name for name, task in tasks}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                response = future.result()
+            except Exception as ex:  # pylint: disable=broad-except
+                print(f"  {futures[future]}: {ex}")
+                response = {}
+            if response.get("options"):
+                filled += 1
+            else:
+                failed += 1
+            if done % 10 == 0 or done == len(futures):
+                print(f"[{done}/{len(futures)}] {futures[future]}")
+    return filled, failed
+
+
+def main() -> None:
+    """Warms the cache, reporting hits and misses."""
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument(
+        "--schema-dir", type=Path, default=SCHEMA_DIR, help="Directory of saved schemas."
+    )
+    p.add_argument("--workers", type=int, default=4, help="Number of concurrent disambiguations.")
+    p.add_argument(
+        "--rate",
+        type=float,
+        default=5.0,
+        help="Maximum number of disambiguations started per second, or 0 for no limit.",
+    )
+    args = p.parse_args()
+
+    start = time.perf_counter()
+    descriptions, refvars = read_schema_texts(args.schema_dir)
+    print(f"Found {len(descriptions)} step descriptions and {len(refvars)} refvars")
+
+    kgtk_store = KgtkStore()
+    disambiguator = Disambiguator(
+        spacy.load("en_core_web_md"),
+        init_ss_model(),
+        kgtk_store,
+        QnodeEmbeddingStore(SS_MODEL_NAME),
+    )
+
+    # Several descriptions share a verb, and several refvars share a cache key
+    tasks: List[Tuple[str, Callable[[], Mapping[str, Any]]]] = []
+    seen: Set[Tuple[str, str]] = set()
+    hits = 0
+    for description in descriptions:
+        key = (EVENT_RESPONSES, disambiguator.verb_lemma(description))
+        if key in seen:
+            continue
+        seen.add(key)
+        if kgtk_store.get(*key) is not None:
+            hits += 1
+        else:
+            tasks.append((key[1], partial(disambiguator.disambiguate_verb, description)))
+    for refvar in refvars:
+        key = (REFVAR_RESPONSES, clean_text(refvar.lower()))
+        if key in seen:
+            continue
+        seen.add(key)
+        if kgtk_store.get(*key) is not None:
+            hits += 1
+        else:
+            tasks.append((key[1], partial(disambiguator.disambiguate_refvar, refvar)))
+    print(f"Hits: {hits}, misses: {len(tasks)}")
+
+    filled, failed = warm(tasks, args.workers, args.rate)
+    print(f"Filled {filled} misses ({failed} had no options or failed)")
+    print(f"Finished in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()